@@ -0,0 +1,88 @@
+"""
+Save and load times and file sizes of the binary map format, also loaded memory mapped, against the indented JSON
+files the exploration wrote
+
+Run with: python -m src.benchmarks.benchmark_map_format
+"""
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+# runtime_storages has to be initialized before navigation_core
+from src.benchmarks.benchmark_walk_distance import generate_map_edges
+from src.save_load_handlers.data_handle import write_map, read_map
+
+NODES_COUNT = 500
+ROTATIONS = 24
+EMBEDDING_SIZE = 512
+
+
+def _node_name(i: int) -> str:
+    return f"{i * 0.001:.3f}_{i * 0.002:.3f}"
+
+
+def generate_map() -> tuple:
+    rng = np.random.default_rng(0)
+    starts, ends, weights = generate_map_edges(NODES_COUNT)
+    nodes = [{"name": _node_name(i), "datapoints_array": rng.random((ROTATIONS, EMBEDDING_SIZE)).tolist(),
+              "params": {"x": i * 0.001, "y": i * 0.002}} for i in range(NODES_COUNT)]
+    authentic = [{"name": f"{_node_name(start)}-{_node_name(end)}", "start": _node_name(start),
+                  "end": _node_name(end), "distance": weight, "direction": [0.5, -0.5]} for start, end, weight in
+                 zip(starts.tolist(), ends.tolist(), weights.tolist())]
+    synthetic = authentic[::3]
+    null = [{"name": _node_name(i), "start": _node_name(i), "distance": 1.0, "direction": [0.0, 1.0]} for i in
+            range(0, NODES_COUNT, 5)]
+    return nodes, authentic, synthetic, null
+
+
+def _timed(function, *arguments) -> tuple[float, any]:
+    start_time = time.perf_counter()
+    result = function(*arguments)
+    return time.perf_counter() - start_time, result
+
+
+def _json_write(directory: str, kinds_data: tuple) -> None:
+    for kind, data in zip(["nodes", "authentic", "synthetic", "null"], kinds_data):
+        with open(os.path.join(directory, f"{kind}.json"), "w") as file:
+            json.dump(data, file, indent=4)
+
+
+def _json_read(directory: str) -> tuple:
+    kinds_data = []
+    for kind in ["nodes", "authentic", "synthetic", "null"]:
+        with open(os.path.join(directory, f"{kind}.json"), "r") as file:
+            kinds_data.append(json.load(file))
+    return tuple(kinds_data)
+
+
+def _directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    kinds_data = generate_map()
+    print(f"{NODES_COUNT} nodes of {ROTATIONS}x{EMBEDDING_SIZE} datapoints, {len(kinds_data[1])} connections")
+    print(f"{'format':>8} {'save (s)':>10} {'load (s)':>10} {'size (MiB)':>12}")
+
+    with tempfile.TemporaryDirectory() as json_directory, tempfile.TemporaryDirectory() as map_directory:
+        json_save, _ = _timed(_json_write, json_directory, kinds_data)
+        json_load, _ = _timed(_json_read, json_directory)
+        print(f"{'json':>8} {json_save:>10.2f} {json_load:>10.2f} {_directory_size(json_directory) / 2 ** 20:>12.1f}")
+
+        map_path = os.path.join(map_directory, "map.npz")
+        map_save, _ = _timed(write_map, map_path, *kinds_data)
+        map_load, loaded = _timed(read_map, map_path)
+        print(f"{'binary':>8} {map_save:>10.2f} {map_load:>10.2f} {_directory_size(map_directory) / 2 ** 20:>12.1f}")
+
+        # the datapoints are only read from the disk once accessed, the saving is the same
+        mmap_load, _ = _timed(lambda: read_map(map_path, mmap=True))
+        print(f"{'mmap':>8} {map_save:>10.2f} {mmap_load:>10.2f} {_directory_size(map_directory) / 2 ** 20:>12.1f}")
+
+    if [connection["name"] for connection in loaded[1]] != [connection["name"] for connection in kinds_data[1]]:
+        raise ValueError("The binary map doesn't hold the same connections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory and lookup times of the storage on a synthetic map of 10k nodes loaded like the JSON files are
+
+Run with: python -m src.benchmarks.benchmark_node_ids
+"""
+import gc
+import json
+import random
+import time
+import tracemalloc
+from typing import Callable
+
+# runtime_storages has to be initialized before navigation_core
+from src import runtime_storages as storage
+from src.benchmarks.benchmark_walk_distance import generate_map_edges
+from src.runtime_storages.functions.functionalities.get_walk_distance import on_demand
+from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData
+
+NODES_COUNT = 10000
+LOOKUPS_COUNT = 100000
+WALK_QUERIES_COUNT = 200
+
+
+def _node_name(i: int) -> str:
+    return f"{i * 0.001:.3f}_{i * 0.002:.3f}"
+
+
+def generate_map_data() -> tuple:
+    starts, ends, weights = generate_map_edges(NODES_COUNT)
+    # going through JSON gives every occurrence of a name its own string, like loading the data files does
+    nodes = json.loads(json.dumps([{"name": _node_name(i), "datapoints_array": [[0.0]], "params": {}} for i in
+                                   range(NODES_COUNT)]))
+    connections = json.loads(json.dumps([
+        {"name": f"{_node_name(start)}-{_node_name(end)}", "start": _node_name(start), "end": _node_name(end),
+         "distance": weight, "direction": [0.0, 0.0]} for start, end, weight in
+        zip(starts.tolist(), ends.tolist(), weights.tolist())]))
+    return nodes, connections
+
+
+def build_storage(nodes: list, connections: list) -> 'storage.StorageStruct':
+    storage_struct = storage.create_storage()
+    storage.crud.create_nodes(storage_struct, [NodeAuthenticData(**node) for node in nodes])
+    storage.crud.create_connections_authentic(storage_struct,
+                                              [ConnectionAuthenticData(**connection) for connection in connections])
+    return storage_struct
+
+
+def _time_per_call(function: Callable, arguments: list) -> float:
+    start_time = time.perf_counter()
+    for argument in arguments:
+        function(*argument)
+    return (time.perf_counter() - start_time) / len(arguments)
+
+
+def main():
+    gc.collect()
+    tracemalloc.start()
+    nodes, connections = generate_map_data()
+    start_time = time.perf_counter()
+    storage_struct = build_storage(nodes, connections)
+    build_time = time.perf_counter() - start_time
+    del nodes, connections
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{NODES_COUNT} nodes, {len(storage_struct.connections_authentic)} connections")
+    print(f"storage build: {build_time:.2f}s (traced), memory held: {memory / 2 ** 20:.1f} MiB")
+
+    rng = random.Random(0)
+    names = list(storage.nodes_get_all_names(storage_struct))
+    # lookups use names which are not the stored objects, like names coming from the network or the server
+    queried = [(storage_struct, json.loads(json.dumps(rng.choice(names)))) for _ in range(LOOKUPS_COUNT)]
+    pairs = [(storage_struct, connection["start"], connection["end"]) for connection in
+             rng.sample(storage_struct.connections_authentic, 1000)] * (LOOKUPS_COUNT // 1000)
+
+    print(f"node_get_index_by_name: {_time_per_call(storage.node_get_index_by_name, queried) * 1e6:.2f} us")
+    print(f"node_get_connections_adjacent: "
+          f"{_time_per_call(storage.node_get_connections_adjacent, queried) * 1e6:.2f} us")
+    print(f"connection_exists: {_time_per_call(storage.connection_exists, pairs) * 1e6:.2f} us")
+
+    start_time = time.perf_counter()
+    on_demand._graph_build(storage_struct)
+    print(f"walk graph build: {(time.perf_counter() - start_time) * 1e3:.1f} ms")
+
+    walk_queries = [(storage_struct, rng.choice(names), rng.choice(names)) for _ in range(WALK_QUERIES_COUNT)]
+    print(f"get_walk_distance (on demand, cold rows): "
+          f"{_time_per_call(storage.get_walk_distance, walk_queries) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Read throughput of the storage for readers running alone, then alongside a writer exploring
+
+Writers are preferred by the storage lock, so a writer writing back to back leaves the readers little room. The
+exploration does work between its writes, which the pause of the writer stands for
+
+Run with: python -m src.benchmarks.benchmark_storage_concurrency
+"""
+import threading
+import time
+from typing import Tuple
+
+# runtime_storages has to be initialized before navigation_core
+from src import runtime_storages as storage
+from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData
+
+NODES_COUNT = 1000
+READERS_COUNTS = [1, 4]
+DURATION_SECONDS = 2.0
+# nodes created then deleted by each write round
+WRITE_ROUND_NODES = 5
+# pause of the writer between its rounds, none is the worst case for the readers
+WRITE_PAUSES_SECONDS = [0.0, 0.001]
+
+
+def build_storage() -> 'storage.StorageStruct':
+    storage_struct = storage.create_storage()
+    storage.crud.create_nodes(storage_struct, [
+        NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i]], params={"x": i, "y": 0}) for i in
+        range(NODES_COUNT)])
+    storage.crud.create_connections_authentic(storage_struct, [
+        ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                direction=[1, 0]) for i in range(NODES_COUNT - 1)])
+    return storage_struct
+
+
+def _read(storage_struct: 'storage.StorageStruct', i: int) -> None:
+    name = f"node{i % NODES_COUNT}"
+    storage.node_get_index_by_name(storage_struct, name)
+    storage.node_get_datapoints_tensor(storage_struct, name)
+    storage.node_get_closest_to_xy(storage_struct, i % NODES_COUNT, 0)
+    storage.get_walk_distance(storage_struct, "node0", name)
+
+
+def _write_round(storage_struct: 'storage.StorageStruct', round_id: int) -> None:
+    names = [f"round{round_id}_{i}" for i in range(WRITE_ROUND_NODES)]
+    with storage.storage_transaction(storage_struct):
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=name, datapoints_array=[[0, 0]], params={"x": 0, "y": 1}) for name in names])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"{name}_connection", start="node0", end=name, distance=2.0,
+                                    direction=[0, 1]) for name in names])
+    with storage.storage_transaction(storage_struct):
+        storage.crud.delete_connections_authentic(storage_struct, [f"{name}_connection" for name in names])
+        storage.crud.delete_nodes(storage_struct, names)
+
+
+def benchmark_reads(storage_struct: 'storage.StorageStruct', readers_count: int, write_pause: float | None) -> \
+        Tuple[float, float]:
+    """
+    Reads per second of all the readers together, and write rounds per second of the writer, if there's one
+    """
+    with_writer = write_pause is not None
+    stop = threading.Event()
+    start = threading.Barrier(readers_count + with_writer + 1)
+    reads_counters = [0] * readers_count
+    writes_counter = [0]
+
+    def read_loop(reader: int) -> None:
+        start.wait()
+        while not stop.is_set():
+            _read(storage_struct, reads_counters[reader])
+            reads_counters[reader] += 1
+
+    def write_loop() -> None:
+        start.wait()
+        while not stop.is_set():
+            _write_round(storage_struct, writes_counter[0])
+            writes_counter[0] += 1
+            stop.wait(write_pause)
+
+    threads = [threading.Thread(target=read_loop, args=(reader,)) for reader in range(readers_count)]
+    if with_writer:
+        threads.append(threading.Thread(target=write_loop))
+    for thread in threads:
+        thread.start()
+
+    start.wait()
+    start_time = time.perf_counter()
+    time.sleep(DURATION_SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    return sum(reads_counters) / elapsed, writes_counter[0] / elapsed
+
+
+def run_benchmark() -> None:
+    storage_struct = build_storage()
+    # the lazy caches are built before timing
+    _read(storage_struct, 1)
+
+    print(f"{NODES_COUNT} nodes, {DURATION_SECONDS:.0f}s per run")
+    print(f"{'readers':>8} {'writer pause (ms)':>18} {'reads/s':>10} {'writes/s':>10}")
+    for readers_count in READERS_COUNTS:
+        reads, _ = benchmark_reads(storage_struct, readers_count, write_pause=None)
+        print(f"{readers_count:>8} {'no writer':>18} {reads:>10.0f} {'-':>10}")
+        for write_pause in WRITE_PAUSES_SECONDS:
+            reads, writes = benchmark_reads(storage_struct, readers_count, write_pause=write_pause)
+            print(f"{readers_count:>8} {write_pause * 1e3:>18.1f} {reads:>10.0f} {writes:>10.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
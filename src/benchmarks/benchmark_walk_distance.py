@@ -0,0 +1,91 @@
+"""
+Compares the dense blocked Floyd-Warshall used by the walk distance cache with the dict based one from to_refactor
+
+Run with: python -m src.benchmarks.benchmark_walk_distance
+"""
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+
+# runtime_storages has to be initialized before navigation_core
+from src.runtime_storages.functions.functionalities.get_walk_distance.dense_shortest_paths import \
+    dense_distances_create, dense_distances_fill_edges, dense_floyd_warshall
+from src.navigation_core.to_refactor.algorithms import floyd_warshall_algorithm
+
+DICT_SIZES = [100, 200, 300]
+DENSE_SIZES = [100, 200, 300, 1000, 2000]
+NEIGHBORS_DISTANCE = 1.5
+
+
+def generate_map_edges(nodes_count: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Nodes scattered on a plane with roughly unit density, connected to the ones closer than NEIGHBORS_DISTANCE
+    """
+    rng = np.random.default_rng(seed)
+    side = np.sqrt(nodes_count)
+    positions = rng.uniform(0, side, size=(nodes_count, 2))
+
+    starts, ends, weights = [], [], []
+    for i in range(nodes_count):
+        distances = np.linalg.norm(positions[i + 1:] - positions[i], axis=1)
+        neighbors = np.flatnonzero(distances < NEIGHBORS_DISTANCE)
+        starts.append(np.full(len(neighbors), i))
+        ends.append(neighbors + i + 1)
+        weights.append(distances[neighbors])
+
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(weights).astype(np.float32)
+
+
+def _edges_to_hashmap(nodes_count: int, starts: np.ndarray, ends: np.ndarray, weights: np.ndarray) -> Dict:
+    connections_hashmap: Dict[str, List[Dict]] = {f"node{i}": [] for i in range(nodes_count)}
+    for start, end, weight in zip(starts.tolist(), ends.tolist(), weights.tolist()):
+        connections_hashmap[f"node{start}"].append({"end": f"node{end}", "distance": weight})
+        connections_hashmap[f"node{end}"].append({"end": f"node{start}", "distance": weight})
+    return connections_hashmap
+
+
+def benchmark_dict(nodes_count: int) -> Tuple[float, Dict]:
+    starts, ends, weights = generate_map_edges(nodes_count)
+    connections_hashmap = _edges_to_hashmap(nodes_count, starts, ends, weights)
+
+    start_time = time.perf_counter()
+    distances = floyd_warshall_algorithm(connections_hashmap)
+    return time.perf_counter() - start_time, distances
+
+
+def benchmark_dense(nodes_count: int) -> Tuple[float, np.ndarray]:
+    starts, ends, weights = generate_map_edges(nodes_count)
+
+    start_time = time.perf_counter()
+    matrix = dense_distances_create(nodes_count)
+    dense_distances_fill_edges(matrix, starts, ends, weights)
+    dense_floyd_warshall(matrix)
+    return time.perf_counter() - start_time, matrix
+
+
+def _results_match(nodes_count: int, distances: Dict, matrix: np.ndarray) -> bool:
+    expected = np.array([[distances[f"node{i}"][f"node{j}"] for j in range(nodes_count)] for i in range(nodes_count)])
+    return np.allclose(expected, matrix, rtol=1e-4)
+
+
+def run_benchmark() -> None:
+    dict_times = {}
+    for nodes_count in DICT_SIZES:
+        elapsed, distances = benchmark_dict(nodes_count)
+        _, matrix = benchmark_dense(nodes_count)
+        if not _results_match(nodes_count, distances, matrix):
+            raise ValueError(f"Dense distances differ from the dict ones for {nodes_count} nodes")
+        dict_times[nodes_count] = elapsed
+
+    print(f"{'nodes':>8} {'dict (s)':>12} {'dense (s)':>12} {'speedup':>10}")
+    for nodes_count in DENSE_SIZES:
+        elapsed, _ = benchmark_dense(nodes_count)
+        if nodes_count in dict_times:
+            speedup = dict_times[nodes_count] / elapsed
+            print(f"{nodes_count:>8} {dict_times[nodes_count]:>12.3f} {elapsed:>12.3f} {speedup:>9.1f}x")
+        else:
+            print(f"{nodes_count:>8} {'-':>12} {elapsed:>12.3f} {'-':>10}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -3,6 +3,7 @@ from src.navigation_core.to_refactor.algorithms import build_connections_hashmap
 from src.navigation_core.to_refactor.params import REDUNDANCY_CONNECTION_ANGLE
 from src.runtime_storages.storage_struct import StorageStruct
 import src.runtime_storages as storage
+from src.runtime_storages.types import DataAlias
 from typing import List
 
 
@@ -31,12 +32,13 @@ def filtering_redundant_connections(storage_struct: StorageStruct, verbose: bool
                 second_angle = direction_to_degrees_atan(second_direction)
                 if abs(first_angle - second_angle) < REDUNDANCY_CONNECTION_ANGLE:
                     # invalidate the bigger distance
-                    first_authentic = storage.connections_authentic_check_if_exists(storage_struct,
-                                                                                    first_connection["start"],
-                                                                                    first_connection["end"])
-                    second_authentic = storage.connections_authentic_check_if_exists(storage_struct,
-                                                                                     second_connection["start"],
-                                                                                     second_connection["end"])
+                    # adjacent connections might be reversed, so the check ignores direction
+                    first_authentic = storage.connection_exists(storage_struct, first_connection["start"],
+                                                                first_connection["end"],
+                                                                data_aliases=[DataAlias.CONNECTIONS_AUTHENTIC])
+                    second_authentic = storage.connection_exists(storage_struct, second_connection["start"],
+                                                                 second_connection["end"],
+                                                                 data_aliases=[DataAlias.CONNECTIONS_AUTHENTIC])
                     if not first_authentic and not second_authentic:
                         # we don't want to remove authentic connections, but we can get rid of synthetic ones
                         continue
@@ -9,7 +9,8 @@ from src.navigation_core.autonomous_exploration.common import get_collected_data
     random_direction_generator, check_direction_validity, get_collected_data_image
 from src.navigation_core.autonomous_exploration.data_filtering import filtering_redundant_connections
 from src.navigation_core.autonomous_exploration.metrics.functions import build_augmented_connections
-from src.navigation_core.autonomous_exploration.params import NORTH
+from src.navigation_core.autonomous_exploration.params import NORTH, STORAGE_REPORT_EVERY_STEPS, \
+    EXPLORATION_JOURNAL_DIRECTORY
 from src.navigation_core.pure_functions import generate_dxdy, get_real_distance_between_datapoints, \
     get_direction_between_datapoints
 from src.navigation_core.autonomous_exploration.metrics.metric_builders import build_find_adjacency_heuristic_cheating
@@ -20,12 +21,17 @@ from src.navigation_core.utils import frontier_find_all_datapoints_and_direction
 from src.runtime_storages.storage_struct import StorageStruct
 from src.runtime_storages.types import NodeAuthenticData, ConnectionNullData, ConnectionAuthenticData, \
     ConnectionSyntheticData
-from src.save_load_handlers.data_handle import write_other_data_to_file
+from src.save_load_handlers.data_handle import get_other_data_path
+from src.save_load_handlers.storage_journal import StorageJournal, storage_journal_open, storage_journal_stats, \
+    storage_journal_stats_format
 
 
 def initial_setup():
-    global storage_struct
+    global storage_struct, storage_journal
     storage_struct = storage.create_storage()
+    # every crud operation is journaled as it happens, instead of rewriting the whole map after each step. The journal
+    # writes in the background and is closed at exit, writing what is left
+    storage_journal = storage_journal_open(storage_struct, get_other_data_path(EXPLORATION_JOURNAL_DIRECTORY))
 
 
 def check_position_is_known(random_walk_datapoints: list):
@@ -194,32 +200,35 @@ def exploration_policy_autonomous_exploration_cheating(step: int):
         skip_checks=2
     )
 
-    storage.crud.create_nodes(
-        storage=storage_struct,
-        nodes=walk_nodes
-    )
-    storage.crud.create_connections_authentic(
-        storage=storage_struct,
-        new_connections=walk_connections_authentic
-    )
-    storage.crud.create_connections_null(
-        storage=storage_struct,
-        new_connections=walk_connections_null
-    )
-
-    synthetic_connections_found: List[ConnectionSyntheticData] = []
-
-    walk_nodes_names = [node["name"] for node in walk_nodes]
-    new_connections: List[ConnectionSyntheticData] = augment_connections_by_metadata(storage_struct, walk_nodes_names)
-    synthetic_connections_found.extend(new_connections)
-    synthetic_connections_found = synthetic_connections_fill_distances(synthetic_connections_found,
-                                                                       storage_struct)
-    synthetic_connections_found = synthetic_connections_fill_directions(synthetic_connections_found,
-                                                                        storage_struct)
-    storage.crud.create_connections_synthetic(
-        storage=storage_struct,
-        new_connections=synthetic_connections_found
-    )
+    # the walk distance is not read while exploring, so it is updated once for the whole step
+    with storage.storage_transaction(storage_struct):
+        storage.crud.create_nodes(
+            storage=storage_struct,
+            nodes=walk_nodes
+        )
+        storage.crud.create_connections_authentic(
+            storage=storage_struct,
+            new_connections=walk_connections_authentic
+        )
+        storage.crud.create_connections_null(
+            storage=storage_struct,
+            new_connections=walk_connections_null
+        )
+
+        synthetic_connections_found: List[ConnectionSyntheticData] = []
+
+        walk_nodes_names = [node["name"] for node in walk_nodes]
+        new_connections: List[ConnectionSyntheticData] = augment_connections_by_metadata(storage_struct,
+                                                                                         walk_nodes_names)
+        synthetic_connections_found.extend(new_connections)
+        synthetic_connections_found = synthetic_connections_fill_distances(synthetic_connections_found,
+                                                                           storage_struct)
+        synthetic_connections_found = synthetic_connections_fill_directions(synthetic_connections_found,
+                                                                            storage_struct)
+        storage.crud.create_connections_synthetic(
+            storage=storage_struct,
+            new_connections=synthetic_connections_found
+        )
 
     filtering_redundant_connections(storage_struct, verbose=False)
     # data_filtering_redundant_datapoints(storage_raw, verbose=False)
@@ -231,14 +240,6 @@ def exploration_policy_autonomous_exploration_cheating(step: int):
         starting_point=last_dp["name"]
     )
 
-    write_other_data_to_file(f"step{step}_datapoints_walk.json", storage.nodes_get_all(storage_struct))
-    write_other_data_to_file(f"step{step}_connections_authentic_walk.json",
-                             storage.connections_authentic_get(storage_struct))
-    write_other_data_to_file(f"step{step}_connections_synthetic_walk.json",
-                             storage.connections_synthetic_get(storage_struct))
-    write_other_data_to_file(f"step{step}_connections_null_walk.json",
-                             storage.connections_null_get(storage_struct))
-
     if frontier_connection is None:
         print("NO FRONTIER FOUND, EXPLORATION FINISHED")
         return
@@ -267,6 +268,10 @@ def exploration_by_metadata():
     while exploring:
         step += 1
         exploration_policy_autonomous_exploration_cheating(step)
+        if step % STORAGE_REPORT_EVERY_STEPS == 0:
+            print(storage.storage_report_format(storage.storage_report(storage_struct)))
+            print(storage_journal_stats_format(storage_journal_stats(storage_journal)))
 
 
 storage_struct: StorageStruct
+storage_journal: StorageJournal
@@ -1,6 +1,6 @@
-from src.navigation_core.pure_functions import check_connection_already_existing, build_connection_name
+from src.navigation_core.pure_functions import build_connection_name
 from src.runtime_storages.storage_struct import StorageStruct
-from typing import List, Callable
+from typing import List, Callable, Set
 from src import runtime_storages as storage
 
 from src.runtime_storages.types import NodeAuthenticData, ConnectionSyntheticData
@@ -11,6 +11,7 @@ def build_augmented_connections(storage_struct: StorageStruct,
                                 nodes_names: List[str]
                                 ) -> List[ConnectionSyntheticData]:
     synthetics_connections: List[ConnectionSyntheticData] = []
+    synthetics_connections_pairs: Set[frozenset] = set()
     found_connections: List[str] = []
 
     for idx, current_name in enumerate(nodes_names):
@@ -21,10 +22,9 @@ def build_augmented_connections(storage_struct: StorageStruct,
 
         valid_adjacent_nodes = []
         for adjacent_node in found_nodes:
-            if check_connection_already_existing(synthetics_connections, current_name, adjacent_node):
+            if frozenset((current_name, adjacent_node)) in synthetics_connections_pairs:
                 continue
-            if check_connection_already_existing(storage.connections_all_get(storage_struct), current_name,
-                                                 adjacent_node):
+            if storage.connection_exists(storage_struct, current_name, adjacent_node):
                 continue
             valid_adjacent_nodes.append(adjacent_node)
 
@@ -38,5 +38,6 @@ def build_augmented_connections(storage_struct: StorageStruct,
                 direction=None
             )
             synthetics_connections.append(connection)
+            synthetics_connections_pairs.add(frozenset((current_name, adjacent_node)))
 
     return synthetics_connections
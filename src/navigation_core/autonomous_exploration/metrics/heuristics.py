@@ -117,25 +117,7 @@ def find_adjacency_heuristic_adjacency_network(storage_struct: StorageStruct, da
 
 def find_adjacency_heuristic_by_metadata(storage_struct: StorageStruct, current_node: NodeAuthenticData) -> List[str]:
     current_name = current_node["name"]
+    x, y = storage.node_get_coords_metadata(storage_struct, current_name)
 
-    nodes_names = storage.nodes_get_all_names(storage_struct)
-    selected_names = []
-
-    for name in nodes_names:
-        if name == current_name:
-            continue
-        selected_names.append(name)
-
-    if len(selected_names) == 0:
-        return []
-
-    length = len(selected_names)
-    found_additional_connections = []
-    for i in range(length):
-        name = selected_names[i]
-
-        real_distance = storage.get_distance_between_nodes_metadata(storage_struct, current_name, name)
-        if real_distance < IS_CLOSE_THRESHOLD:
-            found_additional_connections.append(name)
-
-    return found_additional_connections
+    close_names = storage.nodes_get_close_to_xy(storage_struct, x, y, IS_CLOSE_THRESHOLD)
+    return [name for name in close_names if name != current_name]
@@ -4,4 +4,8 @@ STEP_DISTANCE_LOWER_BOUNDARY = STEP_DISTANCE / 2
 STEP_DISTANCE_UPPER_BOUNDARY = STEP_DISTANCE * 2
 
 NORTH = 0
+# the storage report walks everything the storage holds, so it is only logged every few steps
+STORAGE_REPORT_EVERY_STEPS = 10
+# journal of the explored map inside the other data folder, an interrupted exploration resumes from it
+EXPLORATION_JOURNAL_DIRECTORY = "exploration_journal"
 IS_CLOSE_THRESHOLD = STEP_DISTANCE * 2
@@ -4,18 +4,58 @@ from src.runtime_storages.storage_struct import StorageStruct
 from src import runtime_storages as storage
 from src.runtime_storages.types import NodeAuthenticData, ConnectionNullData, ConnectionSyntheticData, \
     ConnectionAuthenticData
-from src.save_load_handlers.data_handle import read_other_data_from_file
+from src.save_load_handlers.data_handle import read_map_from_file, is_map_file, get_other_data_path
+from src.save_load_handlers.json_stream import json_array_batches, node_from_json, JSON_STREAM_BATCH_SIZE
+from src.save_load_handlers.storage_journal import storage_journal_recover
+
+
+def _json_stream_create(storage_struct: StorageStruct, filename: str | None, create_function, batch_size: int,
+                        element_convert=None) -> None:
+    if filename is None:
+        return
+    with open(get_other_data_path(filename), "r") as file:
+        for batch in json_array_batches(file, batch_size):
+            if element_convert is not None:
+                batch = [element_convert(element) for element in batch]
+            create_function(storage_struct, batch)
 
 
 def load_storage_with_base_data(storage_struct: StorageStruct, nodes_filename: str,
-                                connections_authentic_filename: str, connections_synthetic_filename: str,
-                                connections_null_filename: str) -> None:
-    nodes: List[NodeAuthenticData] = read_other_data_from_file(nodes_filename)
-    connections_authentic = read_other_data_from_file(connections_authentic_filename)
-    connections_synthetic = read_other_data_from_file(connections_synthetic_filename)
-    connections_null = read_other_data_from_file(connections_null_filename)
-
-    storage.crud.create_nodes(storage=storage_struct, nodes=nodes)
-    storage.crud.create_connections_authentic(storage=storage_struct, new_connections=connections_authentic)
-    storage.crud.create_connections_synthetic(storage=storage_struct, new_connections=connections_synthetic)
-    storage.crud.create_connections_null(storage=storage_struct, new_connections=connections_null)
+                                connections_authentic_filename: str | None = None,
+                                connections_synthetic_filename: str | None = None,
+                                connections_null_filename: str | None = None, mmap: bool = False,
+                                batch_size: int = JSON_STREAM_BATCH_SIZE) -> None:
+    """
+    Loads either a binary map file, given alone as nodes_filename, or the nodes and the connections JSON files
+
+    With mmap the datapoints of a binary map are memory mapped and only read from the disk once accessed, which suits
+    the pipelines touching few of them. JSON files, legacy nodes included, are streamed into the storage batch_size
+    elements at a time, missing connections files standing for no connections
+    """
+    if is_map_file(nodes_filename):
+        nodes, connections_authentic, connections_synthetic, connections_null = read_map_from_file(nodes_filename,
+                                                                                                   mmap=mmap)
+        with storage.storage_transaction(storage_struct):
+            storage.crud.create_nodes(storage=storage_struct, nodes=nodes)
+            storage.crud.create_connections_authentic(storage=storage_struct, new_connections=connections_authentic)
+            storage.crud.create_connections_synthetic(storage=storage_struct, new_connections=connections_synthetic)
+            storage.crud.create_connections_null(storage=storage_struct, new_connections=connections_null)
+        return
+
+    if mmap:
+        raise ValueError(f"Only binary map files can be memory mapped, got {nodes_filename}")
+    with storage.storage_transaction(storage_struct):
+        _json_stream_create(storage_struct, nodes_filename, storage.crud.create_nodes, batch_size, node_from_json)
+        _json_stream_create(storage_struct, connections_authentic_filename,
+                            storage.crud.create_connections_authentic, batch_size)
+        _json_stream_create(storage_struct, connections_synthetic_filename,
+                            storage.crud.create_connections_synthetic, batch_size)
+        _json_stream_create(storage_struct, connections_null_filename, storage.crud.create_connections_null,
+                            batch_size)
+
+
+def load_storage_from_journal(storage_struct: StorageStruct, journal_directory: str, mmap: bool = False) -> None:
+    """
+    Loads the map a journal inside the other data folder holds, such as the exploration one, without journaling
+    """
+    storage_journal_recover(storage_struct, get_other_data_path(journal_directory), mmap=mmap)
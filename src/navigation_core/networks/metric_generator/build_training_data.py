@@ -11,13 +11,10 @@ from src import runtime_storages as storage
 
 
 def build_rotations_data(storage_struct: 'StorageStruct', training_data: 'MetricTrainingData') -> None:
-    rotations_array = []
+    # the dataset takes the nodes one at a time, so views of their datapoints spare copying the whole map every epoch
     node_names = storage.nodes_get_all_names(storage_struct)
-    for node_name in node_names:
-        node_data = storage.node_get_datapoints_tensor(storage_struct, node_name)
-        rotations_array.append(node_data)
-
-    training_data.rotations_array = rotations_array
+    training_data.rotations_array = [storage.node_get_datapoints_tensor_view(storage_struct, name) for name in
+                                     node_names]
 
 
 def build_walking_data(storage_struct: 'StorageStruct', training_data: 'MetricTrainingData') -> None:
@@ -53,20 +50,21 @@ def build_walking_data(storage_struct: 'StorageStruct', training_data: 'MetricTr
             datapoint_index=random_rotation_index_end
         ))
 
-    walking_batch_start = []
-    walking_batch_end = []
-    for i in range(length ** 2):
-        start_name = walking_batch_start_names[i]
-        start_index = walking_batch_start_metadata[i].datapoint_index
-        end_name = walking_batch_end_names[i]
-        end_index = walking_batch_end_metadata[i].datapoint_index
-
-        start_tensor = storage.node_get_datapoint_tensor_at_index(storage_struct, start_name, start_index)
-        end_tensor = storage.node_get_datapoint_tensor_at_index(storage_struct, end_name, end_index)
-        distance = storage.get_walk_distance(storage_struct, start_name, end_name)
+    walking_batch_start_block = storage.nodes_get_datapoint_tensors_at_indexes(
+        storage_struct,
+        walking_batch_start_names,
+        [metadata.datapoint_index for metadata in walking_batch_start_metadata]
+    )
+    walking_batch_end_block = storage.nodes_get_datapoint_tensors_at_indexes(
+        storage_struct,
+        walking_batch_end_names,
+        [metadata.datapoint_index for metadata in walking_batch_end_metadata]
+    )
+    walking_batch_start = list(walking_batch_start_block.unbind(0))
+    walking_batch_end = list(walking_batch_end_block.unbind(0))
 
-        walking_batch_start.append(start_tensor)
-        walking_batch_end.append(end_tensor)
+    for i in range(length ** 2):
+        distance = storage.get_walk_distance(storage_struct, walking_batch_start_names[i], walking_batch_end_names[i])
         walking_batch_distance.append(distance)
 
     training_data.walking_batch_start = walking_batch_start
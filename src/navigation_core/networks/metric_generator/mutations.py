@@ -35,13 +35,19 @@ def mutate_walking_data_rotations(storage_struct: 'StorageStruct', training_data
         end_new_index = random.randint(0, end_count_rotations - 1)
         if end_new_index == walking_end_metadata[i].datapoint_index:
             end_new_index = (end_new_index + 1) % end_count_rotations
-        start_name = walking_start_metadata[i].name
-        end_name = walking_end_metadata[i].name
 
-        start_new_data = runtime_storage.node_get_datapoint_tensor_at_index(storage_struct, start_name, start_new_index)
-        end_new_data = runtime_storage.node_get_datapoint_tensor_at_index(storage_struct, end_name, end_new_index)
-
-        walking_start[i] = start_new_data
-        walking_end[i] = end_new_data
         walking_start_metadata[i].datapoint_index = start_new_index
         walking_end_metadata[i].datapoint_index = end_new_index
+
+    start_new_data = runtime_storage.nodes_get_datapoint_tensors_at_indexes(
+        storage_struct,
+        [metadata.name for metadata in walking_start_metadata],
+        [metadata.datapoint_index for metadata in walking_start_metadata]
+    )
+    end_new_data = runtime_storage.nodes_get_datapoint_tensors_at_indexes(
+        storage_struct,
+        [metadata.name for metadata in walking_end_metadata],
+        [metadata.datapoint_index for metadata in walking_end_metadata]
+    )
+    walking_start[:] = start_new_data.unbind(0)
+    walking_end[:] = end_new_data.unbind(0)
@@ -12,12 +12,15 @@ from src.navigation_core.networks.metric_generator.training_params import Metric
     create_metric_training_params
 from src.save_load_handlers.ai_models_handle import save_ai_manually
 from src.utils.utils import get_device
+from src import runtime_storages as storage
 
 if TYPE_CHECKING:
     from src.runtime_storages import StorageStruct
 
 
 def train_metric_generator_network(storage_struct: 'StorageStruct', network: MetricNetwork):
+    # exploration can keep writing while the training data is built
+    storage_struct = storage.storage_snapshot(storage_struct)
     training_params: MetricTrainingParams = create_metric_training_params()
     training_data: MetricTrainingData = MetricTrainingData()
 
@@ -39,6 +39,27 @@ def build_connections_hashmap(connections: List[ConnectionAuthenticData | Connec
     return connections_hashmap
 
 
+def connections_hashmap_components(connections_hashmap: Dict) -> Dict[str, int]:
+    """
+    Labels every datapoint of the hashmap with its connected component
+    """
+    components: Dict[str, int] = {}
+    for root in connections_hashmap:
+        if root in components:
+            continue
+        label = len(components)
+        components[root] = label
+        stack = [root]
+        while len(stack) > 0:
+            current = stack.pop()
+            for connection in connections_hashmap.get(current, []):
+                if connection["end"] not in components:
+                    components[connection["end"]] = label
+                    stack.append(connection["end"])
+
+    return components
+
+
 def find_minimum_distance_between_datapoints_on_graph_djakstra(starting_point: str, ending_point: str,
                                                                connections_hashmap: Dict):
     """
@@ -96,7 +117,11 @@ def find_minimum_distance_between_datapoints_on_graph_bfs(starting_point: str, e
 
 def floyd_warshall_algorithm(connections_hashmap: Dict):
     """
-    Floyd-Warshall algorithm for finding all pairs shortest path
+    Floyd-Warshall algorithm for finding all pairs shortest path, ran inside each connected component since the pairs
+    across components stay infinite
+
+    The hashmap is built from a filtered list of connections rather than a storage, so its components are labeled here
+    instead of read from the components cache of the storage
     """
     nodes = list(connections_hashmap.keys())
     distances = {node: {node: float("inf") for node in nodes} for node in nodes}
@@ -108,11 +133,17 @@ def floyd_warshall_algorithm(connections_hashmap: Dict):
         for connection in connections_hashmap[node]:
             distances[node][connection["end"]] = connection["distance"]
 
+    components = connections_hashmap_components(connections_hashmap)
+    components_nodes: Dict[int, List[str]] = {}
+    for node in nodes:
+        components_nodes.setdefault(components[node], []).append(node)
+
     # pretty_display_set_and_start(len(nodes))
-    for idx, k in enumerate(nodes):
-        # pretty_display(idx)
-        for i in nodes:
-            for j in nodes:
-                distances[i][j] = min(distances[i][j], distances[i][k] + distances[k][j])
+    for component_nodes in components_nodes.values():
+        for idx, k in enumerate(component_nodes):
+            # pretty_display(idx)
+            for i in component_nodes:
+                for j in component_nodes:
+                    distances[i][j] = min(distances[i][j], distances[i][k] + distances[k][j])
 
     return distances
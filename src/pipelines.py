@@ -7,7 +7,8 @@ from src.agent_communication.communication_controller import set_response_event
 from src.configs_setup import config_simulation_communication
 from src.navigation_core.autonomous_exploration.exploration_by_metadata import exploration_by_metadata
 from src.navigation_core.autonomous_exploration.exploration_profiling import exploration_profiling
-from src.navigation_core.data_loading import load_storage_with_base_data
+from src.navigation_core.data_loading import load_storage_from_journal
+from src.navigation_core.autonomous_exploration.params import EXPLORATION_JOURNAL_DIRECTORY
 from src.navigation_core.networks.metric_generator import create_metric_network, train_metric_generator_network
 from src.runtime_storages.storage_struct import StorageStruct
 from src.visualizations.visualizations_static import visualization_3d_target_surface, visualization_topological_graph
@@ -56,41 +57,20 @@ def pipeline_navigation():
 
 def pipeline_visualization_metric3D():
     storage_struct = StorageStruct()
-    step = 10
-    load_storage_with_base_data(
-        storage_struct=storage_struct,
-        nodes_filename=f"step{step}_datapoints_walk.json",
-        connections_authentic_filename=f"step{step}_connections_authentic_walk.json",
-        connections_synthetic_filename=f"step{step}_connections_synthetic_walk.json",
-        connections_null_filename=f"step{step}_connections_null_walk.json"
-    )
+    load_storage_from_journal(storage_struct, EXPLORATION_JOURNAL_DIRECTORY, mmap=True)
     # also get the metric network here and pass it
     visualization_3d_target_surface(storage_struct, metric_network=None)
 
 
 def pipeline_visualization_topology():
     storage_struct = StorageStruct()
-    step = 10
-    load_storage_with_base_data(
-        storage_struct=storage_struct,
-        nodes_filename=f"step{step}_datapoints_walk.json",
-        connections_authentic_filename=f"step{step}_connections_authentic_walk.json",
-        connections_synthetic_filename=f"step{step}_connections_synthetic_walk.json",
-        connections_null_filename=f"step{step}_connections_null_walk.json"
-    )
+    load_storage_from_journal(storage_struct, EXPLORATION_JOURNAL_DIRECTORY, mmap=True)
     visualization_topological_graph(storage_struct)
 
 
 def pipeline_train_metric_network():
     storage_struct = StorageStruct()
-    step = 10
-    load_storage_with_base_data(
-        storage_struct=storage_struct,
-        nodes_filename=f"step{step}_datapoints_walk.json",
-        connections_authentic_filename=f"step{step}_connections_authentic_walk.json",
-        connections_synthetic_filename=f"step{step}_connections_synthetic_walk.json",
-        connections_null_filename=f"step{step}_connections_null_walk.json"
-    )
+    load_storage_from_journal(storage_struct, EXPLORATION_JOURNAL_DIRECTORY)
     metric_network = create_metric_network()
     train_metric_generator_network(storage_struct=storage_struct, network=metric_network)
     pass
@@ -1,4 +1,8 @@
 from .storage_struct import create_storage
+from .storage_snapshot import storage_snapshot, storage_snapshot_is_current
+from .storage_shared import storage_shared_export, storage_shared_attach, SharedStorageExport
+from .storage_report import storage_report, storage_report_format
+from .functions.transactions import storage_transaction
 from .functions.functionalities.get_walk_distance.functions import get_walk_distance
 from .functions.basic_functions import (
     connections_authentic_get,
@@ -9,12 +13,19 @@ from .functions.basic_functions import (
     connections_null_get,
     node_get_by_index,
     node_get_datapoint_tensor_at_index,
+    node_get_datapoint_tensor_view_at_index,
     node_get_datapoints_by_name,
     node_get_index_by_name,
     connections_all_get,
     connections_authentic_get,
     connections_classify_into_authentic_synthetic,
+    connection_exists,
+    connections_authentic_check_if_exists,
+    connections_synthetic_check_if_exists,
     node_get_datapoints_tensor,
+    node_get_datapoints_tensor_view,
+    nodes_get_datapoints_tensors,
+    nodes_get_datapoint_tensors_at_indexes,
     node_get_datapoints_count,
     node_get_coords_metadata,
     node_get_connections_adjacent,
@@ -23,8 +34,14 @@ from .functions.basic_functions import (
     get_direction_between_nodes_metadata,
     connections_synthetic_get,
     node_get_connections_null,
+    node_get_connections_all,
     node_get_closest_to_xy,
+    nodes_get_close_to_xy,
+    nodes_spatial_build_tree,
     nodes_get_all,
+    nodes_are_connected,
+    transformation_set,
+    transformation_data_apply,
 )
 
 from . import crud
@@ -39,22 +56,43 @@ __all__ = [
     "node_get_by_name",
     "node_get_by_index",
     "node_get_closest_to_xy",
+    "nodes_get_close_to_xy",
+    "nodes_spatial_build_tree",
     "node_get_coords_metadata",
     "node_get_connections_adjacent",
     "node_get_datapoint_tensor_at_index",
+    "node_get_datapoint_tensor_view_at_index",
     "node_get_datapoints_by_name",
     "node_get_index_by_name",
     "node_get_datapoints_tensor",
+    "node_get_datapoints_tensor_view",
+    "nodes_get_datapoints_tensors",
+    "nodes_get_datapoint_tensors_at_indexes",
     "node_get_datapoints_count",
     "connections_all_get",
     "connections_authentic_get",
     "node_get_connections_null",
+    "node_get_connections_all",
     "nodes_get_all",
+    "nodes_are_connected",
+    "transformation_set",
+    "transformation_data_apply",
     "get_walk_distance",
     "get_distance_between_nodes_metadata",
     "get_direction_between_nodes_metadata",
     "check_node_is_known_from_metadata",
     "connections_classify_into_authentic_synthetic",
+    "connection_exists",
+    "connections_authentic_check_if_exists",
+    "connections_synthetic_check_if_exists",
     "create_storage",
+    "storage_transaction",
+    "storage_snapshot",
+    "storage_snapshot_is_current",
+    "storage_shared_export",
+    "storage_shared_attach",
+    "SharedStorageExport",
+    "storage_report",
+    "storage_report_format",
     "crud",
 ]
@@ -1,9 +1,89 @@
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Dict, List, Set
+
+from src.runtime_storages.functions.memory_accounting import memory_size
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
 
 
 class CacheAbstract(ABC):
+    """
+    Caches are kept up to date eagerly by their subscribers, unless they are lazy
+
+    A lazy cache only marks itself dirty on mutations, optionally with the affected keys, and recalculates on the first
+    read after them. Every mutation which was not followed by its own recalculation counts as a recomputation avoided
+
+    Reads count a hit when the cache holds the answer and a miss when it doesn't (missing key, distances row not
+    computed yet). The counters are not locked, so they are approximate under concurrent readers
+    """
+    lazy: bool = False
+    dirty: bool = False
+    dirty_keys: List[any] | None = None
+    mutations_deferred: int = 0
+    recomputations: int = 0
+    hits: int = 0
+    misses: int = 0
+
     @abstractmethod
     def read(self, *args):
         pass
 
-    pass
+    def recalculate(self, storage: 'StorageStruct', keys: List[any] | None) -> None:
+        """
+        Brings a lazy cache up to date, keys being None means everything has to be recalculated
+        """
+        raise NotImplementedError(f"{type(self).__name__} can't be recalculated lazily")
+
+    def mark_dirty(self, keys: List[any] | None = None) -> None:
+        self.mutations_deferred += 1
+        if not self.dirty:
+            self.dirty = True
+            self.dirty_keys = []
+
+        if keys is None:
+            self.dirty_keys = None
+        elif self.dirty_keys is not None:
+            self.dirty_keys.extend(keys)
+
+    def refresh(self, storage: 'StorageStruct') -> None:
+        if not self.dirty:
+            return
+
+        keys = self.dirty_keys
+        self.dirty = False
+        self.dirty_keys = None
+        self.recomputations += 1
+        self.recalculate(storage, keys)
+
+    @property
+    def recomputations_avoided(self) -> int:
+        return self.mutations_deferred - self.recomputations
+
+    def lookup(self, mapping: Mapping, key: any) -> any:
+        """
+        Reads a key of one of the maps of the cache, counting the hit or the miss. A missing key raises KeyError
+        """
+        if key in mapping:
+            self.hits += 1
+            return mapping[key]
+        self.misses += 1
+        raise KeyError(key)
+
+    def size_bytes(self, seen: Set[any] | None = None) -> int:
+        """
+        Estimated memory held by the cache, without the objects in seen, see memory_size
+        """
+        return memory_size(vars(self), set() if seen is None else seen)
+
+    def stats(self, seen: Set[any] | None = None) -> Dict[str, any]:
+        return {
+            "bytes": self.size_bytes(seen),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recomputations": self.recomputations,
+            "recomputations_avoided": self.recomputations_avoided,
+            "lazy": self.lazy,
+            "dirty": self.dirty,
+        }
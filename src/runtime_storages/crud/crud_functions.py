@@ -1,254 +1,223 @@
 from typing import List, TYPE_CHECKING
-import copy
+import numpy as np
 from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData, ConnectionSyntheticData, \
-    ConnectionNullData
+    ConnectionNullData, CacheGeneralAlias
+from src.runtime_storages.functions.element_diffs import ElementDiff, element_apply_update
 from src.runtime_storages.functions.method_decorators import trigger_update_subscribers, \
     trigger_create_subscribers, \
     trigger_delete_subscribers
+from src.runtime_storages.other.cache_functions import cache_general_get
+from src.runtime_storages.general_cache.cache_nodes_indexes import validate_cache_nodes_indexes
+from src.runtime_storages.general_cache.cache_connections_indexes import validate_cache_connections_indexes
 from src.runtime_storages.types import DataAlias
 
 if TYPE_CHECKING:
     from src.runtime_storages import StorageStruct
 
 
+def _items_swap_remove(items: List[any], indexes: List[int]) -> List[any]:
+    """
+    Removes the items at the given indexes in O(k), by moving the last items into the freed slots
+    """
+    removed_items = [items[index] for index in indexes]
+    for index in sorted(indexes, reverse=True):
+        last_item = items.pop()
+        if index < len(items):
+            items[index] = last_item
+
+    return removed_items
+
+
+def _nodes_find_indexes(storage: 'StorageStruct', names: List[str]) -> List[int]:
+    indexes_map = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    indexes_map = validate_cache_nodes_indexes(indexes_map)
+
+    target_indexes = []
+    for name in names:
+        if name not in indexes_map.cache_map:
+            raise ValueError(f"Node with name {name} not found.")
+        target_indexes.append(indexes_map.read(node_name=name))
+
+    return target_indexes
+
+
+def _connections_find_indexes(storage: 'StorageStruct', data_alias: DataAlias, names: List[str]) -> List[
+    List[int]]:
+    indexes_map = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_INDEX_MAP)
+    indexes_map = validate_cache_connections_indexes(indexes_map)
+
+    target_indexes = []
+    for name in names:
+        if name not in indexes_map.cache_map[data_alias]:
+            raise ValueError(f"Connection with name {name} not found.")
+        target_indexes.append(list(indexes_map.read(data_alias, name)))
+
+    return target_indexes
+
+
+_NODE_FIELDS = ["name", "datapoints_array", "params"]
+_CONNECTION_FIELDS = ["name", "start", "end", "distance", "direction"]
+_ENDPOINT_FIELDS = ["start", "end"]
+
+
+def _connection_stored(storage: 'StorageStruct', connection: any) -> any:
+    """
+    The connection as the storage keeps it, a new dict whose endpoints naming existing nodes are the names the nodes
+    are stored with, so the one given by the caller is left as it is
+
+    Names loaded from JSON are distinct strings for every occurrence of a node, interning them through the nodes keeps
+    a single string per node alive and lets the name keyed caches compare them by identity
+    """
+    indexes_map = validate_cache_nodes_indexes(cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP))
+    stored_connection = dict(connection)
+    for field in _ENDPOINT_FIELDS:
+        index = indexes_map.cache_map.get(connection.get(field))
+        if index is not None:
+            stored_connection[field] = storage.nodes_authentic[index]["name"]
+    return stored_connection
+
+
+def _datapoints_array(datapoints: any) -> np.ndarray | None:
+    """
+    The datapoints as the float32 array the nodes hold them in, float32 arrays such as mapped rows aren't copied
+    """
+    if datapoints is None:
+        return None
+    return np.asarray(datapoints, dtype=np.float32)
+
+
+def _node_stored(node: NodeAuthenticData) -> NodeAuthenticData:
+    """
+    The node as the storage keeps it, a new dict so the one given by the caller is left as it is
+    """
+    return NodeAuthenticData(name=node.get("name"), datapoints_array=_datapoints_array(node.get("datapoints_array")),
+                             params=node.get("params"))
+
+
+def _nodes_update(storage: 'StorageStruct', indexes: List[int], updated_nodes: List[NodeAuthenticData]) -> tuple[
+    List[ElementDiff], List[NodeAuthenticData]]:
+    current_nodes = [storage.nodes_authentic[i] for i in indexes]
+    diffs = [element_apply_update(current_node, _node_stored(updated_node), _NODE_FIELDS) for
+             current_node, updated_node in zip(current_nodes, updated_nodes)]
+    return diffs, current_nodes
+
+
+def _connections_delete(storage: 'StorageStruct', data_alias: DataAlias, connections: List[any],
+                        names: List[str]) -> List[any]:
+    names = list(dict.fromkeys(names))
+    target_indexes = [index for indexes in _connections_find_indexes(storage, data_alias, names) for index in indexes]
+    return _items_swap_remove(connections, target_indexes)
+
+
+def _connections_update(storage: 'StorageStruct', data_alias: DataAlias, connections: List[any], names: List[str],
+                        updated_connections: List[any]) -> tuple[List[ElementDiff], List[any]]:
+    target_indexes = _connections_find_indexes(storage, data_alias, names)
+
+    current_connections = []
+    updates = []
+    for indexes, updated_connection in zip(target_indexes, updated_connections):
+        stored_update = _connection_stored(storage, updated_connection)
+        for index in indexes:
+            current_connections.append(connections[index])
+            updates.append(stored_update)
+
+    diffs = [element_apply_update(current_connection, updated_connection, _CONNECTION_FIELDS) for
+             current_connection, updated_connection in zip(current_connections, updates)]
+    return diffs, current_connections
+
+
 @trigger_create_subscribers(data_alias=DataAlias.NODE_AUTHENTIC,
                             )
 def create_nodes(storage: 'StorageStruct', nodes: List[NodeAuthenticData]) -> List[NodeAuthenticData]:
-    storage.nodes_authentic.extend(nodes)
-    return nodes
+    stored_nodes = [_node_stored(node) for node in nodes]
+    storage.nodes_authentic.extend(stored_nodes)
+    return stored_nodes
 
 
 @trigger_delete_subscribers(data_alias=DataAlias.NODE_AUTHENTIC,
                             )
 def delete_nodes(storage: 'StorageStruct', names: List[str]) -> List[NodeAuthenticData]:
-    target_indexes = []
-    for i, node in enumerate(storage.nodes_authentic):
-        if node["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Node with name {names} not found.")
-
-    deleted_nodes = [storage.nodes_authentic[i] for i in target_indexes]
-    for i in target_indexes:
-        del storage.nodes_authentic[i]
-
-    return deleted_nodes
+    """
+    Deletes the nodes in O(k), the last nodes are moved in the freed slots so the nodes order is not preserved
+    """
+    target_indexes = _nodes_find_indexes(storage, list(dict.fromkeys(names)))
+    return _items_swap_remove(storage.nodes_authentic, target_indexes)
 
 
 @trigger_update_subscribers(data_alias=DataAlias.NODE_AUTHENTIC,
                             )
 def update_nodes_by_index(storage: 'StorageStruct', indexes: List[int], updated_nodes: List[NodeAuthenticData]) -> \
         tuple[
-            List[any], List[any]]:
-    current_nodes = [storage.nodes_authentic[i] for i in indexes]
-    current_nodes_copy = copy.deepcopy(current_nodes)
-
-    for i, index in enumerate(indexes):
-        new_node = updated_nodes[i]
-        old_node = current_nodes[i]
-        if new_node["name"] is not None:
-            old_node["name"] = new_node["name"]
-        if new_node["datapoints_array"] is not None:
-            old_node["datapoints_array"] = new_node["datapoints_array"]
-        if new_node["params"] is not None:
-            old_node["params"] = new_node["params"]
-
-    return current_nodes_copy, current_nodes
+            List[ElementDiff], List[any]]:
+    return _nodes_update(storage, indexes, updated_nodes)
 
 
 @trigger_update_subscribers(data_alias=DataAlias.NODE_AUTHENTIC,
                             )
 def update_nodes_by_name(storage: 'StorageStruct', names: List[str], updated_nodes: List[NodeAuthenticData]) -> tuple[
-    List[any], List[any]]:
-    target_indexes = []
-    for i, node in enumerate(storage.nodes_authentic):
-        if node["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Node with name {names} not found.")
-
-    current_nodes = [storage.nodes_authentic[i] for i in target_indexes]
-    current_nodes_copy = copy.deepcopy(current_nodes)
-
-    for i, index in enumerate(target_indexes):
-        new_node = updated_nodes[i]
-        old_node = current_nodes[i]
-        if new_node["name"] is not None:
-            old_node["name"] = new_node["name"]
-        if new_node["datapoints_array"] is not None:
-            old_node["datapoints_array"] = new_node["datapoints_array"]
-        if new_node["params"] is not None:
-            old_node["params"] = new_node["params"]
-
-    return current_nodes_copy, current_nodes
+    List[ElementDiff], List[any]]:
+    return _nodes_update(storage, _nodes_find_indexes(storage, names), updated_nodes)
 
 
 @trigger_create_subscribers(data_alias=DataAlias.CONNECTIONS_AUTHENTIC,
                             )
 def create_connections_authentic(storage: 'StorageStruct', new_connections: List[ConnectionAuthenticData]) -> List[
     ConnectionAuthenticData]:
-    storage.connections_authentic.extend(new_connections)
-    return new_connections
+    stored_connections = [_connection_stored(storage, connection) for connection in new_connections]
+    storage.connections_authentic.extend(stored_connections)
+    return stored_connections
 
 
 @trigger_delete_subscribers(data_alias=DataAlias.CONNECTIONS_AUTHENTIC,
                             )
-def delete_connections_authentic(storage, names: str) -> List[ConnectionAuthenticData]:
-    target_indexes = []
-    for i, connection in enumerate(storage.connections_authentic):
-        if connection["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Not all connections found to delete.")
-
-    deleted_connections = [storage.connections_authentic[i] for i in target_indexes]
-    for i in target_indexes:
-        del storage.connections_authentic[i]
-
-    return deleted_connections
+def delete_connections_authentic(storage, names: List[str]) -> List[ConnectionAuthenticData]:
+    return _connections_delete(storage, DataAlias.CONNECTIONS_AUTHENTIC, storage.connections_authentic, names)
 
 
 @trigger_update_subscribers(data_alias=DataAlias.CONNECTIONS_AUTHENTIC,
                             )
 def update_connections_authentic(storage: 'StorageStruct', names: List[str],
                                  updated_connections: List[ConnectionAuthenticData]) -> tuple[List[any], List[any]]:
-    target_indexes = []
-    for i, connection in enumerate(storage.connections_authentic):
-        if connection["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Not all connections found to update.")
-
-    current_connections = [storage.connections_authentic[i] for i in target_indexes]
-    current_connections_copy = copy.deepcopy(current_connections)
-
-    for i, index in enumerate(target_indexes):
-        new_connection = updated_connections[i]
-        old_connection = current_connections[i]
-        if new_connection["name"] is not None:
-            old_connection["name"] = new_connection["name"]
-        if new_connection["start"] is not None:
-            old_connection["start"] = new_connection["start"]
-        if new_connection["end"] is not None:
-            old_connection["end"] = new_connection["end"]
-        if new_connection["distance"] is not None:
-            old_connection["distance"] = new_connection["distance"]
-        if new_connection["direction"] is not None:
-            old_connection["direction"] = new_connection["direction"]
-
-    return current_connections_copy, current_connections
+    return _connections_update(storage, DataAlias.CONNECTIONS_AUTHENTIC, storage.connections_authentic, names,
+                               updated_connections)
 
 
 @trigger_create_subscribers(data_alias=DataAlias.CONNECTIONS_SYNTHETIC)
 def create_connections_synthetic(storage, new_connections: List[ConnectionSyntheticData]) -> List[
     ConnectionSyntheticData]:
-    storage.connections_synthetic.extend(new_connections)
-    return new_connections
+    stored_connections = [_connection_stored(storage, connection) for connection in new_connections]
+    storage.connections_synthetic.extend(stored_connections)
+    return stored_connections
 
 
 @trigger_delete_subscribers(data_alias=DataAlias.CONNECTIONS_SYNTHETIC)
 def delete_connections_synthetic(storage, names: List[str]) -> List[ConnectionSyntheticData]:
-    target_indexes = []
-    for i, connection in enumerate(storage.connections_synthetic):
-        if connection["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Not all connections found to delete.")
-
-    deleted_connections = [storage.connections_synthetic[i] for i in target_indexes]
-    for i in target_indexes:
-        del storage.connections_synthetic[i]
-
-    return deleted_connections
+    return _connections_delete(storage, DataAlias.CONNECTIONS_SYNTHETIC, storage.connections_synthetic, names)
 
 
 @trigger_update_subscribers(data_alias=DataAlias.CONNECTIONS_SYNTHETIC)
 def update_connections_synthetic(storage, names: List[str], updated_connections: List[ConnectionSyntheticData]) -> \
         tuple[
             List[any], List[any]]:
-    target_indexes = []
-    for i, connection in enumerate(storage.connections_synthetic):
-        if connection["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Not all connections found to update.")
-
-    current_connections = [storage.connections_synthetic[i] for i in target_indexes]
-    current_connections_copy = copy.deepcopy(current_connections)
-
-    for i, index in enumerate(target_indexes):
-        new_connection = updated_connections[i]
-        old_connection = current_connections[i]
-        if new_connection["name"] is not None:
-            old_connection["name"] = new_connection["name"]
-        if new_connection["start"] is not None:
-            old_connection["start"] = new_connection["start"]
-        if new_connection["end"] is not None:
-            old_connection["end"] = new_connection["end"]
-        if new_connection["distance"] is not None:
-            old_connection["distance"] = new_connection["distance"]
-        if new_connection["direction"] is not None:
-            old_connection["direction"] = new_connection["direction"]
-
-    return current_connections_copy, current_connections
+    return _connections_update(storage, DataAlias.CONNECTIONS_SYNTHETIC, storage.connections_synthetic, names,
+                               updated_connections)
 
 
 @trigger_create_subscribers(data_alias=DataAlias.CONNECTIONS_NULL)
 def create_connections_null(storage: 'StorageStruct', new_connections: List[ConnectionNullData]) -> List[
     ConnectionNullData]:
-    storage.connections_null.extend(new_connections)
-    return new_connections
+    stored_connections = [_connection_stored(storage, connection) for connection in new_connections]
+    storage.connections_null.extend(stored_connections)
+    return stored_connections
 
 
 @trigger_delete_subscribers(data_alias=DataAlias.CONNECTIONS_NULL)
-def delete_connections_null(storage, names: List[str]) -> List[ConnectionAuthenticData]:
-    target_indexes = []
-    for i, connection in enumerate(storage.connections_null):
-        if connection["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Not all connections found to delete.")
-
-    deleted_connections = [storage.connections_null[i] for i in target_indexes]
-    for i in target_indexes:
-        del storage.connections_null[i]
-
-    return deleted_connections
+def delete_connections_null(storage, names: List[str]) -> List[ConnectionNullData]:
+    return _connections_delete(storage, DataAlias.CONNECTIONS_NULL, storage.connections_null, names)
 
 
 @trigger_update_subscribers(data_alias=DataAlias.CONNECTIONS_NULL)
-def update_connections_null(storage, names: List[str], updated_connections: List[ConnectionAuthenticData]) -> tuple[
+def update_connections_null(storage, names: List[str], updated_connections: List[ConnectionNullData]) -> tuple[
     List[any], List[any]]:
-    target_indexes = []
-    for i, connection in enumerate(storage.connections_null):
-        if connection["name"] in names:
-            target_indexes.append(i)
-
-    if len(target_indexes) != len(names):
-        raise ValueError(f"Not all connections found to update.")
-
-    current_connections = [storage.connections_null[i] for i in target_indexes]
-    current_connections_copy = copy.deepcopy(current_connections)
-
-    for i, index in enumerate(target_indexes):
-        new_connection = updated_connections[i]
-        old_connection = current_connections[i]
-        if new_connection["name"] is not None:
-            old_connection["name"] = new_connection["name"]
-        if new_connection["start"] is not None:
-            old_connection["start"] = new_connection["start"]
-        if new_connection["end"] is not None:
-            old_connection["end"] = new_connection["end"]
-        if new_connection["distance"] is not None:
-            old_connection["distance"] = new_connection["distance"]
-        if new_connection["direction"] is not None:
-            old_connection["direction"] = new_connection["direction"]
-
-    return current_connections_copy, current_connections
+    return _connections_update(storage, DataAlias.CONNECTIONS_NULL, storage.connections_null, names,
+                               updated_connections)
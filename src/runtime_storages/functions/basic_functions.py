@@ -1,52 +1,78 @@
-from typing import List, TYPE_CHECKING
+from types import MappingProxyType
+from typing import List, Mapping, Tuple, TYPE_CHECKING
 import numpy as np
 import random
 import torch
 from src.navigation_core.autonomous_exploration.params import IS_CLOSE_THRESHOLD
-from src.navigation_core.pure_functions import calculate_coords_distance, connection_reverse_order
+from src.navigation_core.pure_functions import connection_reverse_order
 from src.runtime_storages.functions.pure_functions import eulerian_distance
 from src.runtime_storages.crud.crud_functions import update_nodes_by_index
+from src.runtime_storages.functions.method_decorators import memoize_read, storage_read, storage_write
 from src.runtime_storages.general_cache.cache_nodes_map import validate_cache_nodes_map
 from src.runtime_storages.general_cache.cache_nodes_indexes import \
     validate_cache_nodes_indexes
+from src.runtime_storages.general_cache.cache_nodes_tensor import validate_cache_nodes_tensor
+from src.runtime_storages.general_cache import cache_nodes_spatial
+from src.runtime_storages.general_cache.cache_nodes_spatial import validate_cache_nodes_spatial
+from src.runtime_storages.general_cache.cache_connections_adjacency import validate_cache_connections_adjacency
+from src.runtime_storages.general_cache.cache_connections_pairs import validate_cache_connections_pairs
+from src.runtime_storages.general_cache.cache_connections_components import validate_cache_connections_components
 from src.runtime_storages.other import cache_general_get
 from src.runtime_storages.types import ConnectionAuthenticData, NodeAuthenticData, CacheGeneralAlias, \
-    ConnectionNullData, ConnectionSyntheticData, Coords
-from src.utils.utils import array_to_tensor
+    ConnectionNullData, ConnectionSyntheticData, Coords, DataAlias
 from src.visualizations.visualization_storage.types import NodesMapping
 
 if TYPE_CHECKING:
     from src.runtime_storages.storage_struct import StorageStruct
 
+# upper bound of the datapoints transformed in one call
+TRANSFORMATION_CHUNK_BYTES = 256 * 2 ** 20
 
+
+@storage_read
 def connections_synthetic_get(storage: 'StorageStruct') -> List[
     ConnectionSyntheticData]:
     return storage.connections_synthetic
 
 
+@storage_read
 def connections_null_get(storage: 'StorageStruct') -> List[ConnectionNullData]:
     return storage.connections_null
 
 
+@storage_read
 def connections_authentic_get(storage: 'StorageStruct') -> List[
     ConnectionAuthenticData]:
     return storage.connections_authentic
 
 
-def nodes_get_all_names(storage: 'StorageStruct') -> List[str]:
-    # OPTIMIZATION: cache
-    return [item["name"] for item in storage.nodes_authentic]
+@memoize_read(DataAlias.NODE_AUTHENTIC)
+def nodes_get_all_names(storage: 'StorageStruct') -> Tuple[str, ...]:
+    return tuple(item["name"] for item in storage.nodes_authentic)
 
 
+@storage_read
 def nodes_get_all(storage: 'StorageStruct') -> List[NodeAuthenticData]:
     return storage.nodes_authentic
 
 
-def nodes_get_datapoints_arrays(storage: 'StorageStruct') -> List[any]:
-    # OPTIMIZATION: cache
-    return [item["datapoints_array"] for item in storage.nodes_authentic]
+def _array_read_only(array: np.ndarray | None) -> np.ndarray | None:
+    if array is None:
+        return None
+    view = array.view()
+    view.setflags(write=False)
+    return view
+
+
+@memoize_read(DataAlias.NODE_AUTHENTIC)
+def nodes_get_datapoints_arrays(storage: 'StorageStruct') -> Tuple[np.ndarray, ...]:
+    """
+    Read only views of the datapoints of the nodes
+    """
+    return tuple(_array_read_only(item["datapoints_array"]) for item in storage.nodes_authentic)
 
 
+@storage_read
 def connections_authentic_sample(storage, sample_size: int) -> List[ConnectionAuthenticData]:
     return random.sample(
         population=storage.connections_authentic,
@@ -54,32 +80,44 @@ def connections_authentic_sample(storage, sample_size: int) -> List[ConnectionAu
     )
 
 
+@storage_read
 def node_get_by_name(storage: 'StorageStruct', name: str) -> NodeAuthenticData:
     cache_map = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
     cache_map = validate_cache_nodes_map(cache_map)
     return cache_map.read(node_name=name)
 
 
+@storage_read
 def node_get_by_index(storage: 'StorageStruct', index: int) -> NodeAuthenticData:
     return storage.nodes_authentic[index]
 
 
+@storage_read
 def node_get_datapoint_tensor_at_index(storage: 'StorageStruct', node_name: str, datapoint_index: int) -> torch.Tensor:
-    # OPTIMIZATION: specialized cache to cache tensor conversions
+    return node_get_datapoint_tensor_view_at_index(storage, node_name, datapoint_index).clone()
 
-    node_map = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
-    node_map = validate_cache_nodes_map(node_map)
-    node: NodeAuthenticData = node_map.read(node_name=node_name)
-    return torch.tensor(node["datapoints_array"][datapoint_index], dtype=torch.float32)
+
+@storage_read
+def node_get_datapoint_tensor_view_at_index(storage: 'StorageStruct', node_name: str,
+                                            datapoint_index: int) -> torch.Tensor:
+    """
+    Returns a view of the datapoints the node holds, without copying them. It keeps showing the datapoints the node had
+    when it was read, and must not be written into
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    cache = validate_cache_nodes_tensor(cache)
+    return cache.read(node_name=node_name)[datapoint_index]
 
 
-def node_get_datapoints_by_name(storage: 'StorageStruct', name: str) -> list:
+@storage_read
+def node_get_datapoints_by_name(storage: 'StorageStruct', name: str) -> np.ndarray:
     node_map = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
     node_map = validate_cache_nodes_map(node_map)
     node: NodeAuthenticData = node_map.read(node_name=name)
     return node["datapoints_array"]
 
 
+@storage_read
 def node_get_index_by_name(storage: 'StorageStruct', name: str) -> int:
     indexes_map = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
     indexes_map = validate_cache_nodes_indexes(indexes_map)
@@ -91,15 +129,45 @@ def node_get_index_by_name(storage: 'StorageStruct', name: str) -> int:
     return index
 
 
+@storage_read
 def node_get_datapoints_tensor(storage: 'StorageStruct', name: str) -> torch.Tensor:
-    # OPTIMIZATION: cache for tensor conversion
-    cache = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
-    cache = validate_cache_nodes_map(cache)
+    return node_get_datapoints_tensor_view(storage, name).clone()
 
-    node = cache.read(node_name=name)
-    return torch.tensor(node["datapoints_array"], dtype=torch.float32)
 
+@storage_read
+def node_get_datapoints_tensor_view(storage: 'StorageStruct', name: str) -> torch.Tensor:
+    """
+    Returns a view of the datapoints the node holds, without copying them. It keeps showing the datapoints the node had
+    when it was read, and must not be written into
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    cache = validate_cache_nodes_tensor(cache)
+    return cache.read(node_name=name)
+
+
+@storage_read
+def nodes_get_datapoints_tensors(storage: 'StorageStruct', names: List[str]) -> torch.Tensor:
+    """
+    Gathers the datapoints of all the given nodes in a single (nodes, rotations, embedding) tensor, a new one since the
+    nodes hold their datapoints apart. Callers going through the nodes one at a time use node_get_datapoints_tensor_view
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    cache = validate_cache_nodes_tensor(cache)
+    return cache.read_rows(nodes_names=names)
+
+
+@storage_read
+def nodes_get_datapoint_tensors_at_indexes(storage: 'StorageStruct', names: List[str],
+                                           datapoints_indexes: List[int]) -> torch.Tensor:
+    """
+    Gathers one datapoint for each given node in a single (nodes, embedding) tensor
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    cache = validate_cache_nodes_tensor(cache)
+    return cache.read_rows_at_indexes(nodes_names=names, datapoints_indexes=datapoints_indexes)
 
+
+@storage_read
 def node_get_coords_metadata(storage: 'StorageStruct', name: str) -> list[float]:
     cache_node_map = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
     cache_node_map = validate_cache_nodes_map(cache_node_map)
@@ -107,22 +175,37 @@ def node_get_coords_metadata(storage: 'StorageStruct', name: str) -> list[float]
     return [node["params"]["x"], node["params"]["y"]]
 
 
+@storage_read
 def node_get_closest_to_xy(storage: 'StorageStruct', target_x: float, target_y: float) -> str:
-    closest_datapoint = None
-    closest_distance = float('inf')
+    cache = cache_general_get(storage, CacheGeneralAlias.NODES_SPATIAL)
+    cache = validate_cache_nodes_spatial(cache)
+    return cache.read_nearest(target_x, target_y)
+
+
+@storage_read
+def nodes_get_close_to_xy(storage: 'StorageStruct', target_x: float, target_y: float,
+                          radius: float = IS_CLOSE_THRESHOLD) -> List[str]:
+    """
+    Nodes strictly closer than the radius to the target, in the order they are stored
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.NODES_SPATIAL)
+    cache = validate_cache_nodes_spatial(cache)
+    indexes_map = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    indexes_map = validate_cache_nodes_indexes(indexes_map)
+
+    names = cache.read_within_radius(target_x, target_y, radius)
+    return sorted(names, key=lambda name: indexes_map.read(node_name=name))
 
-    for item in storage.nodes_authentic:
-        name = item["name"]
-        coords = node_get_coords_metadata(storage, name)
-        x, y = coords
-        distance = eulerian_distance(x, y, target_x, target_y)
-        if distance < closest_distance:
-            closest_distance = distance
-            closest_datapoint = name
 
-    return closest_datapoint
+@storage_write
+def nodes_spatial_build_tree(storage: 'StorageStruct') -> None:
+    """
+    For maps which are done changing, switches the spatial queries to a KD-tree until the next mutation of the nodes
+    """
+    cache_nodes_spatial.build_tree(storage)
 
 
+@storage_read
 def node_get_datapoint_tensor_at_index_noisy(storage: 'StorageStruct', name: str, index: int,
                                              deviation: int = 1) -> torch.Tensor:
     deviation = random.randint(-deviation, deviation)
@@ -137,6 +220,7 @@ def node_get_datapoint_tensor_at_index_noisy(storage: 'StorageStruct', name: str
     return node_get_datapoint_tensor_at_index(storage, name, index)
 
 
+@storage_read
 def get_direction_between_nodes_metadata(storage: 'StorageStruct', start_node_name: str, end_node_name: str) -> list[
     float]:
     start_coords = node_get_coords_metadata(storage, start_node_name)
@@ -148,6 +232,7 @@ def get_direction_between_nodes_metadata(storage: 'StorageStruct', start_node_na
     return [dirx, diry]
 
 
+@storage_read
 def get_distance_between_nodes_metadata(storage: 'StorageStruct', start_node_name: str, end_node_name: str) -> float:
     start_coords = node_get_coords_metadata(storage, start_node_name)
     end_coords = node_get_coords_metadata(storage, end_node_name)
@@ -157,6 +242,7 @@ def get_distance_between_nodes_metadata(storage: 'StorageStruct', start_node_nam
     return eulerian_distance(xs, ys, xe, ye)
 
 
+@storage_read
 def node_get_datapoint_tensor_at_random(storage: 'StorageStruct', name: str) -> any:
     node_map = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
     node_map = validate_cache_nodes_map(node_map)
@@ -166,91 +252,95 @@ def node_get_datapoint_tensor_at_random(storage: 'StorageStruct', name: str) ->
     return node_get_datapoint_tensor_at_index(storage, name, index)
 
 
-def connections_all_get(storage: 'StorageStruct') -> List[
-    ConnectionAuthenticData | ConnectionSyntheticData]:
-    found_connections = []
-
-    connections_authentic = storage.connections_authentic
-    connections_synthetic = storage.connections_synthetic
-    found_connections.extend(connections_authentic)
-    found_connections.extend(connections_synthetic)
-
-    return found_connections
-
-
-def _connection_reorder(connection: ConnectionAuthenticData | ConnectionSyntheticData,
-                        start_name: str) -> ConnectionAuthenticData:
-    if connection["start"] == start_name:
-        return connection
-    if connection["end"] == start_name:
-        connection_copy = connection.copy()
-        direction = connection_copy["direction"]
-        direction[0] = -direction[0]
-        direction[1] = -direction[1]
-
-        aux = connection_copy["start"]
-        connection_copy["start"] = connection_copy["end"]
-        connection_copy["end"] = aux
-        connection_copy["direction"] = direction
-
-        return connection_copy
+@memoize_read(DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC)
+def connections_all_get(storage: 'StorageStruct') -> Tuple[Mapping[str, any], ...]:
+    """
+    Read only views of the authentic and synthetic connections, they show the connections as the storage holds them
+    """
+    return tuple(MappingProxyType(connection) for connection in storage.connections_authentic) + tuple(
+        MappingProxyType(connection) for connection in storage.connections_synthetic)
 
 
+@storage_read
 def node_get_connections_all(storage: 'StorageStruct', node_name: str) -> List[
     ConnectionAuthenticData | ConnectionSyntheticData]:
+    """
+    Returns the authentic and synthetic connections of the node, the ones ending in it being reordered to start from it
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    cache = validate_cache_connections_adjacency(cache)
+
     found_connections = []
-    connections_authentic = storage.connections_authentic
-    connections_synthetic = storage.connections_synthetic
-    all_connections = []
-    all_connections.extend(connections_authentic)
-    all_connections.extend(connections_synthetic)
-
-    # OPTIMIZATION cache
-    for connection in all_connections:
-        start = connection["start"]
-        end = connection["end"]
-        if start == node_name or end == node_name:
-            connection_reordered = _connection_reorder(connection, node_name)
-            found_connections.append(connection_reordered)
+    for data_alias in [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]:
+        found_connections.extend(cache.read(data_alias, node_name))
+        for connection in cache.read_reversed(data_alias, node_name):
+            if connection["start"] != node_name:
+                found_connections.append(connection_reverse_order(connection))
 
     return found_connections
 
 
+@storage_read
 def node_get_connections_null(storage: 'StorageStruct', datapoint_name: str) -> List[ConnectionNullData]:
-    # OPTIMIZATION cache
-    found_connections = []
-    connections_data = storage.connections_null
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    cache = validate_cache_connections_adjacency(cache)
+    return cache.read(DataAlias.CONNECTIONS_NULL, datapoint_name)
 
-    for connection in connections_data:
-        start = connection["start"]
-        if start == datapoint_name:
-            found_connections.append(connection)
 
-    return found_connections
+def nodes_are_connected(storage: 'StorageStruct', start_node: str, end_node: str) -> bool:
+    """
+    Whether a walk exists between the nodes through authentic and synthetic connections, in O(α(N))
+    """
+    with storage.lock.read(), storage.lazy_caches_lock:
+        cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_COMPONENTS)
+        cache = validate_cache_connections_components(cache)
+        cache.refresh(storage)
+        return cache.read(node_get_index_by_name(storage, start_node), node_get_index_by_name(storage, end_node))
 
 
+@storage_write
 def transformation_set(storage: 'StorageStruct', transformation: any):
     storage.transformation = transformation
 
 
-def transformation_data_apply(storage: 'StorageStruct') -> None:
-    nodes: List[NodeAuthenticData] = storage.nodes_authentic
+@storage_write
+def transformation_data_apply(storage: 'StorageStruct', chunk_bytes: int = TRANSFORMATION_CHUNK_BYTES) -> None:
+    """
+    Replaces the datapoints of every node by their transformation, in a single update of all the nodes
+
+    The datapoints are taken from the nodes tensor in chunks of at most chunk_bytes, each chunk being transformed in one
+    call as a (datapoints, embedding) batch, the shape a single node used to be transformed with
+    """
     transformation = storage.transformation
+    if transformation is None:
+        raise ValueError("No transformation is set on the storage")
+    nodes: List[NodeAuthenticData] = storage.nodes_authentic
+    if len(nodes) == 0:
+        return
+
+    cache = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    cache = validate_cache_nodes_tensor(cache)
+    chunk_rows = max(1, chunk_bytes // nodes[0]["datapoints_array"].nbytes)
+
+    names = [node["name"] for node in nodes]
+    transformed_datapoints = []
+    with torch.inference_mode():
+        for start in range(0, len(nodes), chunk_rows):
+            chunk = cache.read_rows(names[start:start + chunk_rows])
+            transformed = transformation(chunk.reshape(-1, chunk.shape[-1]))
+            transformed_datapoints.extend(transformed.reshape(chunk.shape[0], chunk.shape[1], -1).cpu().numpy())
 
-    for index, node in enumerate(nodes):
-        data_tensor = array_to_tensor(node["datapoints_array"])
-        transformed_data = transformation(data_tensor).tolist()
-        update_nodes_by_index(
-            storage=storage,
-            index=index,
-            new_data=transformed_data,
-        )
+    updated_nodes = [NodeAuthenticData(name=node["name"], datapoints_array=datapoints, params=None) for
+                     node, datapoints in zip(nodes, transformed_datapoints)]
+    update_nodes_by_index(storage, list(range(len(nodes))), updated_nodes)
 
 
+@storage_read
 def node_get_name_at_index(storage: 'StorageStruct', index: int) -> str:
     return storage.nodes_authentic[index]["name"]
 
 
+@storage_read
 def node_get_datapoints_count(storage: 'StorageStruct', name: str) -> int:
     node_map = cache_general_get(storage, CacheGeneralAlias.NODE_CACHE_MAP)
     node_map = validate_cache_nodes_map(node_map)
@@ -258,57 +348,66 @@ def node_get_datapoints_count(storage: 'StorageStruct', name: str) -> int:
     return len(node["datapoints_array"])
 
 
+@storage_read
 def check_node_is_known_from_metadata(storage: 'StorageStruct', current_coords: list[float]) -> bool:
     """
     Check if the current coordinates are close to any known
     """
-    nodes_names = nodes_get_all_names(storage)
-    for name in nodes_names:
-        coords = node_get_coords_metadata(storage, name)
-        calculate_coords_distance(coords, current_coords)
-        if calculate_coords_distance(coords, current_coords) < IS_CLOSE_THRESHOLD:
-            return True
-
-    return False
+    cache = cache_general_get(storage, CacheGeneralAlias.NODES_SPATIAL)
+    cache = validate_cache_nodes_spatial(cache)
+    return len(cache.read_within_radius(current_coords[0], current_coords[1], IS_CLOSE_THRESHOLD)) > 0
 
 
+@storage_read
 def node_get_connections_adjacent(storage: 'StorageStruct', node_name: str) -> List[
     ConnectionAuthenticData | ConnectionSyntheticData]:
-    # OPTIMIZATION cache
+    """
+    Returns copies of the authentic and synthetic connections of the node, all of them starting from it
+    """
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    cache = validate_cache_connections_adjacency(cache)
 
     found_connections = []
-    total_connections = connections_all_get(storage)
-
-    for connection in total_connections:
-        start = connection["start"]
-        end = connection["end"]
-
-        if start == node_name:
+    for data_alias in [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]:
+        for connection in cache.read(data_alias, node_name):
             found_connections.append(connection.copy())
-        elif end == node_name:
-            connection_copy = connection.copy()
-            reversed_connection = connection_reverse_order(connection_copy)
-            found_connections.append(reversed_connection)
+        for connection in cache.read_reversed(data_alias, node_name):
+            if connection["start"] != node_name:
+                found_connections.append(connection_reverse_order(connection.copy()))
 
     return found_connections
 
 
-def connections_authentic_check_if_exists(storage: 'StorageStruct', start: str, end: str) -> bool:
-    for connection in storage.connections_authentic:
-        if connection["start"] == start and connection["end"] == end:
+@storage_read
+def connection_exists(storage: 'StorageStruct', start: str, end: str, data_aliases: List[DataAlias] = None,
+                      directed: bool = False) -> bool:
+    """
+    Checks if a connection between the two nodes exists among the given connection kinds (authentic and synthetic by
+    default). Unless directed, a connection from end to start counts as well
+    """
+    if data_aliases is None:
+        data_aliases = [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]
+
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_PAIRS)
+    cache = validate_cache_connections_pairs(cache)
+    for data_alias in data_aliases:
+        if cache.read(data_alias, start, end, directed=directed):
             return True
 
     return False
 
 
-def connections_synthetic_check_if_exists(storage: 'StorageStruct', start: str, end: str) -> bool:
-    for connection in storage.connections_synthetic:
-        if connection["start"] == start and connection["end"] == end:
-            return True
+@storage_read
+def connections_authentic_check_if_exists(storage: 'StorageStruct', start: str, end: str) -> bool:
+    return connection_exists(storage, start, end, data_aliases=[DataAlias.CONNECTIONS_AUTHENTIC], directed=True)
 
-    return False
+
+@storage_read
+def connections_synthetic_check_if_exists(storage: 'StorageStruct', start: str, end: str) -> bool:
+    return connection_exists(storage, start, end, data_aliases=[DataAlias.CONNECTIONS_SYNTHETIC], directed=True)
 
 
+@storage_read
 def connections_classify_into_authentic_synthetic(storage: 'StorageStruct', connections: List[
     ConnectionAuthenticData | ConnectionSyntheticData]) -> tuple[
     List[ConnectionAuthenticData], List[ConnectionSyntheticData]]:
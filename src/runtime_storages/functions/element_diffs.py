@@ -0,0 +1,84 @@
+from collections.abc import Mapping
+from typing import Dict, List, Tuple
+
+FieldChange = Tuple[any, any]
+
+
+class ElementDiff(Mapping):
+    """
+    Old state of an element updated in place, given to the update subscribers instead of a copy of the element
+
+    Only the changed fields keep their old and new values, the rest is read from the live element. Values are shared by
+    reference since updates replace fields and never mutate them, so a diff costs O(changed fields) whatever the size
+    of the datapoints. A diff stays valid only while the element doesn't change again, subscribers keeping old
+    elements around subscribe with snapshot=True to receive plain dicts instead
+    """
+
+    def __init__(self, element: Dict[str, any], changes: Dict[str, FieldChange]):
+        self.element = element
+        self.changes = changes
+        # values of unchanged fields which were replaced later in the same transaction
+        self.pinned: Dict[str, any] = {}
+
+    def __getitem__(self, field: str) -> any:
+        if field in self.changes:
+            return self.changes[field][0]
+        if field in self.pinned:
+            return self.pinned[field]
+        return self.element[field]
+
+    def __iter__(self):
+        return iter(self.element)
+
+    def __len__(self) -> int:
+        return len(self.element)
+
+    def changed(self, field: str) -> bool:
+        return field in self.changes
+
+    def snapshot(self) -> Dict[str, any]:
+        """
+        Independent shallow copy of the old state
+        """
+        return {field: self[field] for field in self.element}
+
+    def merge(self, later: 'ElementDiff') -> 'ElementDiff':
+        """
+        Diff covering this update followed by a later one of the same element
+        """
+        changes = {field: (later.changes[field][0], new) for field, (_, new) in later.changes.items()}
+        for field, (old, new) in self.changes.items():
+            changes[field] = (old, changes[field][1] if field in changes else new)
+        return ElementDiff(self.element, changes)
+
+
+def element_apply_update(element: Dict[str, any], updated: Dict[str, any], fields: List[str]) -> ElementDiff:
+    """
+    Replaces in place the fields of the element which are given (not None) in the update
+    """
+    changes = {}
+    for field in fields:
+        value = updated.get(field)
+        if value is not None and value is not element[field]:
+            changes[field] = (element[field], value)
+            element[field] = value
+
+    return ElementDiff(element, changes)
+
+
+def element_diffs_pin(diffs_in_order: List[List[ElementDiff]]) -> None:
+    """
+    Pins in each diff the fields which later diffs of the same element changed, so the old states stay exact when the
+    diffs are read after all of them were applied
+    """
+    later_old: Dict[int, Dict[str, any]] = {}
+    for diffs in reversed(diffs_in_order):
+        for diff in reversed(diffs):
+            pinned = later_old.setdefault(id(diff.element), {})
+            diff.pinned = {field: value for field, value in pinned.items() if field not in diff.changes}
+            for field, (old, _) in diff.changes.items():
+                pinned[field] = old
+
+
+def element_diffs_snapshot(old_elements: List[any]) -> List[any]:
+    return [old.snapshot() if isinstance(old, ElementDiff) else old for old in old_elements]
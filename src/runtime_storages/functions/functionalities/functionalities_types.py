@@ -3,3 +3,4 @@ from enum import Enum
 
 class FunctionalityAlias(Enum):
     GET_WALK_DISTANCE = "GET_WALK_DISTANCE"
+    GET_WALK_DISTANCE_ON_DEMAND = "GET_WALK_DISTANCE_ON_DEMAND"
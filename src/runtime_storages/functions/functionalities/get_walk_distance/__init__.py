@@ -1,6 +1,10 @@
 from .cache_get_walk_distance import CacheGetWalkDistance, on_create_connections, on_update_connections, \
-    on_delete_connections, on_delete_nodes, on_create_nodes, on_update_nodes
+    on_delete_connections, on_delete_nodes, on_create_nodes, on_update_nodes, fork, validate_cache_get_walk_distance
 
+from .cache_get_walk_distance_on_demand import CacheGetWalkDistanceOnDemand, \
+    validate_cache_get_walk_distance_on_demand
+from . import cache_get_walk_distance_on_demand as on_demand
+from .backends import walk_distance_backend_get, WALK_DISTANCE_DENSE_MAX_NODES
 from .functions import get_walk_distance
 
 __all__ = [
@@ -11,5 +15,12 @@ __all__ = [
     'on_delete_nodes',
     'on_create_nodes',
     'on_update_nodes',
+    'fork',
+    'validate_cache_get_walk_distance',
+    'CacheGetWalkDistanceOnDemand',
+    'validate_cache_get_walk_distance_on_demand',
+    'on_demand',
+    'walk_distance_backend_get',
+    'WALK_DISTANCE_DENSE_MAX_NODES',
     'get_walk_distance',
 ]
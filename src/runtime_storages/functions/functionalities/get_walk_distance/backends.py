@@ -0,0 +1,20 @@
+from typing import TYPE_CHECKING
+
+from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+# a float32 matrix of this size takes 64MB
+WALK_DISTANCE_DENSE_MAX_NODES = 4096
+
+
+def walk_distance_backend_get(storage: 'StorageStruct') -> FunctionalityAlias:
+    """
+    The backend set on the storage if any, otherwise the dense matrix for small maps and on demand rows for large ones
+    """
+    if storage.walk_distance_backend is not None:
+        return storage.walk_distance_backend
+    if len(storage.nodes_authentic) <= WALK_DISTANCE_DENSE_MAX_NODES:
+        return FunctionalityAlias.GET_WALK_DISTANCE
+    return FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND
@@ -1,59 +1,361 @@
 from typing import TYPE_CHECKING
-from typing import List, Dict
-from src.navigation_core.to_refactor.algorithms import build_connections_hashmap, floyd_warshall_algorithm
-from ...basic_functions import connections_all_get
+from typing import List, Dict, Set
+import heapq
+import numpy as np
 
 from src.runtime_storages.cache_abstract import CacheAbstract
 from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
-from src.runtime_storages.other import cache_specialized_get
+from src.runtime_storages.functions.functionalities.get_walk_distance.backends import walk_distance_backend_get
+from src.runtime_storages.functions.functionalities.get_walk_distance.dense_shortest_paths import \
+    dense_distances_create, dense_floyd_warshall_components, dense_relax_edge, dense_edge_affected_sources, \
+    dense_swap_remove
+from src.runtime_storages.general_cache.cache_connections_adjacency import validate_cache_connections_adjacency
+from src.runtime_storages.general_cache.cache_connections_edges import validate_cache_connections_edges
+from src.runtime_storages.general_cache.cache_connections_components import validate_cache_connections_components
+from src.runtime_storages.general_cache.cache_nodes_indexes import validate_cache_nodes_indexes
+from src.runtime_storages.other import cache_specialized_get, cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
 
 if TYPE_CHECKING:
     from src.runtime_storages.storage_struct import StorageStruct
     from src.runtime_storages.types import ConnectionAuthenticData, ConnectionSyntheticData
 
+_INITIAL_CAPACITY = 64
+_EDGE_REMOVED = "removed"
+_EDGE_ADDED = "added"
+
 
 class CacheGetWalkDistance(CacheAbstract):
+    """
+    All pairs walking distances between nodes, kept up to date incrementally on every mutation of the graph
+
+    Distances live in a float32 matrix aligned with the node indexes, grown by doubling its capacity. The names of the
+    rows are mirrored so the matrix can follow the swap-removals of the nodes
+
+    The cache is lazy by default, connection changes are kept as dirty keys and applied on the first read. Node changes
+    are applied right away since they move the rows of the matrix
+    """
+
     def __init__(self):
-        self.distances: Dict = {}
+        self.buffer: np.ndarray = dense_distances_create(_INITIAL_CAPACITY)
+        self.count: int = 0
+        self.rows_names: List[str] = []
+        self.lazy = True
+        # rows are recalculated on the stored connections, which can hold edges not relaxed into the other rows yet,
+        # see dense_relax_edge
+        self.closed = True
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.buffer[:self.count, :self.count]
+
+    def read(self, start_index: int, end_index: int) -> float:
+        self.hits += 1
+        return float(self.buffer[start_index, end_index])
+
+    def recalculate(self, storage: 'StorageStruct', keys: List[any] | None) -> None:
+        """
+        Removals are applied first, recalculating their rows on the stored connections which already hold the added
+        edges, so those are then relaxed through the other rows without the shortcut
+        """
+        if keys is None:
+            invalidate_and_recalculate(storage)
+            return
+
+        removed_edges = [connection for kind, connection in keys if kind == _EDGE_REMOVED]
+        added_edges = [connection for kind, connection in keys if kind == _EDGE_ADDED]
+        _edges_removed(storage, self, removed_edges)
+        # edges created and deleted while the cache was dirty were never seen by the matrix
+        _edges_added(storage, self, [connection for connection in added_edges if _edge_is_stored(storage, connection)])
+        # every stored connection went through the matrix, it holds their shortest paths again
+        self.closed = True
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheGetWalkDistance:
+    cache = cache_specialized_get(storage, FunctionalityAlias.GET_WALK_DISTANCE)
+    return validate_cache_get_walk_distance(cache)
+
+
+def _indexes_get(storage: 'StorageStruct') -> Dict[str, int]:
+    indexes = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    return validate_cache_nodes_indexes(indexes).cache_map
+
+
+def _backend_skipped(storage: 'StorageStruct', self: CacheGetWalkDistance) -> bool:
+    """
+    While the on demand backend serves the walk distances the matrix is released, it is rebuilt once used again
+    """
+    if walk_distance_backend_get(storage) != FunctionalityAlias.GET_WALK_DISTANCE:
+        if self.count > 0 or not self.dirty or self.dirty_keys is not None:
+            self.buffer = dense_distances_create(_INITIAL_CAPACITY)
+            self.count = 0
+            self.rows_names = []
+            self.mark_dirty()
+        return True
+
+    # a full rebuild is pending, so the changes don't have to be followed
+    return self.dirty and self.dirty_keys is None
+
+
+def _ensure_capacity(self: CacheGetWalkDistance, count: int) -> None:
+    capacity = self.buffer.shape[0]
+    if count <= capacity:
+        return
+
+    while capacity < count:
+        capacity *= 2
+    buffer = dense_distances_create(capacity)
+    buffer[:self.count, :self.count] = self.matrix
+    self.buffer = buffer
+
+
+def _edge_slots(indexes: Dict[str, int], connection: any) -> tuple[int, int] | None:
+    if connection["distance"] is None:
+        return None
+    start = indexes.get(connection["start"])
+    end = indexes.get(connection["end"])
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def _row_dijkstra(storage: 'StorageStruct', indexes: Dict[str, int], count: int, source: int) -> np.ndarray:
+    adjacency = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    adjacency = validate_cache_connections_adjacency(adjacency)
+    names = storage.nodes_authentic
+
+    row = np.full(count, np.inf, dtype=np.float64)
+    row[source] = 0
+    queue = [(0.0, source)]
+    visited = set()
+    while queue:
+        current_distance, current = heapq.heappop(queue)
+        if current in visited:
+            continue
+        visited.add(current)
+
+        current_name = names[current]["name"]
+        for data_alias in [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]:
+            neighbors = [(connection["end"], connection["distance"]) for connection in
+                         adjacency.read(data_alias, current_name)]
+            neighbors += [(connection["start"], connection["distance"]) for connection in
+                          adjacency.read_reversed(data_alias, current_name)]
+            for neighbor_name, weight in neighbors:
+                neighbor = indexes.get(neighbor_name)
+                if weight is None or neighbor is None:
+                    continue
+                candidate = current_distance + weight
+                if candidate < row[neighbor]:
+                    row[neighbor] = candidate
+                    heapq.heappush(queue, (candidate, neighbor))
+
+    return row
+
+
+def _recalculate_sources(storage: 'StorageStruct', self: CacheGetWalkDistance, sources: Set[int]) -> None:
+    indexes = _indexes_get(storage)
+    matrix = self.matrix
+    if len(sources) > 0:
+        self.closed = False
+    for source in sources:
+        row = _row_dijkstra(storage, indexes, self.count, source)
+        matrix[source, :] = row
+        # the graph is undirected, so the column is the same as the row
+        matrix[:, source] = row
+
 
-    def read(self, start_node: str, end_node: str) -> float:
-        return self.distances[start_node][end_node]
+def _affected_sources(self: CacheGetWalkDistance, indexes: Dict[str, int], removed_edges: List[any]) -> Set[int]:
+    affected = set()
+    for connection in removed_edges:
+        slots = _edge_slots(indexes, connection)
+        if slots is not None:
+            affected.update(dense_edge_affected_sources(self.matrix, slots[0], slots[1],
+                                                        connection["distance"]).tolist())
+    return affected
+
+
+def _edges_removed(storage: 'StorageStruct', self: CacheGetWalkDistance, removed_edges: List[any]) -> None:
+    affected = _affected_sources(self, _indexes_get(storage), removed_edges)
+    _recalculate_sources(storage, self, affected)
+
+
+def _edges_added(storage: 'StorageStruct', self: CacheGetWalkDistance, added_edges: List[any]) -> None:
+    indexes = _indexes_get(storage)
+    for connection in added_edges:
+        slots = _edge_slots(indexes, connection)
+        if slots is not None:
+            dense_relax_edge(self.matrix, slots[0], slots[1], connection["distance"], closed=self.closed)
+
+
+def _edge_is_stored(storage: 'StorageStruct', connection: any) -> bool:
+    adjacency = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    adjacency = validate_cache_connections_adjacency(adjacency)
+    return any(id(connection) in adjacency.outgoing[data_alias].get(connection["start"], {}) for data_alias in
+               [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC])
+
+
+def _edges_changed(storage: 'StorageStruct', self: CacheGetWalkDistance, removed_edges: List[any],
+                   added_edges: List[any]) -> None:
+    """
+    Removals are handled first, while the matrix still holds the distances they took part in
+    """
+    if _backend_skipped(storage, self):
+        return
+    if self.lazy:
+        self.mark_dirty([(_EDGE_REMOVED, connection) for connection in removed_edges] +
+                        [(_EDGE_ADDED, connection) for connection in added_edges])
+        return
+
+    _edges_removed(storage, self, removed_edges)
+    _edges_added(storage, self, added_edges)
 
 
 def on_create_connections(storage: 'StorageStruct',
                           new_connections: 'List[any]') -> None:
-    invalidate_and_recalculate(storage)
+    _edges_changed(storage, _cache_get(storage), [], new_connections)
 
 
 def on_update_connections(storage: 'StorageStruct',
+                          old_connections: 'List[ConnectionAuthenticData | ConnectionSyntheticData]',
                           new_connections: 'List[ConnectionAuthenticData | ConnectionSyntheticData]') -> None:
-    pass
+    """
+    Only lengthened or moved edges need their affected rows recalculated, shortened ones are relaxed in O(N^2)
+    """
+    self = _cache_get(storage)
+
+    removed_edges = []
+    for old_connection, new_connection in zip(old_connections, new_connections):
+        moved = old_connection["start"] != new_connection["start"] or old_connection["end"] != new_connection["end"]
+        lengthened = old_connection["distance"] is not None and (
+                new_connection["distance"] is None or new_connection["distance"] > old_connection["distance"])
+        if moved or lengthened:
+            removed_edges.append(old_connection)
+
+    _edges_changed(storage, self, removed_edges, new_connections)
 
 
 def on_delete_connections(storage: 'StorageStruct',
-                          deleted_connection: 'ConnectionAuthenticData | ConnectionSyntheticData') -> None:
-    invalidate_and_recalculate(storage)
+                          deleted_connections: 'List[ConnectionAuthenticData | ConnectionSyntheticData]') -> None:
+    _edges_changed(storage, _cache_get(storage), deleted_connections, [])
+
+
+def _incident_edges(storage: 'StorageStruct', node_name: str) -> List[any]:
+    adjacency = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    adjacency = validate_cache_connections_adjacency(adjacency)
+
+    edges = []
+    for data_alias in [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]:
+        edges += adjacency.read(data_alias, node_name) + adjacency.read_reversed(data_alias, node_name)
+    return edges
 
 
 def on_create_nodes(storage: 'StorageStruct', new_nodes: 'List[any]') -> None:
-    invalidate_and_recalculate(storage)
+    self = _cache_get(storage)
+    if _backend_skipped(storage, self):
+        return
+    _ensure_capacity(self, self.count + len(new_nodes))
+    self.count += len(new_nodes)
+    self.rows_names.extend(node["name"] for node in new_nodes)
+
+    # connections might have been created before their nodes
+    for node in new_nodes:
+        _edges_added(storage, self, _incident_edges(storage, node["name"]))
 
 
 def on_update_nodes(storage: 'StorageStruct', old_nodes: List[any], new_nodes: List[any]) -> None:
-    pass
+    """
+    Renames keep the slots, so only the mirrored names change
+    """
+    self = _cache_get(storage)
+    if _backend_skipped(storage, self):
+        return
+    renamed = {old_node["name"]: new_node["name"] for old_node, new_node in zip(old_nodes, new_nodes) if
+               old_node["name"] != new_node["name"]}
+    if len(renamed) == 0:
+        return
 
+    self.rows_names = [renamed.get(name, name) for name in self.rows_names]
 
-def on_delete_nodes(storage: 'StorageStruct', deleted_node: any) -> None:
-    invalidate_and_recalculate(storage)
+
+def _rows_swap_remove(self: CacheGetWalkDistance, rows: List[int]) -> None:
+    self.count = dense_swap_remove(self.buffer, self.count, rows)
+    for row in sorted(rows, reverse=True):
+        last_name = self.rows_names.pop()
+        if row < len(self.rows_names):
+            self.rows_names[row] = last_name
+
+
+def on_delete_nodes(storage: 'StorageStruct', deleted_nodes: List[any]) -> None:
+    """
+    Paths through a deleted node use one of its edges, so only the sources for which those edges are tight change
+    """
+    self = _cache_get(storage)
+    if _backend_skipped(storage, self):
+        return
+
+    # the node index cache already forgot the deleted nodes, the rows of the matrix are found from the mirrored names
+    rows = {name: row for row, name in enumerate(self.rows_names)}
+    deleted_rows = [rows[node["name"]] for node in deleted_nodes]
+
+    removed_edges = []
+    for node in deleted_nodes:
+        removed_edges += _incident_edges(storage, node["name"])
+    if self.dirty:
+        # pending removals might go through the deleted nodes, so they are applied while their rows still exist
+        removed_edges += [connection for kind, connection in self.dirty_keys if kind == _EDGE_REMOVED]
+        self.dirty_keys = [(kind, connection) for kind, connection in self.dirty_keys if kind == _EDGE_ADDED]
+
+    affected = _affected_sources(self, rows, removed_edges)
+    affected_names = {self.rows_names[row] for row in affected} - {node["name"] for node in deleted_nodes}
+
+    _rows_swap_remove(self, deleted_rows)
+    indexes = _indexes_get(storage)
+    _recalculate_sources(storage, self, {indexes[name] for name in affected_names})
 
 
 def invalidate_and_recalculate(storage: 'StorageStruct') -> None:
-    cache = cache_specialized_get(storage, FunctionalityAlias.GET_WALK_DISTANCE)
-    cache = validate_cache_get_walk_distance(cache)
-    connections = connections_all_get(storage)
-    connection_hashmap = build_connections_hashmap(connections, [])
-    distances = floyd_warshall_algorithm(connection_hashmap)
-    cache.distances = distances
+    """
+    Rebuilds the whole matrix from the stored connections with the blocked Floyd-Warshall, one connected component at
+    a time
+    """
+    self = _cache_get(storage)
+    count = len(storage.nodes_authentic)
+    self.dirty = False
+    self.dirty_keys = None
+
+    self.buffer = dense_distances_create(max(count, _INITIAL_CAPACITY))
+    self.count = count
+    self.rows_names = [node["name"] for node in storage.nodes_authentic]
+    self.closed = True
+
+    edges = validate_cache_connections_edges(cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_EDGES))
+    starts, ends, weights = edges.read()
+    components = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_COMPONENTS)
+    components = validate_cache_connections_components(components)
+    components.refresh(storage)
+
+    dense_floyd_warshall_components(self.matrix, components.read_labels(), starts.astype(np.int64),
+                                    ends.astype(np.int64), weights)
+
+
+def fork(storage: 'StorageStruct') -> CacheGetWalkDistance:
+    """
+    Copy of the matrix. Pending changes are applied first, as they refer to connections the storage goes on updating,
+    while a pending rebuild stays pending
+    """
+    self = _cache_get(storage)
+    with storage.lazy_caches_lock:
+        if self.dirty and self.dirty_keys is not None:
+            self.refresh(storage)
+
+        forked = CacheGetWalkDistance()
+        forked.buffer = self.buffer.copy()
+        forked.count = self.count
+        forked.rows_names = list(self.rows_names)
+        forked.lazy = self.lazy
+        forked.closed = self.closed
+        forked.dirty = self.dirty
+        return forked
 
 
 def validate_cache_get_walk_distance(cache: CacheAbstract) -> CacheGetWalkDistance:
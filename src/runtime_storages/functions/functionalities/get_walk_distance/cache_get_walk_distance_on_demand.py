@@ -0,0 +1,196 @@
+from typing import TYPE_CHECKING
+from typing import List, Dict
+from collections import OrderedDict
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+from src.runtime_storages.functions.functionalities.get_walk_distance.backends import walk_distance_backend_get
+from src.runtime_storages.functions.functionalities.get_walk_distance.dense_shortest_paths import \
+    DENSE_TIGHT_TOLERANCE
+from src.runtime_storages.general_cache.cache_connections_edges import validate_cache_connections_edges
+from src.runtime_storages.general_cache.cache_nodes_indexes import validate_cache_nodes_indexes
+from src.runtime_storages.other import cache_specialized_get, cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+WALK_DISTANCE_ROWS_MEMORY_BUDGET = 256 * 1024 * 1024
+_EDGE_REMOVED = "removed"
+_EDGE_ADDED = "added"
+
+
+class CacheGetWalkDistanceOnDemand(CacheAbstract):
+    """
+    Walking distances computed when queried, with a single source Dijkstra over a CSR copy of the graph
+
+    Whole distance rows are kept in an LRU bounded by a memory budget. On connection changes only the rows which the
+    changed edges could affect are evicted, node changes move the indexes so they evict everything
+    """
+
+    def __init__(self, memory_budget: int = WALK_DISTANCE_ROWS_MEMORY_BUDGET):
+        self.memory_budget: int = memory_budget
+        self.graph: csr_matrix | None = None
+        self.rows: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.lazy = True
+        self.dirty = True
+
+    def read(self, start_index: int, end_index: int) -> float:
+        # the graph is undirected, so a cached row of the end works as well
+        if start_index not in self.rows and end_index in self.rows:
+            start_index, end_index = end_index, start_index
+        return float(self.read_row(start_index)[end_index])
+
+    def read_row(self, source: int) -> np.ndarray:
+        if source in self.rows:
+            self.hits += 1
+            self.rows.move_to_end(source)
+            return self.rows[source]
+
+        self.misses += 1
+        row = dijkstra(self.graph, directed=False, indices=source).astype(np.float32)
+        self.rows[source] = row
+        while len(self.rows) > 1 and len(self.rows) * row.nbytes > self.memory_budget:
+            self.rows.popitem(last=False)
+        return row
+
+    def recalculate(self, storage: 'StorageStruct', keys: List[any] | None) -> None:
+        self.graph = _graph_build(storage)
+        if keys is None:
+            self.rows.clear()
+            return
+
+        indexes = _indexes_get(storage)
+        for kind, connection in keys:
+            slots = _edge_slots(indexes, connection)
+            if slots is None:
+                continue
+            if kind == _EDGE_REMOVED:
+                _rows_evict_tight(self, slots[0], slots[1], connection["distance"])
+            else:
+                _rows_evict_shortened(self, slots[0], slots[1], connection["distance"])
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheGetWalkDistanceOnDemand:
+    cache = cache_specialized_get(storage, FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND)
+    return validate_cache_get_walk_distance_on_demand(cache)
+
+
+def _indexes_get(storage: 'StorageStruct') -> Dict[str, int]:
+    indexes = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    return validate_cache_nodes_indexes(indexes).cache_map
+
+
+def _edge_slots(indexes: Dict[str, int], connection: any) -> tuple[int, int] | None:
+    if connection["distance"] is None:
+        return None
+    start = indexes.get(connection["start"])
+    end = indexes.get(connection["end"])
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def _graph_build(storage: 'StorageStruct') -> csr_matrix:
+    """
+    Symmetric CSR adjacency over the node indexes, parallel edges keep the shortest distance
+    """
+    edges = validate_cache_connections_edges(cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_EDGES))
+    starts, ends, weights = edges.read()
+    count = len(storage.nodes_authentic)
+
+    rows = np.concatenate((starts, ends)).astype(np.int64)
+    columns = np.concatenate((ends, starts)).astype(np.int64)
+    distances = np.concatenate((weights, weights)).astype(np.float64)
+
+    order = np.lexsort((distances, columns, rows))
+    rows, columns, distances = rows[order], columns[order], distances[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+
+    return csr_matrix((distances[first], (rows[first], columns[first])), shape=(count, count))
+
+
+def _rows_evict_tight(self: CacheGetWalkDistanceOnDemand, start: int, end: int, weight: float) -> None:
+    for source in list(self.rows.keys()):
+        row = self.rows[source]
+        if not np.isfinite(row[start]):
+            # the edge is in another component than the source
+            continue
+        tolerance = DENSE_TIGHT_TOLERANCE * max(1.0, min(row[start], row[end]))
+        if row[start] + weight <= row[end] + tolerance or row[end] + weight <= row[start] + tolerance:
+            del self.rows[source]
+
+
+def _rows_evict_shortened(self: CacheGetWalkDistanceOnDemand, start: int, end: int, weight: float) -> None:
+    for source in list(self.rows.keys()):
+        row = self.rows[source]
+        if row[start] + weight < row[end] or row[end] + weight < row[start]:
+            del self.rows[source]
+
+
+def _edges_changed(storage: 'StorageStruct', removed_edges: List[any], added_edges: List[any]) -> None:
+    self = _cache_get(storage)
+    if walk_distance_backend_get(storage) != FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND:
+        _release(self)
+        return
+
+    self.mark_dirty([(_EDGE_REMOVED, connection) for connection in removed_edges] +
+                    [(_EDGE_ADDED, connection) for connection in added_edges])
+
+
+def _release(self: CacheGetWalkDistanceOnDemand) -> None:
+    self.graph = None
+    self.rows.clear()
+    self.mark_dirty()
+
+
+def on_create_connections(storage: 'StorageStruct', new_connections: List[any]) -> None:
+    _edges_changed(storage, [], new_connections)
+
+
+def on_update_connections(storage: 'StorageStruct', old_connections: List[any], new_connections: List[any]) -> None:
+    _edges_changed(storage, old_connections, new_connections)
+
+
+def on_delete_connections(storage: 'StorageStruct', deleted_connections: List[any]) -> None:
+    _edges_changed(storage, deleted_connections, [])
+
+
+def on_create_nodes(storage: 'StorageStruct', new_nodes: List[any]) -> None:
+    _release(_cache_get(storage))
+
+
+def on_update_nodes(storage: 'StorageStruct', old_nodes: List[any], new_nodes: List[any]) -> None:
+    # renames keep the indexes, so the rows are still valid
+    pass
+
+
+def on_delete_nodes(storage: 'StorageStruct', deleted_nodes: List[any]) -> None:
+    _release(_cache_get(storage))
+
+
+def fork(storage: 'StorageStruct') -> CacheGetWalkDistanceOnDemand:
+    """
+    Copy sharing the graph and the rows, which are replaced rather than changed. Pending changes are applied first, as
+    they refer to connections the storage goes on updating, while a pending rebuild stays pending
+    """
+    self = _cache_get(storage)
+    with storage.lazy_caches_lock:
+        if self.dirty and self.dirty_keys is not None:
+            self.refresh(storage)
+
+        forked = CacheGetWalkDistanceOnDemand(self.memory_budget)
+        forked.graph = self.graph
+        forked.rows = OrderedDict(self.rows)
+        forked.dirty = self.dirty
+        return forked
+
+
+def validate_cache_get_walk_distance_on_demand(cache: CacheAbstract) -> CacheGetWalkDistanceOnDemand:
+    if not isinstance(cache, CacheGetWalkDistanceOnDemand):
+        raise ValueError(f"Expected CacheGetWalkDistanceOnDemand, got {type(cache)}")
+    return cache
@@ -0,0 +1,159 @@
+"""
+Shortest paths over a dense float32 distance matrix, where row and column i belong to the node at index i
+
+Everything here works on indexes only, the alignment with the nodes is handled by the caches using it
+"""
+from typing import List
+import numpy as np
+
+DENSE_BLOCK_SIZE = 64
+DENSE_RELAX_CHUNK_ROWS = 1024
+DENSE_TIGHT_TOLERANCE = 1e-5
+
+
+def dense_distances_create(size: int) -> np.ndarray:
+    matrix = np.full((size, size), np.inf, dtype=np.float32)
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+def dense_distances_fill_edges(matrix: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                               weights: np.ndarray) -> None:
+    """
+    Writes the undirected edges in the matrix, keeping the shortest one for parallel edges
+    """
+    np.minimum.at(matrix, (starts, ends), weights)
+    np.minimum.at(matrix, (ends, starts), weights)
+
+
+def _floyd_warshall_block_diagonal(diagonal: np.ndarray) -> None:
+    for k in range(diagonal.shape[0]):
+        np.minimum(diagonal, diagonal[:, k, None] + diagonal[None, k, :], out=diagonal)
+
+
+def dense_floyd_warshall(matrix: np.ndarray, block_size: int = DENSE_BLOCK_SIZE) -> None:
+    """
+    Blocked Floyd-Warshall, in place
+
+    Each round finalizes the diagonal block of the pivots, then the row and column panels through it, then relaxes the
+    remaining tiles with one min-plus product per tile, so the working set of each step is a few tiles
+    """
+    size = matrix.shape[0]
+    for pivot_start in range(0, size, block_size):
+        pivots = slice(pivot_start, min(pivot_start + block_size, size))
+        pivots_count = pivots.stop - pivots.start
+
+        diagonal = matrix[pivots, pivots]
+        _floyd_warshall_block_diagonal(diagonal)
+
+        row_panel = matrix[pivots, :]
+        column_panel = matrix[:, pivots]
+        for k in range(pivots_count):
+            np.minimum(row_panel, diagonal[:, k, None] + row_panel[None, k, :], out=row_panel)
+            np.minimum(column_panel, column_panel[:, k, None] + diagonal[None, k, :], out=column_panel)
+
+        for row_start in range(0, size, block_size):
+            if row_start == pivot_start:
+                continue
+            rows = slice(row_start, min(row_start + block_size, size))
+            rows_to_pivots = matrix[rows, pivots]
+
+            for column_start in range(0, size, block_size):
+                if column_start == pivot_start:
+                    continue
+                columns = slice(column_start, min(column_start + block_size, size))
+                tile = matrix[rows, columns]
+                through_pivots = (rows_to_pivots[:, :, None] + row_panel[None, :, columns]).min(axis=1)
+                np.minimum(tile, through_pivots, out=tile)
+
+
+def dense_floyd_warshall_components(matrix: np.ndarray, labels: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                                    weights: np.ndarray) -> None:
+    """
+    Fills a fresh matrix from the edges and runs Floyd-Warshall inside each connected component, labels giving the
+    component of every row. Pairs of different components stay infinite, so the cost drops from N^3 to the sum of the
+    cubes of the components sizes
+    """
+    components, labels = np.unique(labels, return_inverse=True)
+    if len(components) <= 1:
+        dense_distances_fill_edges(matrix, starts, ends, weights)
+        dense_floyd_warshall(matrix)
+        return
+
+    nodes_order = np.argsort(labels, kind="stable")
+    nodes_bounds = np.searchsorted(labels[nodes_order], np.arange(len(components) + 1))
+    edges_labels = labels[starts]
+    edges_order = np.argsort(edges_labels, kind="stable")
+    edges_bounds = np.searchsorted(edges_labels[edges_order], np.arange(len(components) + 1))
+    # position of every row inside its component
+    local = np.empty(len(labels), dtype=np.int64)
+    local[nodes_order] = np.arange(len(labels)) - nodes_bounds[labels[nodes_order]]
+
+    for component in range(len(components)):
+        nodes = nodes_order[nodes_bounds[component]:nodes_bounds[component + 1]]
+        edges = edges_order[edges_bounds[component]:edges_bounds[component + 1]]
+        if len(nodes) == 1:
+            continue
+        submatrix = dense_distances_create(len(nodes))
+        dense_distances_fill_edges(submatrix, local[starts[edges]], local[ends[edges]], weights[edges])
+        dense_floyd_warshall(submatrix)
+        matrix[np.ix_(nodes, nodes)] = submatrix
+
+
+def dense_relax_edge(matrix: np.ndarray, start: int, end: int, weight: float, closed: bool = True,
+                     chunk_rows: int = DENSE_RELAX_CHUNK_ROWS) -> None:
+    """
+    Relaxes all pairs through a new undirected edge in O(N^2), a chunk of rows at a time
+
+    A closed matrix holds the shortest paths of one graph, so an edge no shorter than the distance between its ends
+    can't shorten any of them and is skipped. Rows recalculated on a graph which already holds the edge break this,
+    the edge has to be relaxed through the other rows anyway
+    """
+    if closed and matrix[start, end] <= weight:
+        return
+
+    # copies, since the rows themselves get relaxed below
+    start_row = matrix[start].copy()
+    end_row = matrix[end].copy()
+    to_start = start_row + np.float32(weight)
+    to_end = end_row + np.float32(weight)
+
+    for chunk_start in range(0, matrix.shape[0], chunk_rows):
+        chunk = slice(chunk_start, min(chunk_start + chunk_rows, matrix.shape[0]))
+        block = matrix[chunk]
+        np.minimum(block, to_start[chunk, None] + end_row[None, :], out=block)
+        np.minimum(block, to_end[chunk, None] + start_row[None, :], out=block)
+
+
+def dense_edge_affected_sources(matrix: np.ndarray, start: int, end: int, weight: float) -> np.ndarray:
+    """
+    Rows for which the edge is tight, the only ones which can change when the edge is removed or lengthened
+    """
+    to_start = matrix[:, start]
+    to_end = matrix[:, end]
+    tolerance = DENSE_TIGHT_TOLERANCE * np.maximum(1.0, np.minimum(to_start, to_end))
+    tight_forward = np.isfinite(to_start) & (to_start + weight <= to_end + tolerance)
+    tight_backward = np.isfinite(to_end) & (to_end + weight <= to_start + tolerance)
+    return np.flatnonzero(tight_forward | tight_backward)
+
+
+def dense_swap_remove(matrix: np.ndarray, count: int, indexes: List[int]) -> int:
+    """
+    Removes rows and columns by moving the last ones in their place, mirroring how nodes are removed from storage
+
+    The freed rows and columns are reset, so they can be handed out again to new nodes
+    """
+    initial_count = count
+    for index in sorted(indexes, reverse=True):
+        last = count - 1
+        if index != last:
+            matrix[index, :count] = matrix[last, :count]
+            matrix[:count, index] = matrix[:count, last]
+            matrix[index, index] = 0
+        count -= 1
+
+    freed = np.arange(count, initial_count)
+    matrix[count:initial_count, :] = np.inf
+    matrix[:, count:initial_count] = np.inf
+    matrix[freed, freed] = 0
+    return count
@@ -1,8 +1,9 @@
+import math
 from typing import TYPE_CHECKING
 
-from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
-from src.runtime_storages.functions.functionalities.get_walk_distance.cache_get_walk_distance import \
-    validate_cache_get_walk_distance
+from src.runtime_storages.functions.basic_functions import node_get_index_by_name, nodes_are_connected
+from src.runtime_storages.functions.functionalities.get_walk_distance.backends import walk_distance_backend_get
+from src.runtime_storages.functions.subscriber_functions import transaction_events_flush
 from src.runtime_storages.other import cache_specialized_get
 
 if TYPE_CHECKING:
@@ -10,10 +11,21 @@ if TYPE_CHECKING:
 
 
 def get_walk_distance(storage: 'StorageStruct', start_node: str, end_node: str) -> float:
-    cache = cache_specialized_get(storage, FunctionalityAlias.GET_WALK_DISTANCE)
-    cache = validate_cache_get_walk_distance(cache)
+    """
+    Reads from the backend picked for the storage, see walk_distance_backend_get
 
-    return cache.read(
-        start_node=start_node,
-        end_node=end_node,
-    )
+    Nodes in different components are answered from the components cache, without bringing the backend up to date.
+    Inside a transaction the dense backend first receives the connection events deferred so far
+    """
+    with storage.lock.read(), storage.lazy_caches_lock:
+        transaction_events_flush(storage)
+        if not nodes_are_connected(storage, start_node, end_node):
+            return math.inf
+
+        cache = cache_specialized_get(storage, walk_distance_backend_get(storage))
+        cache.refresh(storage)
+
+        return cache.read(
+            start_index=node_get_index_by_name(storage, start_node),
+            end_index=node_get_index_by_name(storage, end_node),
+        )
@@ -0,0 +1,82 @@
+import sys
+from enum import Enum
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Set
+import numpy as np
+import torch
+
+_SCALARS = (int, float, bool, complex, type(None))
+_SCALARS_SIZES = {float: sys.getsizeof(0.0), complex: sys.getsizeof(0j), int: sys.getsizeof(2 ** 40)}
+_SINGLETONS = {bool, type(None)}
+_NOT_OWNED = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, Enum)
+# long lists of scalars, such as the datapoints, are estimated from a sample of their items
+_SAMPLE_SIZE = 16
+
+
+def _scalars_list_size(items: list | tuple) -> int | None:
+    step = len(items) // _SAMPLE_SIZE
+    sample = items[::step][:_SAMPLE_SIZE]
+    if not all(type(item) in _SCALARS for item in sample):
+        return None
+    return sys.getsizeof(items) + len(items) * sum(sys.getsizeof(item) for item in sample) // len(sample)
+
+
+def _leaves_size(items, seen: Set[any], stack: list) -> int:
+    """
+    Counts the scalars and strings among the items right away, the other items are left to the stack
+
+    Only strings are deduplicated, the names being the one kind of leaf shared between the data and the caches
+    """
+    total = 0
+    for item in items:
+        item_type = type(item)
+        if item_type is str:
+            if id(item) not in seen:
+                seen.add(id(item))
+                total += sys.getsizeof(item)
+        elif item_type in _SCALARS_SIZES:
+            total += _SCALARS_SIZES[item_type]
+        elif item_type in _SINGLETONS:
+            continue
+        else:
+            stack.append(item)
+    return total
+
+
+def memory_size(obj: any, seen: Set[any]) -> int:
+    """
+    Estimated bytes held by the object and everything it references, except what is already in seen
+
+    Objects are added to seen as they are counted, so sharing one seen set between several calls counts every object
+    once, for the first call reaching it. Tensors are counted by their storage, so views cost only their header
+    """
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _NOT_OWNED):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            total += _leaves_size(current.keys(), seen, stack) + _leaves_size(current.values(), seen, stack)
+        elif isinstance(current, (list, tuple)) and len(current) > _SAMPLE_SIZE and \
+                type(current[0]) in _SCALARS and (estimated := _scalars_list_size(current)) is not None:
+            total += estimated - sys.getsizeof(current)
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            total += _leaves_size(current, seen, stack)
+        elif isinstance(current, torch.Tensor):
+            storage = current.untyped_storage()
+            key = ("tensor_storage", storage.data_ptr())
+            if key not in seen:
+                seen.add(key)
+                total += storage.nbytes()
+        elif isinstance(current, np.ndarray):
+            # arrays owning their data are fully counted by getsizeof, views hold their base alive
+            if current.base is not None:
+                stack.append(current.base)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+
+    return total
@@ -1,7 +1,20 @@
 from functools import wraps
 
+from src.runtime_storages.functions.subscriber_functions import subscribers_notify
 from src.runtime_storages.types import DataAlias, OperationsAlias
 
+# results kept per memoized function, for the functions taking arguments such as node names
+MEMOIZED_READS_MAX_ENTRIES = 1024
+_MISSING = object()
+
+
+def _data_version_bump(storage, data_alias: DataAlias) -> None:
+    storage.data_versions[data_alias] += 1
+
+
+def _storage_of(args: tuple, kwargs: dict):
+    return kwargs.get('storage', args[0] if args else None)
+
 
 def trigger_create_subscribers(data_alias: DataAlias):
     operation_alias = OperationsAlias.CREATE
@@ -9,11 +22,11 @@ def trigger_create_subscribers(data_alias: DataAlias):
     def function_decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            storage = kwargs.get('storage', args[0] if args else None)
-            element = func(*args, **kwargs)
-            subscribers = storage.data_crud_subscribers[data_alias][operation_alias]
-            for subscriber in subscribers:
-                subscriber(storage, element)
+            storage = _storage_of(args, kwargs)
+            with storage.lock.write():
+                element = func(*args, **kwargs)
+                _data_version_bump(storage, data_alias)
+                subscribers_notify(storage, data_alias, operation_alias, element)
 
         return wrapper
 
@@ -26,11 +39,11 @@ def trigger_update_subscribers(data_alias: DataAlias):
     def function_decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            storage = args[0]
-            old, new = func(*args, **kwargs)
-            subscribers = storage.data_crud_subscribers[data_alias][operation_alias]
-            for subscriber in subscribers:
-                subscriber(storage, old, new)
+            storage = _storage_of(args, kwargs)
+            with storage.lock.write():
+                old, new = func(*args, **kwargs)
+                _data_version_bump(storage, data_alias)
+                subscribers_notify(storage, data_alias, operation_alias, old, new)
 
         return wrapper
 
@@ -43,11 +56,99 @@ def trigger_delete_subscribers(data_alias: DataAlias):
     def function_decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            storage = args[0]
-            deleted_element = func(*args, **kwargs)
-            subscribers = storage.data_crud_subscribers[data_alias][operation_alias]
-            for subscriber in subscribers:
-                subscriber(storage, deleted_element)
+            storage = _storage_of(args, kwargs)
+            with storage.lock.write():
+                deleted_element = func(*args, **kwargs)
+                _data_version_bump(storage, data_alias)
+                subscribers_notify(storage, data_alias, operation_alias, deleted_element)
+
+        return wrapper
+
+    return function_decorator
+
+
+def storage_read(func):
+    """
+    Runs the function under the read lock of the storage, concurrently with other readers
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _storage_of(args, kwargs).lock.read():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def storage_write(func):
+    """
+    Runs the function under the write lock of the storage, for the functions changing it outside of crud
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _storage_of(args, kwargs).lock.write():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _memoized_store(storage, name: str, versions: tuple, key: tuple, result: any) -> None:
+    """
+    Results of older versions can't be hit anymore so they are dropped, the oldest results go past
+    MEMOIZED_READS_MAX_ENTRIES. Readers store concurrently, the hits only read the maps
+    """
+    with storage.memoized_reads_lock:
+        memoized = storage.memoized_reads.get(name)
+        if memoized is None or memoized[0] != versions:
+            memoized = (versions, {})
+            storage.memoized_reads[name] = memoized
+
+        entries = memoized[1]
+        entries[key] = result
+        while len(entries) > MEMOIZED_READS_MAX_ENTRIES:
+            del entries[next(iter(entries))]
+
+
+def memoize_read(*data_aliases: DataAlias):
+    """
+    Keeps the result of a read function until one of the data it depends on changes, the function runs under the read
+    lock of the storage
+
+    The result is shared between all callers, so the function has to return something immutable (tuples, not lists,
+    and read only views of the elements, such as MappingProxyType). Results are kept under the module and qualified
+    name of the function, calls with unhashable arguments are not memoized
+    """
+
+    def function_decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            storage = kwargs.pop('storage', None)
+            if storage is None:
+                storage, args = args[0], args[1:]
+
+            key = (args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                with storage.lock.read():
+                    return func(storage, *args, **kwargs)
+
+            with storage.lock.read():
+                versions = tuple(storage.data_versions[data_alias] for data_alias in data_aliases)
+                memoized = storage.memoized_reads.get(name)
+                if memoized is not None and memoized[0] == versions:
+                    result = memoized[1].get(key, _MISSING)
+                    if result is not _MISSING:
+                        storage.memoized_reads_hits += 1
+                        return result
+
+                storage.memoized_reads_misses += 1
+                result = func(storage, *args, **kwargs)
+                _memoized_store(storage, name, versions, key, result)
+                return result
 
         return wrapper
 
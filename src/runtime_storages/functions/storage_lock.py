@@ -0,0 +1,130 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+class StorageLock:
+    """
+    Reader-writer lock of a storage, readers run concurrently while a writer runs alone
+
+    Writers are preferred, new readers wait while a writer is queued so exploration isn't starved by the reading
+    threads. Both sides are reentrant and the writing thread can also read, since subscribers read the storage while
+    the write lock is held. Upgrading a read lock to a write lock would deadlock, so it raises instead
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers: Dict[int, int] = {}
+        self._writer: int | None = None
+        self._writer_depth: int = 0
+        self._writers_waiting: int = 0
+        self._before_next_write: List[Callable[[], None]] = []
+
+    def before_next_write(self, callback: Callable[[], None]) -> None:
+        """
+        Calls the callback once the next writer holds the lock, before it changes anything. Readers register callbacks
+        while holding the read lock, so no writer runs them concurrently
+        """
+        self._before_next_write.append(callback)
+
+    def acquire_read(self) -> None:
+        thread = threading.get_ident()
+        with self._condition:
+            if self._writer == thread or thread in self._readers:
+                self._readers[thread] = self._readers.get(thread, 0) + 1
+                return
+
+            while self._writer is not None or self._writers_waiting > 0:
+                self._condition.wait()
+            self._readers[thread] = 1
+
+    def release_read(self) -> None:
+        thread = threading.get_ident()
+        with self._condition:
+            self._readers[thread] -= 1
+            if self._readers[thread] == 0:
+                del self._readers[thread]
+                if len(self._readers) == 0:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        thread = threading.get_ident()
+        with self._condition:
+            if self._writer == thread:
+                self._writer_depth += 1
+                return
+            if thread in self._readers:
+                raise RuntimeError("A read lock of the storage can't be upgraded to a write lock")
+
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or len(self._readers) > 0:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = thread
+            self._writer_depth = 1
+
+        callbacks, self._before_next_write = self._before_next_write, []
+        try:
+            for callback in callbacks:
+                callback()
+        except BaseException:
+            self.release_write()
+            raise
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class StorageLockReadOnly(StorageLock):
+    """
+    Lock of a storage which can't be written, such as a snapshot
+
+    A snapshot sharing its data with the storage it was taken from reads under the read lock of that storage, until it
+    is detached from it
+    """
+
+    def __init__(self, source: StorageLock | None = None):
+        super().__init__()
+        self.source = source
+        # sources acquired by the reads of each thread, the source can be detached between a read and its release
+        self._sources_acquired = threading.local()
+
+    def acquire_read(self) -> None:
+        source = self.source
+        if source is not None:
+            source.acquire_read()
+        if not hasattr(self._sources_acquired, "stack"):
+            self._sources_acquired.stack = []
+        self._sources_acquired.stack.append(source)
+        super().acquire_read()
+
+    def release_read(self) -> None:
+        super().release_read()
+        source = self._sources_acquired.stack.pop()
+        if source is not None:
+            source.release_read()
+
+    def acquire_write(self) -> None:
+        raise RuntimeError("The storage is read only")
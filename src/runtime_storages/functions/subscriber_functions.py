@@ -1,9 +1,27 @@
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Tuple
+from src.runtime_storages.functions.element_diffs import ElementDiff, element_diffs_pin, element_diffs_snapshot
 from src.runtime_storages.types import DataAlias, OperationsAlias
 
 if TYPE_CHECKING:
     from src.runtime_storages.storage_struct import StorageStruct
 
+TransactionEvent = Tuple[DataAlias, OperationsAlias, tuple]
+
+
+@dataclass
+class SubscriberEntry:
+    """
+    A batched subscriber receives the events of a transaction only once it ends, merged together
+
+    Update subscribers receive the old elements as diffs, unless they ask for snapshots. Subscribers of a cache are
+    skipped until the cache is built
+    """
+    function: Callable
+    batched: bool = False
+    snapshot: bool = False
+    cache: any = None
+
 
 def subscribers_list_initialization(storage: 'StorageStruct', data_type: DataAlias):
     storage.data_crud_subscribers[data_type] = {
@@ -15,27 +33,122 @@ def subscribers_list_initialization(storage: 'StorageStruct', data_type: DataAli
 
 
 def subscribe_to_crud_operations(storage: 'StorageStruct', data_alias: DataAlias, create_subscriber,
-                                 update_subscriber, delete_subscriber) -> None:
+                                 update_subscriber, delete_subscriber, batched: bool = False,
+                                 snapshot: bool = False) -> None:
     subscribe_to_crud_operation(
         storage=storage,
         data_alias=data_alias,
         operation_type=OperationsAlias.CREATE,
-        subscriber=create_subscriber
+        subscriber=create_subscriber,
+        batched=batched
     )
     subscribe_to_crud_operation(
         storage=storage,
         data_alias=data_alias,
         operation_type=OperationsAlias.UPDATE,
-        subscriber=update_subscriber
+        subscriber=update_subscriber,
+        batched=batched,
+        snapshot=snapshot
     )
     subscribe_to_crud_operation(
         storage=storage,
         data_alias=data_alias,
         operation_type=OperationsAlias.DELETE,
-        subscriber=delete_subscriber
+        subscriber=delete_subscriber,
+        batched=batched
     )
 
 
 def subscribe_to_crud_operation(storage: 'StorageStruct', data_alias: DataAlias, operation_type: OperationsAlias,
-                                subscriber):
-    storage.data_crud_subscribers[data_alias][operation_type].append(subscriber)
+                                subscriber, batched: bool = False, snapshot: bool = False):
+    storage.data_crud_subscribers[data_alias][operation_type].append(SubscriberEntry(subscriber, batched, snapshot))
+
+
+def _subscribers_call(storage: 'StorageStruct', subscribers: List[SubscriberEntry], operation_type: OperationsAlias,
+                      payload: tuple) -> None:
+    payload_snapshot = None
+    # a cache built while the event is dispatched is built from data which already contains it
+    active = frozenset(storage.caches_active)
+    for subscriber in subscribers:
+        if subscriber.cache is not None and subscriber.cache not in active:
+            continue
+        if subscriber.snapshot and operation_type == OperationsAlias.UPDATE:
+            if payload_snapshot is None:
+                payload_snapshot = (element_diffs_snapshot(payload[0]), payload[1])
+            subscriber.function(storage, *payload_snapshot)
+        else:
+            subscriber.function(storage, *payload)
+
+
+def subscribers_notify(storage: 'StorageStruct', data_alias: DataAlias, operation_type: OperationsAlias,
+                       *payload) -> None:
+    """
+    Notifies the subscribers of an operation, batched ones are deferred while a transaction is open
+    """
+    subscribers = storage.data_crud_subscribers[data_alias][operation_type]
+    deferred = storage.transaction_depth > 0
+    _subscribers_call(storage, [subscriber for subscriber in subscribers if not (deferred and subscriber.batched)],
+                      operation_type, payload)
+
+    if deferred and any(subscriber.batched for subscriber in subscribers):
+        storage.transaction_events.append((data_alias, operation_type, payload))
+
+
+def _updates_merge(payloads: List[tuple]) -> tuple:
+    """
+    Updates are applied in place, so an element updated several times keeps its first old state and its live object
+    """
+    merged = {}
+    for old_elements, new_elements in payloads:
+        for old_element, new_element in zip(old_elements, new_elements):
+            if id(new_element) not in merged:
+                merged[id(new_element)] = (old_element, new_element)
+            elif isinstance(old_element, ElementDiff) and isinstance(merged[id(new_element)][0], ElementDiff):
+                merged[id(new_element)] = (merged[id(new_element)][0].merge(old_element), new_element)
+
+    return [old for old, _ in merged.values()], [new for _, new in merged.values()]
+
+
+def transaction_events_coalesce(events: List[TransactionEvent]) -> List[TransactionEvent]:
+    """
+    Merges consecutive events of the same data and operation, the order between different operations is kept
+
+    The update diffs get pinned, since they are read only after the whole transaction was applied
+    """
+    coalesced = []
+    runs = []
+    for data_alias, operation_type, payload in events:
+        if len(runs) > 0 and runs[-1][0] == data_alias and runs[-1][1] == operation_type:
+            runs[-1][2].append(payload)
+        else:
+            runs.append((data_alias, operation_type, [payload]))
+
+    for data_alias, operation_type, payloads in runs:
+        if operation_type == OperationsAlias.UPDATE:
+            payload = _updates_merge(payloads)
+        else:
+            payload = ([element for (elements,) in payloads for element in elements],)
+        coalesced.append((data_alias, operation_type, payload))
+
+    element_diffs_pin([[old for old in payload[0] if isinstance(old, ElementDiff)] for _, operation_type, payload in
+                       coalesced if operation_type == OperationsAlias.UPDATE])
+    return coalesced
+
+
+def transaction_events_deliver(storage: 'StorageStruct') -> None:
+    events = transaction_events_coalesce(storage.transaction_events)
+    storage.transaction_events = []
+
+    for data_alias, operation_type, payload in events:
+        subscribers = storage.data_crud_subscribers[data_alias][operation_type]
+        _subscribers_call(storage, [subscriber for subscriber in subscribers if subscriber.batched], operation_type,
+                          payload)
+
+
+def transaction_events_flush(storage: 'StorageStruct') -> None:
+    """
+    Delivers the events deferred so far by the open transaction, for reads inside it which need the batched
+    subscribers up to date. Later events of the transaction are delivered once it ends
+    """
+    if storage.transaction_depth > 0 and len(storage.transaction_events) > 0:
+        transaction_events_deliver(storage)
@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from src.runtime_storages.functions.subscriber_functions import transaction_events_deliver
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+
+@contextmanager
+def storage_transaction(storage: 'StorageStruct'):
+    """
+    Groups several crud operations into one logical change
+
+    Plain subscribers are still notified on each operation (crud itself relies on the index caches), while batched
+    ones receive the merged events once the outermost transaction ends, in the order they happened. Reads served by
+    batched subscribers deliver the events deferred so far first, see transaction_events_flush. Transactions can be
+    nested
+
+    Nothing is rolled back, the events are delivered even if the block raises since the data was already changed. The
+    write lock is held for the whole transaction, so readers never see it half applied
+    """
+    with storage.lock.write():
+        storage.transaction_depth += 1
+        try:
+            yield storage
+        finally:
+            storage.transaction_depth -= 1
+            if storage.transaction_depth == 0:
+                transaction_events_deliver(storage)
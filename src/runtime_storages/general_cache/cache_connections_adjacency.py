@@ -0,0 +1,100 @@
+from typing import TYPE_CHECKING
+from typing import Dict, List
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+ConnectionsBuckets = Dict[str, Dict[int, any]]
+
+CONNECTIONS_ALIASES = [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC, DataAlias.CONNECTIONS_NULL]
+
+
+class CacheConnectionsAdjacency(CacheAbstract):
+    """
+    Keeps for each node the connections starting from it (outgoing) and ending in it (reversed)
+
+    Buckets are keyed by the identity of the stored connection, so removals don't depend on connection names
+    """
+
+    def __init__(self):
+        self.outgoing: Dict[DataAlias, ConnectionsBuckets] = {alias: {} for alias in CONNECTIONS_ALIASES}
+        self.reversed: Dict[DataAlias, ConnectionsBuckets] = {alias: {} for alias in CONNECTIONS_ALIASES}
+
+    def read(self, data_alias: DataAlias, node_name: str) -> List[any]:
+        self.hits += 1
+        return list(self.outgoing[data_alias].get(node_name, {}).values())
+
+    def read_reversed(self, data_alias: DataAlias, node_name: str) -> List[any]:
+        self.hits += 1
+        return list(self.reversed[data_alias].get(node_name, {}).values())
+
+
+def _bucket_add(buckets: ConnectionsBuckets, node_name: str, connection: any) -> None:
+    if node_name not in buckets:
+        buckets[node_name] = {}
+    buckets[node_name][id(connection)] = connection
+
+
+def _bucket_remove(buckets: ConnectionsBuckets, node_name: str, connection: any) -> None:
+    bucket = buckets[node_name]
+    del bucket[id(connection)]
+    if len(bucket) == 0:
+        del buckets[node_name]
+
+
+def _connections_add(self: CacheConnectionsAdjacency, data_alias: DataAlias, connections: List[any]) -> None:
+    outgoing = self.outgoing[data_alias]
+    reversed_buckets = self.reversed[data_alias]
+    for connection in connections:
+        _bucket_add(outgoing, connection["start"], connection)
+        if data_alias != DataAlias.CONNECTIONS_NULL:
+            _bucket_add(reversed_buckets, connection["end"], connection)
+
+
+def _connections_remove(self: CacheConnectionsAdjacency, data_alias: DataAlias, connections: List[any],
+                        endpoints: List[any]) -> None:
+    outgoing = self.outgoing[data_alias]
+    reversed_buckets = self.reversed[data_alias]
+    for connection, endpoint in zip(connections, endpoints):
+        _bucket_remove(outgoing, endpoint["start"], connection)
+        if data_alias != DataAlias.CONNECTIONS_NULL:
+            _bucket_remove(reversed_buckets, endpoint["end"], connection)
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheConnectionsAdjacency:
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    return validate_cache_connections_adjacency(cache)
+
+
+def _build_subscribers(data_alias: DataAlias):
+    def on_create_connections(storage: 'StorageStruct', new_connections: List[any]) -> None:
+        _connections_add(_cache_get(storage), data_alias, new_connections)
+
+    def on_update_connections(storage: 'StorageStruct', old_connections: List[any],
+                              new_connections: List[any]) -> None:
+        self = _cache_get(storage)
+        # updates happen in place, the stored objects are the new ones while the endpoints are the old ones
+        _connections_remove(self, data_alias, new_connections, old_connections)
+        _connections_add(self, data_alias, new_connections)
+
+    def on_delete_connections(storage: 'StorageStruct', deleted_connections: List[any]) -> None:
+        _connections_remove(_cache_get(storage), data_alias, deleted_connections, deleted_connections)
+
+    return on_create_connections, on_update_connections, on_delete_connections
+
+
+on_create_connections_authentic, on_update_connections_authentic, on_delete_connections_authentic = \
+    _build_subscribers(DataAlias.CONNECTIONS_AUTHENTIC)
+on_create_connections_synthetic, on_update_connections_synthetic, on_delete_connections_synthetic = \
+    _build_subscribers(DataAlias.CONNECTIONS_SYNTHETIC)
+on_create_connections_null, on_update_connections_null, on_delete_connections_null = \
+    _build_subscribers(DataAlias.CONNECTIONS_NULL)
+
+
+def validate_cache_connections_adjacency(cache: CacheAbstract) -> CacheConnectionsAdjacency:
+    if not isinstance(cache, CacheConnectionsAdjacency):
+        raise ValueError(f"Expected CacheConnectionsAdjacency, got {type(cache)}")
+    return cache
@@ -0,0 +1,182 @@
+from typing import TYPE_CHECKING
+from typing import Dict, List
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.general_cache.cache_connections_adjacency import validate_cache_connections_adjacency
+from src.runtime_storages.general_cache.cache_connections_edges import EDGES_ALIASES, \
+    validate_cache_connections_edges
+from src.runtime_storages.general_cache.cache_nodes_indexes import validate_cache_nodes_indexes
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+
+class CacheConnectionsComponents(CacheAbstract):
+    """
+    Connected components of the walkable connections (authentic and synthetic), as a union-find over the node indexes
+
+    Creations only merge components, so they are applied right away. A union-find can't split components, so deleted
+    nodes and removed or moved connections mark the cache dirty, and it is rebuilt from the edges on the next read.
+    Finds compress the paths they walk, reads have to hold the lazy caches lock like the refresh does
+    """
+
+    def __init__(self):
+        self.parents: List[int] = []
+        self.sizes: List[int] = []
+        self.lazy = True
+
+    def read(self, start_id: int, end_id: int) -> bool:
+        """
+        Whether both nodes are in the same component
+        """
+        self.hits += 1
+        return _find(self, start_id) == _find(self, end_id)
+
+    def read_labels(self) -> np.ndarray:
+        """
+        For every node index the root of its component, nodes sharing a label are connected
+        """
+        self.hits += 1
+        return np.array([_find(self, node_id) for node_id in range(len(self.parents))], dtype=np.int64)
+
+    def recalculate(self, storage: 'StorageStruct', keys: List[any] | None) -> None:
+        edges = validate_cache_connections_edges(cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_EDGES))
+        starts, ends, _ = edges.read()
+        count = len(storage.nodes_authentic)
+        graph = csr_matrix((np.ones(len(starts), dtype=np.int8), (starts, ends)), shape=(count, count))
+        _, labels = connected_components(graph, directed=False)
+
+        # the first node of every component becomes its root, so all the trees are flat
+        labels_roots = np.full(labels.max() + 1 if count > 0 else 0, -1, dtype=np.int64)
+        first_nodes = np.unique(labels, return_index=True)[1]
+        labels_roots[labels[first_nodes]] = first_nodes
+        self.parents = labels_roots[labels].tolist()
+        self.sizes = np.bincount(labels, minlength=len(labels_roots))[labels].tolist()
+
+
+def _find(self: CacheConnectionsComponents, node_id: int) -> int:
+    parents = self.parents
+    while parents[node_id] != node_id:
+        # path halving, every visited node skips to its grandparent
+        parents[node_id] = parents[parents[node_id]]
+        node_id = parents[node_id]
+    return node_id
+
+
+def _union(self: CacheConnectionsComponents, start_id: int, end_id: int) -> None:
+    start_root = _find(self, start_id)
+    end_root = _find(self, end_id)
+    if start_root == end_root:
+        return
+    if self.sizes[start_root] < self.sizes[end_root]:
+        start_root, end_root = end_root, start_root
+    self.parents[end_root] = start_root
+    self.sizes[start_root] += self.sizes[end_root]
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheConnectionsComponents:
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_COMPONENTS)
+    return validate_cache_connections_components(cache)
+
+
+def _indexes_get(storage: 'StorageStruct') -> Dict[str, int]:
+    indexes = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    return validate_cache_nodes_indexes(indexes).cache_map
+
+
+def _edges_merge(storage: 'StorageStruct', self: CacheConnectionsComponents, connections: List[any]) -> None:
+    indexes = _indexes_get(storage)
+    for connection in connections:
+        if connection["distance"] is None:
+            continue
+        start_id = indexes.get(connection["start"])
+        end_id = indexes.get(connection["end"])
+        if start_id is not None and end_id is not None:
+            _union(self, start_id, end_id)
+
+
+def on_create_connections(storage: 'StorageStruct', new_connections: List[any]) -> None:
+    self = _cache_get(storage)
+    if self.dirty:
+        return
+    _edges_merge(storage, self, new_connections)
+
+
+def on_update_connections(storage: 'StorageStruct', old_connections: List[any], new_connections: List[any]) -> None:
+    """
+    Changed distances keep the components, unless the connection stops or starts being walkable
+    """
+    self = _cache_get(storage)
+    if self.dirty:
+        return
+
+    merged = []
+    for old_connection, new_connection in zip(old_connections, new_connections):
+        moved = old_connection["start"] != new_connection["start"] or old_connection["end"] != new_connection["end"]
+        if old_connection["distance"] is None:
+            merged.append(new_connection)
+        elif moved or new_connection["distance"] is None:
+            self.mark_dirty()
+            return
+    _edges_merge(storage, self, merged)
+
+
+def on_delete_connections(storage: 'StorageStruct', deleted_connections: List[any]) -> None:
+    self = _cache_get(storage)
+    if any(connection["distance"] is not None for connection in deleted_connections):
+        self.mark_dirty()
+
+
+def on_create_nodes(storage: 'StorageStruct', new_nodes: List[any]) -> None:
+    self = _cache_get(storage)
+    if self.dirty:
+        return
+    start_id = len(self.parents)
+    self.parents.extend(range(start_id, start_id + len(new_nodes)))
+    self.sizes.extend([1] * len(new_nodes))
+
+    # connections might have been created before their nodes
+    adjacency = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    adjacency = validate_cache_connections_adjacency(adjacency)
+    for node in new_nodes:
+        for data_alias in EDGES_ALIASES:
+            _edges_merge(storage, self, adjacency.read(data_alias, node["name"]))
+            _edges_merge(storage, self, adjacency.read_reversed(data_alias, node["name"]))
+
+
+def on_update_nodes(storage: 'StorageStruct', old_nodes: List[any], new_nodes: List[any]) -> None:
+    """
+    Renames keep the node indexes, but the connections naming the old name stop reaching the node and those naming the
+    new one start to
+    """
+    self = _cache_get(storage)
+    if any(old_node["name"] != new_node["name"] for old_node, new_node in zip(old_nodes, new_nodes)):
+        self.mark_dirty()
+
+
+def on_delete_nodes(storage: 'StorageStruct', deleted_nodes: List[any]) -> None:
+    # deleted nodes may split their components, and the swap-removal moves the indexes of the last nodes
+    _cache_get(storage).mark_dirty()
+
+
+def fork(storage: 'StorageStruct') -> CacheConnectionsComponents:
+    """
+    A pending rebuild stays pending, the copy is rebuilt from the edges of the storage it is read from
+    """
+    self = _cache_get(storage)
+    forked = CacheConnectionsComponents()
+    forked.parents = list(self.parents)
+    forked.sizes = list(self.sizes)
+    forked.dirty = self.dirty
+    return forked
+
+
+def validate_cache_connections_components(cache: CacheAbstract) -> CacheConnectionsComponents:
+    if not isinstance(cache, CacheConnectionsComponents):
+        raise ValueError(f"Expected CacheConnectionsComponents, got {type(cache)}")
+    return cache
@@ -0,0 +1,191 @@
+from typing import TYPE_CHECKING
+from typing import Dict, List, Tuple
+import numpy as np
+
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.general_cache.cache_connections_adjacency import CacheConnectionsAdjacency, \
+    validate_cache_connections_adjacency
+from src.runtime_storages.general_cache.cache_nodes_indexes import validate_cache_nodes_indexes
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+EDGES_ALIASES = [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]
+NO_NODE = -1
+
+_INITIAL_CAPACITY = 64
+
+
+class CacheConnectionsEdges(CacheAbstract):
+    """
+    The walkable connections (authentic and synthetic) packed as pairs of node indexes, which the walk distance
+    backends build their graphs from. The connections stay the name keyed elements, this is a derived view of them
+
+    The node indexes aren't stable, deleting nodes moves the last nodes and the rows naming them are patched.
+    Endpoints whose node doesn't exist are NO_NODE and missing distances are NaN. Rows are keyed by the identity of the
+    stored connection and swap-removed, node changes patch only the rows of the connections touching them
+    """
+
+    def __init__(self):
+        self.starts: np.ndarray = np.full(_INITIAL_CAPACITY, NO_NODE, dtype=np.int32)
+        self.ends: np.ndarray = np.full(_INITIAL_CAPACITY, NO_NODE, dtype=np.int32)
+        self.distances: np.ndarray = np.full(_INITIAL_CAPACITY, np.nan, dtype=np.float32)
+        self.rows: Dict[int, int] = {}
+        self.rows_connections: List[any] = []
+        self.count: int = 0
+
+    def read(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Starts, ends and distances of the edges between existing nodes
+        """
+        self.hits += 1
+        starts = self.starts[:self.count]
+        ends = self.ends[:self.count]
+        distances = self.distances[:self.count]
+        walkable = (starts != NO_NODE) & (ends != NO_NODE) & ~np.isnan(distances)
+        return starts[walkable], ends[walkable], distances[walkable]
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheConnectionsEdges:
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_EDGES)
+    return validate_cache_connections_edges(cache)
+
+
+def _indexes_get(storage: 'StorageStruct') -> Dict[str, int]:
+    indexes = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    return validate_cache_nodes_indexes(indexes).cache_map
+
+
+def _ensure_capacity(self: CacheConnectionsEdges, count: int) -> None:
+    capacity = len(self.starts)
+    if count <= capacity:
+        return
+    while capacity < count:
+        capacity *= 2
+
+    for attribute, fill in [("starts", NO_NODE), ("ends", NO_NODE), ("distances", np.nan)]:
+        old = getattr(self, attribute)
+        new = np.full(capacity, fill, dtype=old.dtype)
+        new[:self.count] = old[:self.count]
+        setattr(self, attribute, new)
+
+
+def _row_write(self: CacheConnectionsEdges, indexes: Dict[str, int], row: int, connection: any) -> None:
+    self.starts[row] = indexes.get(connection["start"], NO_NODE)
+    self.ends[row] = indexes.get(connection["end"], NO_NODE)
+    self.distances[row] = np.nan if connection["distance"] is None else connection["distance"]
+
+
+def _rows_add(storage: 'StorageStruct', connections: List[any]) -> None:
+    self = _cache_get(storage)
+    indexes = _indexes_get(storage)
+    start, end = self.count, self.count + len(connections)
+    _ensure_capacity(self, end)
+
+    self.starts[start:end] = [indexes.get(connection["start"], NO_NODE) for connection in connections]
+    self.ends[start:end] = [indexes.get(connection["end"], NO_NODE) for connection in connections]
+    self.distances[start:end] = [np.nan if connection["distance"] is None else connection["distance"] for
+                                 connection in connections]
+    self.rows.update(zip(map(id, connections), range(start, end)))
+    self.rows_connections.extend(connections)
+    self.count = end
+
+
+def _rows_update(storage: 'StorageStruct', connections: List[any]) -> None:
+    self = _cache_get(storage)
+    indexes = _indexes_get(storage)
+    for connection in connections:
+        _row_write(self, indexes, self.rows[id(connection)], connection)
+
+
+def _rows_remove(storage: 'StorageStruct', connections: List[any]) -> None:
+    self = _cache_get(storage)
+    for connection in connections:
+        row = self.rows.pop(id(connection))
+        last = self.count - 1
+        last_connection = self.rows_connections.pop()
+        if row != last:
+            self.starts[row] = self.starts[last]
+            self.ends[row] = self.ends[last]
+            self.distances[row] = self.distances[last]
+            self.rows_connections[row] = last_connection
+            self.rows[id(last_connection)] = row
+        self.count = last
+
+
+def on_create_connections(storage: 'StorageStruct', new_connections: List[any]) -> None:
+    _rows_add(storage, new_connections)
+
+
+def on_update_connections(storage: 'StorageStruct', old_connections: List[any], new_connections: List[any]) -> None:
+    # updates happen in place, so the rows of the stored objects are rewritten
+    _rows_update(storage, new_connections)
+
+
+def on_delete_connections(storage: 'StorageStruct', deleted_connections: List[any]) -> None:
+    _rows_remove(storage, deleted_connections)
+
+
+def _adjacency_get(storage: 'StorageStruct') -> CacheConnectionsAdjacency:
+    adjacency = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_ADJACENCY)
+    return validate_cache_connections_adjacency(adjacency)
+
+
+def _endpoints_set(self: CacheConnectionsEdges, adjacency: CacheConnectionsAdjacency, node_name: str,
+                   node_index: int) -> None:
+    """
+    Points the endpoints named node_name to node_index, found through the adjacency instead of scanning the edges
+    """
+    for data_alias in EDGES_ALIASES:
+        for connection in adjacency.read(data_alias, node_name):
+            self.starts[self.rows[id(connection)]] = node_index
+        for connection in adjacency.read_reversed(data_alias, node_name):
+            self.ends[self.rows[id(connection)]] = node_index
+
+
+def on_create_nodes(storage: 'StorageStruct', new_nodes: List[any]) -> None:
+    self = _cache_get(storage)
+    if self.count == 0:
+        return
+
+    adjacency = _adjacency_get(storage)
+    indexes = _indexes_get(storage)
+    for node in new_nodes:
+        _endpoints_set(self, adjacency, node["name"], indexes[node["name"]])
+
+
+def on_update_nodes(storage: 'StorageStruct', old_nodes: List[any], new_nodes: List[any]) -> None:
+    self = _cache_get(storage)
+    adjacency = _adjacency_get(storage)
+    renamed = [(old_node["name"], new_node["name"]) for old_node, new_node in zip(old_nodes, new_nodes) if
+               old_node["name"] != new_node["name"]]
+    # all the old names are released first, so names can be swapped inside the same update
+    for old_name, _ in renamed:
+        _endpoints_set(self, adjacency, old_name, NO_NODE)
+    indexes = _indexes_get(storage)
+    for _, new_name in renamed:
+        _endpoints_set(self, adjacency, new_name, indexes[new_name])
+
+
+def on_delete_nodes(storage: 'StorageStruct', deleted_nodes: List[any]) -> None:
+    """
+    Nodes are swap-removed, the moved nodes are the ones whose old indexes are past the remaining nodes
+    """
+    self = _cache_get(storage)
+    adjacency = _adjacency_get(storage)
+    for node in deleted_nodes:
+        _endpoints_set(self, adjacency, node["name"], NO_NODE)
+
+    indexes = _indexes_get(storage)
+    count = len(storage.nodes_authentic)
+    for endpoints, field in [(self.starts, "start"), (self.ends, "end")]:
+        for row in np.flatnonzero(endpoints[:self.count] >= count).tolist():
+            endpoints[row] = indexes[self.rows_connections[row][field]]
+
+
+def validate_cache_connections_edges(cache: CacheAbstract) -> CacheConnectionsEdges:
+    if not isinstance(cache, CacheConnectionsEdges):
+        raise ValueError(f"Expected CacheConnectionsEdges, got {type(cache)}")
+    return cache
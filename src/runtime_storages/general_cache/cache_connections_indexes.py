@@ -0,0 +1,104 @@
+from typing import TYPE_CHECKING
+from typing import Dict, List
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+SlotsMap = Dict[str, List[int]]
+
+CONNECTIONS_ALIASES = [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC, DataAlias.CONNECTIONS_NULL]
+
+
+class CacheConnectionsIndexes(CacheAbstract):
+    """
+    Keeps track of the indexes of each connection, by name
+
+    Connection names are not unique (null connections are named after their node), so each name maps to all its slots
+    """
+
+    def __init__(self):
+        self.cache_map: Dict[DataAlias, SlotsMap] = {alias: {} for alias in CONNECTIONS_ALIASES}
+
+    def read(self, data_alias: DataAlias, connection_name: str) -> List[int]:
+        return self.lookup(self.cache_map[data_alias], connection_name)
+
+
+def _connections_list_get(storage: 'StorageStruct', data_alias: DataAlias) -> List[any]:
+    if data_alias == DataAlias.CONNECTIONS_AUTHENTIC:
+        return storage.connections_authentic
+    if data_alias == DataAlias.CONNECTIONS_SYNTHETIC:
+        return storage.connections_synthetic
+    return storage.connections_null
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheConnectionsIndexes:
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_INDEX_MAP)
+    return validate_cache_connections_indexes(cache)
+
+
+def _build_subscribers(data_alias: DataAlias):
+    def on_create_connections(storage: 'StorageStruct', new_connections: List[any]) -> None:
+        slots_map = _cache_get(storage).cache_map[data_alias]
+        start_index = len(_connections_list_get(storage, data_alias)) - len(new_connections)
+        for i, connection in enumerate(new_connections):
+            slots_map.setdefault(connection["name"], []).append(start_index + i)
+
+    def on_update_connections(storage: 'StorageStruct', old_connections: List[any],
+                              new_connections: List[any]) -> None:
+        slots_map = _cache_get(storage).cache_map[data_alias]
+        renamed = [(old["name"], new["name"]) for old, new in zip(old_connections, new_connections) if
+                   old["name"] != new["name"]]
+        moved_slots = {old_name: slots_map.pop(old_name) for old_name, _ in renamed if old_name in slots_map}
+        for old_name, new_name in renamed:
+            if old_name in moved_slots:
+                slots_map.setdefault(new_name, []).extend(moved_slots.pop(old_name))
+
+    def on_delete_connections(storage: 'StorageStruct', deleted_connections: List[any]) -> None:
+        """
+        Patches only the slots which were filled by swap-removal
+        """
+        slots_map = _cache_get(storage).cache_map[data_alias]
+        connections = _connections_list_get(storage, data_alias)
+        remaining = len(connections)
+
+        freed_slots = []
+        for name in dict.fromkeys(connection["name"] for connection in deleted_connections):
+            freed_slots.extend(slots_map.pop(name, []))
+
+        for slot in freed_slots:
+            if slot >= remaining:
+                continue
+            moved_name = connections[slot]["name"]
+            slots = [moved_slot for moved_slot in slots_map[moved_name] if moved_slot < remaining]
+            slots.append(slot)
+            slots_map[moved_name] = slots
+
+    return on_create_connections, on_update_connections, on_delete_connections
+
+
+on_create_connections_authentic, on_update_connections_authentic, on_delete_connections_authentic = \
+    _build_subscribers(DataAlias.CONNECTIONS_AUTHENTIC)
+on_create_connections_synthetic, on_update_connections_synthetic, on_delete_connections_synthetic = \
+    _build_subscribers(DataAlias.CONNECTIONS_SYNTHETIC)
+on_create_connections_null, on_update_connections_null, on_delete_connections_null = \
+    _build_subscribers(DataAlias.CONNECTIONS_NULL)
+
+
+def fork(storage: 'StorageStruct') -> CacheConnectionsIndexes:
+    """
+    The slots of a name are changed in place, so they are copied as well
+    """
+    self = _cache_get(storage)
+    forked = CacheConnectionsIndexes()
+    forked.cache_map = {data_alias: {name: list(slots) for name, slots in slots_map.items()} for
+                        data_alias, slots_map in self.cache_map.items()}
+    return forked
+
+
+def validate_cache_connections_indexes(cache: CacheAbstract) -> CacheConnectionsIndexes:
+    if not isinstance(cache, CacheConnectionsIndexes):
+        raise ValueError(f"Expected CacheConnectionsIndexes, got {type(cache)}")
+    return cache
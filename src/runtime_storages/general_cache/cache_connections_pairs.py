@@ -0,0 +1,84 @@
+from typing import TYPE_CHECKING
+from typing import Dict, List, Tuple
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+PairsCounter = Dict[Tuple[str, str], int]
+
+PAIRS_ALIASES = [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]
+
+
+class CacheConnectionsPairs(CacheAbstract):
+    """
+    Counts the stored connections for each (start, end) pair, for existence checks in O(1)
+    """
+
+    def __init__(self):
+        self.pairs: Dict[DataAlias, PairsCounter] = {alias: {} for alias in PAIRS_ALIASES}
+
+    def read(self, data_alias: DataAlias, start: str, end: str, directed: bool = True) -> bool:
+        self.hits += 1
+        pairs = self.pairs[data_alias]
+        if (start, end) in pairs:
+            return True
+        if not directed and (end, start) in pairs:
+            return True
+        return False
+
+
+def _pairs_add(pairs: PairsCounter, connections: List[any]) -> None:
+    for connection in connections:
+        key = (connection["start"], connection["end"])
+        pairs[key] = pairs.get(key, 0) + 1
+
+
+def _pairs_remove(pairs: PairsCounter, connections: List[any]) -> None:
+    for connection in connections:
+        key = (connection["start"], connection["end"])
+        pairs[key] -= 1
+        if pairs[key] == 0:
+            del pairs[key]
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheConnectionsPairs:
+    cache = cache_general_get(storage, CacheGeneralAlias.CONNECTIONS_PAIRS)
+    return validate_cache_connections_pairs(cache)
+
+
+def _build_subscribers(data_alias: DataAlias):
+    def on_create_connections(storage: 'StorageStruct', new_connections: List[any]) -> None:
+        _pairs_add(_cache_get(storage).pairs[data_alias], new_connections)
+
+    def on_update_connections(storage: 'StorageStruct', old_connections: List[any],
+                              new_connections: List[any]) -> None:
+        pairs = _cache_get(storage).pairs[data_alias]
+        _pairs_remove(pairs, old_connections)
+        _pairs_add(pairs, new_connections)
+
+    def on_delete_connections(storage: 'StorageStruct', deleted_connections: List[any]) -> None:
+        _pairs_remove(_cache_get(storage).pairs[data_alias], deleted_connections)
+
+    return on_create_connections, on_update_connections, on_delete_connections
+
+
+on_create_connections_authentic, on_update_connections_authentic, on_delete_connections_authentic = \
+    _build_subscribers(DataAlias.CONNECTIONS_AUTHENTIC)
+on_create_connections_synthetic, on_update_connections_synthetic, on_delete_connections_synthetic = \
+    _build_subscribers(DataAlias.CONNECTIONS_SYNTHETIC)
+
+
+def fork(storage: 'StorageStruct') -> CacheConnectionsPairs:
+    self = _cache_get(storage)
+    forked = CacheConnectionsPairs()
+    forked.pairs = {data_alias: dict(pairs) for data_alias, pairs in self.pairs.items()}
+    return forked
+
+
+def validate_cache_connections_pairs(cache: CacheAbstract) -> CacheConnectionsPairs:
+    if not isinstance(cache, CacheConnectionsPairs):
+        raise ValueError(f"Expected CacheConnectionsPairs, got {type(cache)}")
+    return cache
@@ -12,14 +12,16 @@ if TYPE_CHECKING:
 
 class CacheNodesIndexes(CacheAbstract):
     """
-    Keeps track of th indexes of each node
+    Keeps track of th indexes of each node, the caches packing the nodes into arrays use them as positions
+
+    The indexes aren't stable, deleting nodes moves the last nodes into the freed slots
     """
 
     def __init__(self):
         self.cache_map: Dict[str, any] = {}
 
     def read(self, node_name: str) -> int:
-        return self.cache_map[node_name]
+        return self.lookup(self.cache_map, node_name)
 
 
 def on_create_nodes(storage: 'StorageStruct',
@@ -36,12 +38,30 @@ def on_create_nodes(storage: 'StorageStruct',
 
 def on_update_nodes(storage: 'StorageStruct',
                     old_nodes: List[NodeAuthenticData], new_nodes: List[NodeAuthenticData]) -> None:
-    pass
+    self = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    self = validate_cache_nodes_indexes(self)
+
+    renamed = [(old_node["name"], new_node["name"]) for old_node, new_node in zip(old_nodes, new_nodes) if
+               old_node["name"] != new_node["name"]]
+    # all the old names are released first, so names can be swapped inside the same update
+    slots = [self.cache_map.pop(old_name) for old_name, _ in renamed]
+    for (_, new_name), slot in zip(renamed, slots):
+        self.cache_map[new_name] = slot
 
 
 def on_delete_nodes(storage: 'StorageStruct',
                     deleted_nodes: List[NodeAuthenticData]) -> None:
-    on_invalidate_and_recalculate(storage)
+    """
+    Nodes are swap-removed, so only the slots which received a moved node are patched
+    """
+    self = cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP)
+    self = validate_cache_nodes_indexes(self)
+
+    nodes = storage.nodes_authentic
+    freed_slots = [self.cache_map.pop(node["name"]) for node in deleted_nodes]
+    for slot in freed_slots:
+        if slot < len(nodes):
+            self.cache_map[nodes[slot]["name"]] = slot
 
 
 def on_invalidate_and_recalculate(storage: 'StorageStruct') -> None:
@@ -51,6 +71,13 @@ def on_invalidate_and_recalculate(storage: 'StorageStruct') -> None:
         self.cache_map[node["name"]] = i
 
 
+def fork(storage: 'StorageStruct') -> CacheNodesIndexes:
+    self = validate_cache_nodes_indexes(cache_general_get(storage, CacheGeneralAlias.NODE_INDEX_MAP))
+    forked = CacheNodesIndexes()
+    forked.cache_map = dict(self.cache_map)
+    return forked
+
+
 def validate_cache_nodes_indexes(cache: CacheAbstract) -> CacheNodesIndexes:
     if not isinstance(cache, CacheNodesIndexes):
         raise ValueError(f"Expected CacheNodesIndexes, got {type(cache)}")
@@ -22,7 +22,7 @@ class CacheNodesMap(CacheAbstract):
         pass
 
     def read(self, node_name: str) -> NodeAuthenticData:
-        return self.cache_map[node_name]
+        return self.lookup(self.cache_map, node_name)
 
 
 def on_create_nodes(storage: 'StorageStruct',
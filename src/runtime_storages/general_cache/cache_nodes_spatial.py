@@ -0,0 +1,191 @@
+from typing import TYPE_CHECKING
+from typing import Dict, List, Tuple
+import math
+import numpy as np
+from scipy.spatial import cKDTree
+
+from src.navigation_core.autonomous_exploration.params import IS_CLOSE_THRESHOLD
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import NodeAuthenticData, CacheGeneralAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+Cell = Tuple[int, int]
+Position = Tuple[float, float]
+
+
+class CacheNodesSpatial(CacheAbstract):
+    """
+    Uniform grid over the metadata coordinates of the nodes (params x and y), for radius and nearest queries
+
+    The cell size is the closeness threshold, so radius queries with it only look at the 3x3 cells around the target.
+    For maps which don't change anymore a KD-tree can be built on top, it is dropped on the next mutation of the nodes
+    """
+
+    def __init__(self, cell_size: float = IS_CLOSE_THRESHOLD):
+        self.cell_size: float = cell_size
+        self.positions: Dict[str, Position] = {}
+        self.cells: Dict[Cell, Dict[str, Position]] = {}
+        self.tree: cKDTree | None = None
+        self.tree_names: List[str] = []
+
+    def read(self, node_name: str) -> Position:
+        return self.lookup(self.positions, node_name)
+
+    def read_within_radius(self, x: float, y: float, radius: float) -> List[str]:
+        """
+        Nodes strictly closer than the radius to the target
+        """
+        self.hits += 1
+        if self.tree is not None:
+            found = self.tree.query_ball_point([x, y], radius)
+            return [self.tree_names[i] for i in found if
+                    _distance(self.positions[self.tree_names[i]], x, y) < radius]
+
+        cell_x, cell_y = _cell_of(self.cell_size, x, y)
+        reach = math.ceil(radius / self.cell_size)
+        found = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for name, position in self.cells.get((cell_x + dx, cell_y + dy), {}).items():
+                    if _distance(position, x, y) < radius:
+                        found.append(name)
+
+        return found
+
+    def read_nearest(self, x: float, y: float) -> str | None:
+        self.hits += 1
+        if len(self.positions) == 0:
+            return None
+        if self.tree is not None:
+            _, index = self.tree.query([x, y])
+            return self.tree_names[index]
+
+        # rings of cells are searched outwards, until no closer node can exist in the next ring
+        cell_x, cell_y = _cell_of(self.cell_size, x, y)
+        max_ring = max(max(abs(cx - cell_x), abs(cy - cell_y)) for cx, cy in self.cells)
+        closest_name = None
+        closest_distance = float("inf")
+        for ring in range(max_ring + 1):
+            if closest_distance <= (ring - 1) * self.cell_size:
+                break
+            for cell in _ring_cells(cell_x, cell_y, ring):
+                for name, position in self.cells.get(cell, {}).items():
+                    distance = _distance(position, x, y)
+                    if distance < closest_distance:
+                        closest_distance = distance
+                        closest_name = name
+
+        return closest_name
+
+
+def _distance(position: Position, x: float, y: float) -> float:
+    return math.sqrt((position[0] - x) ** 2 + (position[1] - y) ** 2)
+
+
+def _cell_of(cell_size: float, x: float, y: float) -> Cell:
+    return math.floor(x / cell_size), math.floor(y / cell_size)
+
+
+def _ring_cells(cell_x: int, cell_y: int, ring: int) -> List[Cell]:
+    if ring == 0:
+        return [(cell_x, cell_y)]
+
+    cells = []
+    for d in range(-ring, ring + 1):
+        cells.append((cell_x + d, cell_y - ring))
+        cells.append((cell_x + d, cell_y + ring))
+    for d in range(-ring + 1, ring):
+        cells.append((cell_x - ring, cell_y + d))
+        cells.append((cell_x + ring, cell_y + d))
+    return cells
+
+
+def _node_position(node: NodeAuthenticData) -> Position | None:
+    params = node.get("params")
+    if params is None or params.get("x") is None or params.get("y") is None:
+        return None
+    return params["x"], params["y"]
+
+
+def _nodes_add(self: CacheNodesSpatial, nodes: List[NodeAuthenticData]) -> None:
+    for node in nodes:
+        position = _node_position(node)
+        if position is None:
+            continue
+        self.positions[node["name"]] = position
+        cell = _cell_of(self.cell_size, position[0], position[1])
+        self.cells.setdefault(cell, {})[node["name"]] = position
+
+
+def _nodes_remove(self: CacheNodesSpatial, names: List[str]) -> None:
+    for name in names:
+        position = self.positions.pop(name, None)
+        if position is None:
+            continue
+        cell = _cell_of(self.cell_size, position[0], position[1])
+        del self.cells[cell][name]
+        if len(self.cells[cell]) == 0:
+            del self.cells[cell]
+
+
+def _cache_get(storage: 'StorageStruct') -> CacheNodesSpatial:
+    cache = cache_general_get(storage, CacheGeneralAlias.NODES_SPATIAL)
+    return validate_cache_nodes_spatial(cache)
+
+
+def on_create_nodes(storage: 'StorageStruct', new_nodes: List[NodeAuthenticData]) -> None:
+    self = _cache_get(storage)
+    self.tree = None
+    _nodes_add(self, new_nodes)
+
+
+def on_update_nodes(storage: 'StorageStruct', old_nodes: List[NodeAuthenticData],
+                    new_nodes: List[NodeAuthenticData]) -> None:
+    self = _cache_get(storage)
+    moved = [(old_node, new_node) for old_node, new_node in zip(old_nodes, new_nodes) if
+             old_node["name"] != new_node["name"] or old_node["params"] is not new_node["params"]]
+    if len(moved) == 0:
+        return
+
+    self.tree = None
+    _nodes_remove(self, [old_node["name"] for old_node, _ in moved])
+    _nodes_add(self, [new_node for _, new_node in moved])
+
+
+def on_delete_nodes(storage: 'StorageStruct', deleted_nodes: List[NodeAuthenticData]) -> None:
+    self = _cache_get(storage)
+    self.tree = None
+    _nodes_remove(self, [node["name"] for node in deleted_nodes])
+
+
+def build_tree(storage: 'StorageStruct') -> None:
+    """
+    Builds a KD-tree over the current positions, used by the queries until the nodes change again
+    """
+    self = _cache_get(storage)
+    if len(self.positions) == 0:
+        return
+    self.tree_names = list(self.positions.keys())
+    self.tree = cKDTree(np.array([self.positions[name] for name in self.tree_names], dtype=np.float64))
+
+
+def fork(storage: 'StorageStruct') -> CacheNodesSpatial:
+    """
+    Copy of the grid sharing the KD-tree, which is replaced rather than changed
+    """
+    self = _cache_get(storage)
+    forked = CacheNodesSpatial(self.cell_size)
+    forked.positions = dict(self.positions)
+    forked.cells = {cell: dict(positions) for cell, positions in self.cells.items()}
+    forked.tree = self.tree
+    forked.tree_names = self.tree_names
+    return forked
+
+
+def validate_cache_nodes_spatial(cache: CacheAbstract) -> CacheNodesSpatial:
+    if not isinstance(cache, CacheNodesSpatial):
+        raise ValueError(f"Expected CacheNodesSpatial, got {type(cache)}")
+    return cache
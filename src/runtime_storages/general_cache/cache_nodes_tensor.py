@@ -0,0 +1,123 @@
+import warnings
+from typing import TYPE_CHECKING
+from typing import Dict, List
+import numpy as np
+import torch
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.other import cache_general_get
+from src.runtime_storages.types import NodeAuthenticData, CacheGeneralAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+
+class CacheNodesTensor(CacheAbstract):
+    """
+    Hands out the datapoints of the nodes as tensors, over the float32 arrays the nodes hold them in
+
+    The arrays are replaced on updates and never written into, so a tensor viewing one stays valid and unchanged
+    whatever happens to the nodes afterward. The datapoints are held once, by the nodes, gathers stack the rows they
+    read into a new tensor
+
+    There's no single block owning the datapoints: the nodes hold mapped or shared rows without copying them, and
+    views handed out would be overwritten by the swap-removal of the block on deletes
+    """
+
+    def __init__(self):
+        self.rows_map: Dict[str, np.ndarray] = {}
+
+    def read(self, node_name: str) -> torch.Tensor:
+        return _tensor_view(self.lookup(self.rows_map, node_name))
+
+    def read_rows(self, nodes_names: List[str]) -> torch.Tensor:
+        rows = [self.lookup(self.rows_map, name) for name in nodes_names]
+        if len(rows) == 0:
+            return torch.empty((0,) + _rows_shape(self), dtype=torch.float32)
+        return torch.from_numpy(np.stack(rows))
+
+    def read_rows_at_indexes(self, nodes_names: List[str], datapoints_indexes: List[int]) -> torch.Tensor:
+        rows = [self.lookup(self.rows_map, name)[index] for name, index in zip(nodes_names, datapoints_indexes)]
+        if len(rows) == 0:
+            return torch.empty((0,) + _rows_shape(self)[1:], dtype=torch.float32)
+        return torch.from_numpy(np.stack(rows))
+
+
+def _tensor_view(array: np.ndarray) -> torch.Tensor:
+    if array.flags.writeable:
+        return torch.from_numpy(array)
+    # torch warns that it can't make the tensor read only, the rows are never written through the views anyway
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(array)
+
+
+def _rows_shape(self: CacheNodesTensor) -> tuple:
+    for row in self.rows_map.values():
+        return row.shape
+    return ()
+
+
+def _rows_check_shapes(self: CacheNodesTensor, new_rows: List[np.ndarray], shape: tuple) -> None:
+    """
+    All the nodes share one shape, so their datapoints can be gathered together
+    """
+    for row in new_rows:
+        if row.shape != shape:
+            raise ValueError(f"Nodes datapoints of shape {row.shape} do not match the storage shape {shape}")
+
+
+def on_create_nodes(storage: 'StorageStruct',
+                    new_nodes: List[NodeAuthenticData]) -> None:
+    self = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    self = validate_cache_nodes_tensor(self)
+    if len(new_nodes) == 0:
+        return
+
+    new_rows = [new_node["datapoints_array"] for new_node in new_nodes]
+    _rows_check_shapes(self, new_rows, _rows_shape(self) if len(self.rows_map) > 0 else new_rows[0].shape)
+    for new_node, new_row in zip(new_nodes, new_rows):
+        self.rows_map[new_node["name"]] = new_row
+
+
+def on_update_nodes(storage: 'StorageStruct',
+                    old_nodes: List[NodeAuthenticData], new_nodes: List[NodeAuthenticData]) -> None:
+    """
+    The shape can only change when all the nodes change at once, as when their datapoints are transformed
+    """
+    self = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    self = validate_cache_nodes_tensor(self)
+    if len(new_nodes) == 0:
+        return
+
+    for old_node in old_nodes:
+        self.rows_map.pop(old_node["name"])
+    new_rows = [new_node["datapoints_array"] for new_node in new_nodes]
+    shape = _rows_shape(self) if len(self.rows_map) > 0 else new_rows[0].shape
+    for new_node, new_row in zip(new_nodes, new_rows):
+        self.rows_map[new_node["name"]] = new_row
+    _rows_check_shapes(self, new_rows, shape)
+
+
+def on_delete_nodes(storage: 'StorageStruct',
+                    deleted_nodes: List[NodeAuthenticData]) -> None:
+    self = cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE)
+    self = validate_cache_nodes_tensor(self)
+
+    for deleted_node in deleted_nodes:
+        del self.rows_map[deleted_node["name"]]
+
+
+def fork(storage: 'StorageStruct') -> CacheNodesTensor:
+    """
+    Copy of the cache sharing the datapoints arrays, which are never written into
+    """
+    self = validate_cache_nodes_tensor(cache_general_get(storage, CacheGeneralAlias.NODE_TENSOR_STORE))
+    forked = CacheNodesTensor()
+    forked.rows_map = dict(self.rows_map)
+    return forked
+
+
+def validate_cache_nodes_tensor(cache: CacheAbstract) -> CacheNodesTensor:
+    if not isinstance(cache, CacheNodesTensor):
+        raise ValueError(f"Expected CacheNodesTensor, got {type(cache)}")
+    return cache
@@ -1,9 +1,12 @@
 from .cache_functions import cache_general_get, cache_specialized_get
-from .cache_initializations import create_caches_general, create_caches_specialized
+from .cache_initializations import create_caches
+from .cache_registry import CacheDefinition, CacheSubscription, caches_register
 
 __all__ = [
     "cache_general_get",
     "cache_specialized_get",
-    "create_caches_general",
-    "create_caches_specialized"
+    "create_caches",
+    "CacheDefinition",
+    "CacheSubscription",
+    "caches_register",
 ]
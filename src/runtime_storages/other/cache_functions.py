@@ -1,7 +1,7 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
-from src.runtime_storages.types import CacheGeneralAlias
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
 from src.runtime_storages.cache_abstract import CacheAbstract
 
 if TYPE_CHECKING:
@@ -12,9 +12,67 @@ def cache_registration(storage: 'StorageStruct', alias: 'CacheGeneralAlias', cac
     storage.caches[alias] = cache
 
 
+def _data_get(storage: 'StorageStruct', data_alias: DataAlias) -> List[any]:
+    return {
+        DataAlias.NODE_AUTHENTIC: storage.nodes_authentic,
+        DataAlias.CONNECTIONS_AUTHENTIC: storage.connections_authentic,
+        DataAlias.CONNECTIONS_SYNTHETIC: storage.connections_synthetic,
+        DataAlias.CONNECTIONS_NULL: storage.connections_null,
+    }[data_alias]
+
+
+def _cache_store(storage: 'StorageStruct', alias: any, cache: 'CacheAbstract') -> None:
+    if isinstance(alias, FunctionalityAlias):
+        storage.caches_functionalities[alias] = cache
+    else:
+        cache_registration(storage, alias, cache)
+
+
+def cache_install(storage: 'StorageStruct', alias: any, cache: 'CacheAbstract') -> None:
+    """
+    Puts an already built cache in the storage, its subscribers are called from now on
+    """
+    _cache_store(storage, alias, cache)
+    storage.caches_active.add(alias)
+
+
+def cache_activate(storage: 'StorageStruct', alias: any) -> None:
+    """
+    Builds a registered cache and its dependencies, by replaying the creation of the stored data through its subscribers
+
+    Readers build the caches they read, so the activations are serialized between them. The cache is only marked active
+    once built, its own subscribers reading it while it is replayed don't activate it again
+    """
+    with storage.lazy_caches_lock:
+        if alias in storage.caches_active or alias in storage.caches_activating:
+            return
+        definition = storage.caches_definitions[alias]
+        for dependency in definition.depends_on:
+            cache_activate(storage, dependency)
+
+        storage.caches_activating.add(alias)
+        try:
+            _cache_store(storage, alias, definition.factory())
+
+            # data is replayed in the order of the aliases, so nodes exist before the connections between them
+            subscriptions = sorted(definition.subscriptions, key=lambda subscription: list(DataAlias).index(
+                subscription.data_alias))
+            for subscription in subscriptions:
+                elements = _data_get(storage, subscription.data_alias)
+                if len(elements) > 0:
+                    subscription.create_subscriber(storage, elements)
+            storage.caches_active.add(alias)
+        finally:
+            storage.caches_activating.discard(alias)
+
+
 def cache_general_get(storage: 'StorageStruct', cache_type: 'CacheGeneralAlias') -> 'CacheAbstract':
+    if cache_type not in storage.caches_active:
+        cache_activate(storage, cache_type)
     return storage.caches[cache_type]
 
 
 def cache_specialized_get(storage: 'StorageStruct', cache_type: FunctionalityAlias) -> 'CacheAbstract':
+    if cache_type not in storage.caches_active:
+        cache_activate(storage, cache_type)
     return storage.caches_functionalities[cache_type]
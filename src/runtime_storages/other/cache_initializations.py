@@ -1,59 +1,190 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 from src.runtime_storages.functions.functionalities import get_walk_distance
 from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
-from src.runtime_storages.functions.functionalities.utils import cache_functionalities_create_new
-from src.runtime_storages.other.cache_functions import cache_registration
-from src.runtime_storages.functions.subscriber_functions import subscribe_to_crud_operations
-from src.runtime_storages.types import DataAlias, CacheGeneralAlias
-from src.runtime_storages.general_cache import cache_nodes_map, cache_nodes_indexes
+from src.runtime_storages.other.cache_registry import CacheDefinition, CacheSubscription, caches_register
+from src.runtime_storages.types import DataAlias, CacheGeneralAlias, CacheActivation
+from src.runtime_storages.general_cache import cache_nodes_map, cache_nodes_indexes, cache_nodes_tensor, \
+    cache_nodes_spatial, cache_connections_adjacency, cache_connections_pairs, cache_connections_indexes, \
+    cache_connections_edges, cache_connections_components
 
 if TYPE_CHECKING:
     from src.runtime_storages.storage_struct import StorageStruct
 
 
-def create_caches_specialized(storage: 'StorageStruct'):
-    cache_functionalities_create_new(storage, FunctionalityAlias.GET_WALK_DISTANCE)
-    subscribe_to_crud_operations(
-        storage=storage,
-        data_alias=DataAlias.CONNECTIONS_AUTHENTIC,
-        create_subscriber=get_walk_distance.on_create_connections,
-        update_subscriber=get_walk_distance.on_update_connections,
-        delete_subscriber=get_walk_distance.on_delete_connections
-    )
-    subscribe_to_crud_operations(
-        storage=storage,
-        data_alias=DataAlias.CONNECTIONS_SYNTHETIC,
-        create_subscriber=get_walk_distance.on_create_connections,
-        update_subscriber=get_walk_distance.on_update_connections,
-        delete_subscriber=get_walk_distance.on_delete_connections
-    )
-    subscribe_to_crud_operations(
-        storage=storage,
-        data_alias=DataAlias.NODE_AUTHENTIC,
-        create_subscriber=get_walk_distance.on_create_nodes,
-        update_subscriber=get_walk_distance.on_update_nodes,
-        delete_subscriber=get_walk_distance.on_delete_nodes
-    )
-
-
-def create_caches_general(storage: 'StorageStruct'):
+def caches_general_definitions() -> List[CacheDefinition]:
     """
-    Creates caches which are simple and relied upon by many functions
+    Caches which are simple and relied upon by many functions
+
+    The indexes crud relies on are eager, the derived ones are only built once something reads them
+    """
+    return [
+        CacheDefinition(
+            alias=CacheGeneralAlias.NODE_CACHE_MAP,
+            factory=cache_nodes_map.CacheNodesMap,
+            subscriptions=[
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, cache_nodes_map.on_create_nodes,
+                                  cache_nodes_map.on_update_nodes, cache_nodes_map.on_delete_nodes),
+            ],
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.NODE_INDEX_MAP,
+            factory=cache_nodes_indexes.CacheNodesIndexes,
+            subscriptions=[
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, cache_nodes_indexes.on_create_nodes,
+                                  cache_nodes_indexes.on_update_nodes, cache_nodes_indexes.on_delete_nodes),
+            ],
+            fork=cache_nodes_indexes.fork,
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.NODE_TENSOR_STORE,
+            factory=cache_nodes_tensor.CacheNodesTensor,
+            subscriptions=[
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, cache_nodes_tensor.on_create_nodes,
+                                  cache_nodes_tensor.on_update_nodes, cache_nodes_tensor.on_delete_nodes),
+            ],
+            activation=CacheActivation.ON_FIRST_READ,
+            fork=cache_nodes_tensor.fork,
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.NODES_SPATIAL,
+            factory=cache_nodes_spatial.CacheNodesSpatial,
+            subscriptions=[
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, cache_nodes_spatial.on_create_nodes,
+                                  cache_nodes_spatial.on_update_nodes, cache_nodes_spatial.on_delete_nodes),
+            ],
+            activation=CacheActivation.ON_FIRST_READ,
+            fork=cache_nodes_spatial.fork,
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.CONNECTIONS_ADJACENCY,
+            factory=cache_connections_adjacency.CacheConnectionsAdjacency,
+            subscriptions=[
+                CacheSubscription(DataAlias.CONNECTIONS_AUTHENTIC,
+                                  cache_connections_adjacency.on_create_connections_authentic,
+                                  cache_connections_adjacency.on_update_connections_authentic,
+                                  cache_connections_adjacency.on_delete_connections_authentic),
+                CacheSubscription(DataAlias.CONNECTIONS_SYNTHETIC,
+                                  cache_connections_adjacency.on_create_connections_synthetic,
+                                  cache_connections_adjacency.on_update_connections_synthetic,
+                                  cache_connections_adjacency.on_delete_connections_synthetic),
+                CacheSubscription(DataAlias.CONNECTIONS_NULL,
+                                  cache_connections_adjacency.on_create_connections_null,
+                                  cache_connections_adjacency.on_update_connections_null,
+                                  cache_connections_adjacency.on_delete_connections_null),
+            ],
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.CONNECTIONS_EDGES,
+            factory=cache_connections_edges.CacheConnectionsEdges,
+            subscriptions=[
+                CacheSubscription(data_alias, cache_connections_edges.on_create_connections,
+                                  cache_connections_edges.on_update_connections,
+                                  cache_connections_edges.on_delete_connections) for data_alias in
+                cache_connections_edges.EDGES_ALIASES
+            ] + [
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, cache_connections_edges.on_create_nodes,
+                                  cache_connections_edges.on_update_nodes, cache_connections_edges.on_delete_nodes),
+            ],
+            # resolves names through the node indexes and the adjacency
+            depends_on=[CacheGeneralAlias.NODE_INDEX_MAP, CacheGeneralAlias.CONNECTIONS_ADJACENCY],
+            activation=CacheActivation.ON_FIRST_READ,
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.CONNECTIONS_COMPONENTS,
+            factory=cache_connections_components.CacheConnectionsComponents,
+            subscriptions=[
+                CacheSubscription(data_alias, cache_connections_components.on_create_connections,
+                                  cache_connections_components.on_update_connections,
+                                  cache_connections_components.on_delete_connections) for data_alias in
+                cache_connections_edges.EDGES_ALIASES
+            ] + [
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, cache_connections_components.on_create_nodes,
+                                  cache_connections_components.on_update_nodes,
+                                  cache_connections_components.on_delete_nodes),
+            ],
+            # merges through the node indexes, and the adjacency for connections created before their nodes
+            depends_on=[CacheGeneralAlias.NODE_INDEX_MAP, CacheGeneralAlias.CONNECTIONS_ADJACENCY],
+            activation=CacheActivation.ON_FIRST_READ,
+            fork=cache_connections_components.fork,
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.CONNECTIONS_PAIRS,
+            factory=cache_connections_pairs.CacheConnectionsPairs,
+            subscriptions=[
+                CacheSubscription(DataAlias.CONNECTIONS_AUTHENTIC,
+                                  cache_connections_pairs.on_create_connections_authentic,
+                                  cache_connections_pairs.on_update_connections_authentic,
+                                  cache_connections_pairs.on_delete_connections_authentic),
+                CacheSubscription(DataAlias.CONNECTIONS_SYNTHETIC,
+                                  cache_connections_pairs.on_create_connections_synthetic,
+                                  cache_connections_pairs.on_update_connections_synthetic,
+                                  cache_connections_pairs.on_delete_connections_synthetic),
+            ],
+            activation=CacheActivation.ON_FIRST_READ,
+            fork=cache_connections_pairs.fork,
+        ),
+        CacheDefinition(
+            alias=CacheGeneralAlias.CONNECTIONS_INDEX_MAP,
+            factory=cache_connections_indexes.CacheConnectionsIndexes,
+            subscriptions=[
+                CacheSubscription(DataAlias.CONNECTIONS_AUTHENTIC,
+                                  cache_connections_indexes.on_create_connections_authentic,
+                                  cache_connections_indexes.on_update_connections_authentic,
+                                  cache_connections_indexes.on_delete_connections_authentic),
+                CacheSubscription(DataAlias.CONNECTIONS_SYNTHETIC,
+                                  cache_connections_indexes.on_create_connections_synthetic,
+                                  cache_connections_indexes.on_update_connections_synthetic,
+                                  cache_connections_indexes.on_delete_connections_synthetic),
+                CacheSubscription(DataAlias.CONNECTIONS_NULL,
+                                  cache_connections_indexes.on_create_connections_null,
+                                  cache_connections_indexes.on_update_connections_null,
+                                  cache_connections_indexes.on_delete_connections_null),
+            ],
+            fork=cache_connections_indexes.fork,
+        ),
+    ]
+
+
+def caches_specialized_definitions() -> List[CacheDefinition]:
     """
-    cache_registration(storage, CacheGeneralAlias.NODE_CACHE_MAP, cache_nodes_map.CacheNodesMap())
-    subscribe_to_crud_operations(
-        storage=storage,
-        data_alias=DataAlias.NODE_AUTHENTIC,
-        create_subscriber=cache_nodes_map.on_create_nodes,
-        update_subscriber=cache_nodes_map.on_update_nodes,
-        delete_subscriber=cache_nodes_map.on_delete_nodes
-    )
-
-    cache_registration(storage, CacheGeneralAlias.NODE_INDEX_MAP, cache_nodes_indexes.CacheNodesIndexes())
-    subscribe_to_crud_operations(
-        storage=storage,
-        data_alias=DataAlias.NODE_AUTHENTIC,
-        create_subscriber=cache_nodes_indexes.on_create_nodes,
-        update_subscriber=cache_nodes_indexes.on_update_nodes,
-        delete_subscriber=cache_nodes_indexes.on_delete_nodes
-    )
+    The dense walk distance takes connection events in batches, since each of them costs O(N^2), which keeps it eager.
+    It keeps old connections around while lazy, so it takes snapshots of them rather than diffs. The on demand backend
+    is only built once it is read
+    """
+    on_demand = get_walk_distance.on_demand
+    return [
+        CacheDefinition(
+            alias=FunctionalityAlias.GET_WALK_DISTANCE,
+            factory=get_walk_distance.CacheGetWalkDistance,
+            subscriptions=[
+                CacheSubscription(data_alias, get_walk_distance.on_create_connections,
+                                  get_walk_distance.on_update_connections, get_walk_distance.on_delete_connections,
+                                  batched=True, snapshot=True) for data_alias in
+                [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]
+            ] + [
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, get_walk_distance.on_create_nodes,
+                                  get_walk_distance.on_update_nodes, get_walk_distance.on_delete_nodes),
+            ],
+            depends_on=[CacheGeneralAlias.NODE_INDEX_MAP, CacheGeneralAlias.CONNECTIONS_ADJACENCY],
+            fork=get_walk_distance.fork,
+        ),
+        CacheDefinition(
+            alias=FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND,
+            factory=get_walk_distance.CacheGetWalkDistanceOnDemand,
+            subscriptions=[
+                CacheSubscription(data_alias, on_demand.on_create_connections, on_demand.on_update_connections,
+                                  on_demand.on_delete_connections, snapshot=True) for data_alias in
+                [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC]
+            ] + [
+                CacheSubscription(DataAlias.NODE_AUTHENTIC, on_demand.on_create_nodes, on_demand.on_update_nodes,
+                                  on_demand.on_delete_nodes),
+            ],
+            depends_on=[CacheGeneralAlias.NODE_INDEX_MAP, CacheGeneralAlias.CONNECTIONS_EDGES],
+            activation=CacheActivation.ON_FIRST_READ,
+            fork=on_demand.fork,
+        ),
+    ]
+
+
+def create_caches(storage: 'StorageStruct'):
+    caches_register(storage, caches_general_definitions() + caches_specialized_definitions())
@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, List
+
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+from src.runtime_storages.functions.subscriber_functions import SubscriberEntry
+from src.runtime_storages.other.cache_functions import cache_activate
+from src.runtime_storages.types import CacheActivation, CacheGeneralAlias, DataAlias, OperationsAlias
+
+if TYPE_CHECKING:
+    from src.runtime_storages.storage_struct import StorageStruct
+
+CacheAlias = CacheGeneralAlias | FunctionalityAlias
+
+
+@dataclass
+class CacheSubscription:
+    """
+    Subscribers of a cache to the crud operations of one data, see SubscriberEntry for batched and snapshot
+    """
+    data_alias: DataAlias
+    create_subscriber: Callable
+    update_subscriber: Callable
+    delete_subscriber: Callable
+    batched: bool = False
+    snapshot: bool = False
+
+
+@dataclass
+class CacheDefinition:
+    """
+    Declares a cache: the data it subscribes to, the caches its subscribers read and when it starts being maintained
+
+    The caches it depends on are built before it and get the events first, so its subscribers read them up to date
+
+    A cache built on first read replays the stored data through its create subscribers, so it can't take batched events,
+    they could be delivered again after it was built from data which already contains them
+
+    The fork copies the cache of a storage for a snapshot detached from it, see storage_snapshot. Caches holding the
+    stored elements have none, the snapshot builds them again from its copies of the elements when it reads them
+    """
+    alias: CacheAlias
+    factory: Callable[[], CacheAbstract]
+    subscriptions: List[CacheSubscription]
+    depends_on: List[CacheAlias] = field(default_factory=list)
+    activation: CacheActivation = CacheActivation.EAGER
+    fork: Callable[['StorageStruct'], CacheAbstract] | None = None
+
+
+def caches_definitions_order(definitions: List[CacheDefinition]) -> List[CacheDefinition]:
+    """
+    Orders the definitions so every cache comes after the caches it depends on, keeping the declaration order otherwise
+    """
+    by_alias = {definition.alias: definition for definition in definitions}
+    for definition in definitions:
+        for dependency in definition.depends_on:
+            if dependency not in by_alias:
+                raise ValueError(f"Cache {definition.alias} depends on {dependency}, which is not defined")
+        if definition.activation == CacheActivation.ON_FIRST_READ and \
+                any(subscription.batched for subscription in definition.subscriptions):
+            raise ValueError(f"Cache {definition.alias} is built on first read, so it can't take batched events")
+
+    ordered = []
+    placed = set()
+    remaining = list(definitions)
+    while len(remaining) > 0:
+        ready = [definition for definition in remaining if all(dependency in placed for dependency in
+                                                                definition.depends_on)]
+        if len(ready) == 0:
+            raise ValueError(f"Caches {[definition.alias for definition in remaining]} depend on each other")
+        # only the first ready one is placed, so the declaration order is kept wherever the dependencies allow it
+        ordered.append(ready[0])
+        placed.add(ready[0].alias)
+        remaining.remove(ready[0])
+
+    return ordered
+
+
+def caches_register(storage: 'StorageStruct', definitions: List[CacheDefinition]) -> None:
+    """
+    Subscribes the caches in dependency order, so the subscribers of a cache run after those of its dependencies and
+    before the subscribers which aren't caches. The eager caches are built right away, the others on their first read
+    """
+    for definition in definitions:
+        if definition.alias in storage.caches_definitions:
+            raise ValueError(f"Cache {definition.alias} is already registered")
+    ordered = caches_definitions_order(list(storage.caches_definitions.values()) + definitions)
+    storage.caches_definitions = {definition.alias: definition for definition in ordered}
+
+    # the subscriptions are rebuilt as a whole, so caches registered later still run before the caches depending on them
+    for operations in storage.data_crud_subscribers.values():
+        for subscribers in operations.values():
+            subscribers[:] = [subscriber for subscriber in subscribers if subscriber.cache is None]
+    for definition in reversed(ordered):
+        _subscribe(storage, definition)
+
+    for definition in ordered:
+        if definition.activation == CacheActivation.EAGER:
+            cache_activate(storage, definition.alias)
+
+
+def _subscribe(storage: 'StorageStruct', definition: CacheDefinition) -> None:
+    """
+    Puts the subscribers of the cache in front of the already subscribed ones
+    """
+    for subscription in definition.subscriptions:
+        operations = storage.data_crud_subscribers[subscription.data_alias]
+        operations[OperationsAlias.CREATE].insert(0, SubscriberEntry(subscription.create_subscriber,
+                                                                     subscription.batched, cache=definition.alias))
+        operations[OperationsAlias.UPDATE].insert(0, SubscriberEntry(subscription.update_subscriber,
+                                                                     subscription.batched, subscription.snapshot,
+                                                                     cache=definition.alias))
+        operations[OperationsAlias.DELETE].insert(0, SubscriberEntry(subscription.delete_subscriber,
+                                                                     subscription.batched, cache=definition.alias))
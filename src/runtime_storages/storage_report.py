@@ -0,0 +1,67 @@
+from typing import Dict, List, Set
+
+from src.runtime_storages.functions.memory_accounting import memory_size
+from src.runtime_storages.storage_struct import StorageStruct
+from src.runtime_storages.types import DataAlias
+
+
+def _data_stats(elements: List[any], seen: Set[any]) -> Dict[str, int]:
+    return {"count": len(elements), "bytes": memory_size(elements, seen)}
+
+
+def storage_report(storage: StorageStruct) -> Dict[str, any]:
+    """
+    Memory and counters of every part of the storage, to follow which one grows the fastest with the map
+
+    Memory shared between parts is counted once, by the data first and then by the caches in their registration order,
+    so the caches only account for what they hold on top of the data. Sizes are estimates, see memory_size
+    """
+    seen = set()
+    with storage.lock.read(), storage.lazy_caches_lock:
+        data = {
+            DataAlias.NODE_AUTHENTIC.value: _data_stats(storage.nodes_authentic, seen),
+            DataAlias.CONNECTIONS_AUTHENTIC.value: _data_stats(storage.connections_authentic, seen),
+            DataAlias.CONNECTIONS_SYNTHETIC.value: _data_stats(storage.connections_synthetic, seen),
+            DataAlias.CONNECTIONS_NULL.value: _data_stats(storage.connections_null, seen),
+        }
+        memoized_reads = {
+            "count": sum(len(entries) for _, entries in storage.memoized_reads.values()),
+            "bytes": memory_size(storage.memoized_reads, seen),
+            "hits": storage.memoized_reads_hits,
+            "misses": storage.memoized_reads_misses,
+        }
+        caches = {alias.value: cache.stats(seen) for alias, cache in storage.caches.items()}
+        caches_functionalities = {alias.value: cache.stats(seen) for alias, cache in
+                                  storage.caches_functionalities.items()}
+
+    total = sum(part["bytes"] for parts in [data, caches, caches_functionalities] for part in parts.values())
+    return {
+        "data": data,
+        "memoized_reads": memoized_reads,
+        "caches": caches,
+        "caches_functionalities": caches_functionalities,
+        "total_bytes": total + memoized_reads["bytes"],
+    }
+
+
+def _mib(size: int) -> str:
+    return f"{size / 2 ** 20:.2f} MiB"
+
+
+def storage_report_format(report: Dict[str, any]) -> str:
+    """
+    One line per part of the storage, for logging
+    """
+    lines = [f"storage: {_mib(report['total_bytes'])}"]
+    for name, stats in report["data"].items():
+        lines.append(f"  {name}: {stats['count']} elements, {_mib(stats['bytes'])}")
+
+    memoized = report["memoized_reads"]
+    lines.append(f"  memoized_reads: {memoized['count']} entries, {_mib(memoized['bytes'])}, "
+                 f"hits {memoized['hits']}, misses {memoized['misses']}")
+
+    for name, stats in list(report["caches"].items()) + list(report["caches_functionalities"].items()):
+        lines.append(f"  {name}: {_mib(stats['bytes'])}, hits {stats['hits']}, misses {stats['misses']}, "
+                     f"recomputations {stats['recomputations']}, avoided {stats['recomputations_avoided']}")
+
+    return "\n".join(lines)
@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+import numpy as np
+
+from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+from src.runtime_storages.general_cache.cache_nodes_tensor import CacheNodesTensor
+from src.runtime_storages.storage_snapshot import StorageSnapshot, snapshot_build
+from src.runtime_storages.storage_struct import StorageStruct
+from src.runtime_storages.types import DataAlias
+
+# (offset, dtype, shape) of each array inside the shared block
+ArrayLayout = Tuple[int, str, Tuple[int, ...]]
+
+_ALIGNMENT = 64
+_CONNECTIONS_ALIASES = [DataAlias.CONNECTIONS_AUTHENTIC, DataAlias.CONNECTIONS_SYNTHETIC, DataAlias.CONNECTIONS_NULL]
+_NO_NAME = -1
+
+
+@dataclass
+class SharedStorageExport:
+    """
+    Picklable description of a storage exported into shared memory, it is what gets sent to the workers
+
+    Node i is named by entry i of the names table. Connections are packed per data alias into int32 name indexes and
+    float64 distances and directions, so they unpack to the floats they were given, missing values being -1 and NaN
+    """
+    memory_name: str
+    layout: Dict[str, ArrayLayout]
+    nodes_params: List[Dict[str, any]]
+    data_versions: Dict[DataAlias, int]
+
+
+def _names_intern(table: Dict[str, int], name: str | None) -> int:
+    if name is None:
+        return _NO_NAME
+    return table.setdefault(name, len(table))
+
+
+def _connections_pack(connections: List[any], table: Dict[str, int]) -> Dict[str, np.ndarray]:
+    directions = [connection["direction"] for connection in connections if connection["direction"] is not None]
+    width = len(directions[0]) if len(directions) > 0 else 0
+    if any(len(direction) != width for direction in directions):
+        raise ValueError("Connections directions must all have the same length to be exported")
+
+    packed_directions = np.full((len(connections), width), np.nan, dtype=np.float64)
+    for i, connection in enumerate(connections):
+        if connection["direction"] is not None:
+            packed_directions[i] = connection["direction"]
+
+    return {
+        "names": np.array([_names_intern(table, connection["name"]) for connection in connections], dtype=np.int32),
+        "starts": np.array([_names_intern(table, connection["start"]) for connection in connections], dtype=np.int32),
+        "ends": np.array([_names_intern(table, connection.get("end")) for connection in connections],
+                         dtype=np.int32),
+        "distances": np.array([np.nan if connection["distance"] is None else connection["distance"] for
+                               connection in connections], dtype=np.float64),
+        "directions": packed_directions,
+    }
+
+
+def _datapoints_collect(storage: StorageStruct) -> np.ndarray:
+    if len(storage.nodes_authentic) == 0:
+        return np.zeros((0,), dtype=np.float32)
+    return np.stack([node["datapoints_array"] for node in storage.nodes_authentic])
+
+
+def _arrays_collect(storage: StorageStruct) -> Dict[str, np.ndarray]:
+    table: Dict[str, int] = {}
+    for node in storage.nodes_authentic:
+        _names_intern(table, node["name"])
+
+    arrays = {"datapoints": _datapoints_collect(storage)}
+    for data_alias in _CONNECTIONS_ALIASES:
+        packed = _connections_pack(getattr(storage, _connections_attribute(data_alias)), table)
+        for key, array in packed.items():
+            arrays[f"{data_alias.value}_{key}"] = array
+
+    encoded = [name.encode("utf-8") for name in table.keys()]
+    arrays["names_offsets"] = np.cumsum([0] + [len(name) for name in encoded], dtype=np.int64)
+    arrays["names_blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return arrays
+
+
+def _connections_attribute(data_alias: DataAlias) -> str:
+    return {
+        DataAlias.CONNECTIONS_AUTHENTIC: "connections_authentic",
+        DataAlias.CONNECTIONS_SYNTHETIC: "connections_synthetic",
+        DataAlias.CONNECTIONS_NULL: "connections_null",
+    }[data_alias]
+
+
+def storage_shared_export(storage: StorageStruct) -> Tuple[SharedMemory, SharedStorageExport]:
+    """
+    Copies the storage once into a shared memory block which workers attach to without copying
+
+    The caller owns the memory, it closes and unlinks it once the workers are done
+    """
+    with storage.lock.read():
+        arrays = _arrays_collect(storage)
+        nodes_params = [node["params"] for node in storage.nodes_authentic]
+        data_versions = dict(storage.data_versions)
+
+    layout = {}
+    size = 0
+    for key, array in arrays.items():
+        layout[key] = (size, array.dtype.str, array.shape)
+        size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    memory = SharedMemory(create=True, size=max(size, 1))
+    for key, array in arrays.items():
+        _array_view(memory, layout[key])[...] = array
+
+    return memory, SharedStorageExport(memory.name, layout, nodes_params, data_versions)
+
+
+def _array_view(memory: SharedMemory, array_layout: ArrayLayout) -> np.ndarray:
+    offset, dtype, shape = array_layout
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+
+
+def _names_read(memory: SharedMemory, layout: Dict[str, ArrayLayout]) -> List[str]:
+    offsets = _array_view(memory, layout["names_offsets"])
+    blob = _array_view(memory, layout["names_blob"]).tobytes()
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _name_read(names: List[str], index: int) -> str | None:
+    return None if index == _NO_NAME else names[index]
+
+
+def _connections_unpack(memory: SharedMemory, export: SharedStorageExport, data_alias: DataAlias,
+                        names: List[str]) -> List[any]:
+    def view(key: str) -> np.ndarray:
+        return _array_view(memory, export.layout[f"{data_alias.value}_{key}"])
+
+    connections = []
+    for name, start, end, distance, direction in zip(view("names").tolist(), view("starts").tolist(),
+                                                     view("ends").tolist(), view("distances").tolist(),
+                                                     view("directions").tolist()):
+        connection = {"name": _name_read(names, name), "start": _name_read(names, start)}
+        if data_alias != DataAlias.CONNECTIONS_NULL:
+            connection["end"] = _name_read(names, end)
+        connection["distance"] = None if np.isnan(distance) else distance
+        connection["direction"] = None if len(direction) == 0 or np.isnan(direction[0]) else direction
+        connections.append(connection)
+
+    return connections
+
+
+def storage_shared_attach(export: SharedStorageExport) -> StorageSnapshot:
+    """
+    Read only storage over an exported block
+
+    Only the datapoints are shared: each node holds a read only float32 view of its rows in the block, as the nodes of
+    a storage hold float32 arrays, and the tensor store reads the same views. The names, params and connections are
+    unpacked into elements of the process, as the storage holds them, and the eager caches are built from them
+    """
+    memory = SharedMemory(name=export.memory_name)
+
+    names = _names_read(memory, export.layout)
+    datapoints = _array_view(memory, export.layout["datapoints"])
+    nodes_count = len(export.nodes_params)
+    # the workers share the block, none of them may write into it
+    datapoints.setflags(write=False)
+    nodes = [{"name": names[i], "datapoints_array": datapoints[i], "params": export.nodes_params[i]} for i in
+             range(nodes_count)]
+    connections = {data_alias: _connections_unpack(memory, export, data_alias, names) for data_alias in
+                   _CONNECTIONS_ALIASES}
+
+    tensor_cache = CacheNodesTensor()
+    tensor_cache.rows_map = {node["name"]: node["datapoints_array"] for node in nodes}
+
+    # the dense walk buffer is quadratic in the nodes, each process attaching would build its own
+    return snapshot_build(nodes, connections, tensor_cache, dict(export.data_versions), memory=memory,
+                          walk_distance_backend=FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND)
@@ -0,0 +1,106 @@
+import threading
+import weakref
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List
+
+from src.runtime_storages.functions.storage_lock import StorageLock, StorageLockReadOnly
+from src.runtime_storages.general_cache.cache_nodes_tensor import CacheNodesTensor
+from src.runtime_storages.storage_struct import StorageStruct
+from src.runtime_storages.other.cache_functions import cache_install
+from src.runtime_storages.types import CacheGeneralAlias, DataAlias
+
+
+@dataclass
+class StorageSnapshot(StorageStruct):
+    """
+    Read only storage pinned at the data versions it was taken at, see storage_snapshot
+    """
+    lock: StorageLock = field(default_factory=StorageLockReadOnly)
+    # keeps alive the memory the data is viewed from, when it isn't owned by the process
+    memory: any = None
+
+
+def snapshot_build(nodes: List[any], connections: Dict[DataAlias, List[any]], tensor_cache: CacheNodesTensor,
+                   data_versions: Dict[DataAlias, int], **kwargs) -> StorageSnapshot:
+    """
+    Snapshot over data owned by the caller, the tensor store is given since it is the one cache not worth rebuilding
+
+    The eager caches are built from the data when the snapshot is created, the others when they are first read
+    """
+    snapshot = StorageSnapshot(
+        nodes_authentic=nodes,
+        connections_authentic=connections[DataAlias.CONNECTIONS_AUTHENTIC],
+        connections_synthetic=connections[DataAlias.CONNECTIONS_SYNTHETIC],
+        connections_null=connections[DataAlias.CONNECTIONS_NULL],
+        data_versions=data_versions,
+        **kwargs
+    )
+    cache_install(snapshot, CacheGeneralAlias.NODE_TENSOR_STORE, tensor_cache)
+    return snapshot
+
+
+def _snapshot_detach(snapshot_reference: weakref.ref) -> None:
+    """
+    Runs in the writer of the storage before it changes anything, so the snapshot still sees the data it was taken at
+
+    The elements are copied since the storage updates them in place. The caches are forked, those without a fork
+    hold the elements and are built again from the copies once the snapshot reads them
+    """
+    snapshot = snapshot_reference()
+    if snapshot is None:
+        return
+
+    with snapshot.lazy_caches_lock:
+        for caches in [snapshot.caches, snapshot.caches_functionalities]:
+            forks = {alias: snapshot.caches_definitions[alias].fork for alias in caches}
+            forked = {alias: fork(snapshot) for alias, fork in forks.items() if fork is not None}
+            for alias, fork in forks.items():
+                if fork is None:
+                    del caches[alias]
+                    snapshot.caches_active.discard(alias)
+            caches.update(forked)
+
+        snapshot.nodes_authentic = [dict(node) for node in snapshot.nodes_authentic]
+        snapshot.connections_authentic = [dict(connection) for connection in snapshot.connections_authentic]
+        snapshot.connections_synthetic = [dict(connection) for connection in snapshot.connections_synthetic]
+        snapshot.connections_null = [dict(connection) for connection in snapshot.connections_null]
+        # memoized results can hold the elements of the storage
+        snapshot.memoized_reads = {}
+        snapshot.lazy_caches_lock = threading.RLock()
+        snapshot.lock.source = None
+
+
+def storage_snapshot(storage: StorageStruct) -> StorageSnapshot:
+    """
+    Consistent view of the storage for consumers running alongside exploration, all read functions work on it
+
+    Taking a snapshot costs O(number of caches): it shares the data and the caches of the storage, and reads them
+    under the read lock of the storage. It is detached before the storage is next written, keeping copies of the
+    elements and forks of the caches, see _snapshot_detach. A snapshot which is gone by then costs nothing more
+
+    Elements read from the snapshot before it is detached are the ones of the storage, they see its later updates
+    """
+    with storage.lock.read():
+        snapshot = StorageSnapshot(
+            lock=StorageLockReadOnly(source=storage.lock),
+            data_versions=dict(storage.data_versions),
+            transformation=storage.transformation,
+            walk_distance_backend=storage.walk_distance_backend,
+            lazy_caches_lock=storage.lazy_caches_lock,
+        )
+        snapshot.nodes_authentic = storage.nodes_authentic
+        snapshot.connections_authentic = storage.connections_authentic
+        snapshot.connections_synthetic = storage.connections_synthetic
+        snapshot.connections_null = storage.connections_null
+        snapshot.caches_definitions = dict(storage.caches_definitions)
+        snapshot.caches = dict(storage.caches)
+        snapshot.caches_functionalities = dict(storage.caches_functionalities)
+        snapshot.caches_active = set(storage.caches_active)
+        storage.lock.before_next_write(partial(_snapshot_detach, weakref.ref(snapshot)))
+
+    return snapshot
+
+
+def storage_snapshot_is_current(snapshot: StorageSnapshot, storage: StorageStruct) -> bool:
+    return snapshot.data_versions == storage.data_versions
@@ -1,9 +1,11 @@
+import threading
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Set
 from src.runtime_storages.cache_abstract import CacheAbstract
 from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+from src.runtime_storages.functions.storage_lock import StorageLock
 from src.runtime_storages.functions.subscriber_functions import subscribers_list_initialization
-from src.runtime_storages.other import create_caches_specialized, create_caches_general
+from src.runtime_storages.other import create_caches
 from src.runtime_storages.types import DataAlias
 
 from src.runtime_storages.types import NodeAuthenticData, ConnectionNullData, ConnectionSyntheticData, \
@@ -20,9 +22,31 @@ class StorageStruct:
 
     caches: Dict[CacheGeneralAlias, CacheAbstract] = field(default_factory=dict)
     caches_functionalities: Dict[FunctionalityAlias, CacheAbstract] = field(default_factory=dict)
+    # caches are declared in the registry, and only present in the maps above once built
+    caches_definitions: Dict[any, any] = field(default_factory=dict)
+    caches_active: Set[any] = field(default_factory=set)
+    caches_activating: Set[any] = field(default_factory=set)
     data_crud_subscribers: Dict[DataAlias, any] = field(default_factory=dict)
 
+    # bumped on every crud operation, read functions are memoized against them
+    data_versions: Dict[DataAlias, int] = field(default_factory=lambda: {data_alias: 0 for data_alias in DataAlias})
+    # function name to the versions its results were read at and the results by arguments, see memoize_read
+    memoized_reads: Dict[str, any] = field(default_factory=dict)
+    memoized_reads_lock: threading.Lock = field(default_factory=threading.Lock)
+    memoized_reads_hits: int = 0
+    memoized_reads_misses: int = 0
+
+    # crud and transactions hold the write lock, read functions the read lock
+    lock: StorageLock = field(default_factory=StorageLock)
+    # lazy caches are recalculated by the readers, so their refreshes are serialized between them
+    lazy_caches_lock: threading.RLock = field(default_factory=threading.RLock)
+
+    transaction_depth: int = 0
+    transaction_events: List[any] = field(default_factory=list)
+
     transformation: any = None
+    # None lets the walk distance backend be picked by the number of nodes
+    walk_distance_backend: FunctionalityAlias | None = None
 
     def __post_init__(self):
         subscribers_list_initialization(
@@ -42,8 +66,7 @@ class StorageStruct:
             data_type=DataAlias.CONNECTIONS_NULL,
         )
 
-        create_caches_general(self)
-        create_caches_specialized(self)
+        create_caches(self)
 
 
 def create_storage():
@@ -1,10 +1,15 @@
 from typing import Dict, List, TypedDict
 from enum import Enum
+import numpy as np
 
 
 class NodeAuthenticData(TypedDict):
+    """
+    The storage keeps the datapoints as a float32 array of shape (rotations, embedding), nested lists given to crud are
+    converted. The array is replaced on updates and never written into
+    """
     name: str
-    datapoints_array: List[List[any]]
+    datapoints_array: np.ndarray | List[List[float]]
     params: Dict[str, any]
 
 
@@ -41,6 +46,18 @@ class DataAlias(Enum):
 class CacheGeneralAlias(Enum):
     NODE_CACHE_MAP = "node_cache_map"
     NODE_INDEX_MAP = "node_index_map"
+    NODE_TENSOR_STORE = "node_tensor_store"
+    NODES_SPATIAL = "nodes_spatial"
+    CONNECTIONS_ADJACENCY = "connections_adjacency"
+    CONNECTIONS_PAIRS = "connections_pairs"
+    CONNECTIONS_INDEX_MAP = "connections_index_map"
+    CONNECTIONS_EDGES = "connections_edges"
+    CONNECTIONS_COMPONENTS = "connections_components"
+
+
+class CacheActivation(Enum):
+    EAGER = "eager"
+    ON_FIRST_READ = "on_first_read"
 
 
 class OperationsAlias(Enum):
@@ -1,8 +1,26 @@
 import json
 import pickle
+import struct
+import zipfile
+from typing import BinaryIO, Dict, List, Tuple
+import numpy as np
+from .json_stream import json_array_iterate, node_from_json
 from .parameters import CollectedDataType, get_data_file_path
 from ..utils.utils import prefix_path_with_root
 
+MAP_FILE_EXTENSION = ".npz"
+MAP_FORMAT_VERSION = 1
+# connection kinds of the map file, and whether their connections have an end
+_MAP_CONNECTIONS_KINDS = {"authentic": True, "synthetic": True, "null": False}
+_NO_ENDPOINT = -1
+_MAP_DATAPOINTS_MEMBER = "nodes_datapoints.npy"
+# the file name and extra field lengths sit at the end of the fixed part of a zip local file header
+_ZIP_LOCAL_HEADER_SIZE = 30
+_ZIP_LOCAL_HEADER_LENGTHS = struct.Struct("<HH")
+# nodes the datapoints block of a JSON conversion starts with, it doubles as the nodes are read
+_CONVERSION_INITIAL_NODES = 64
+_NPY_HEADER_READERS = {(1, 0): np.lib.format.read_array_header_1_0, (2, 0): np.lib.format.read_array_header_2_0}
+
 
 def read_data_from_file(data_sample: CollectedDataType):
     local_path = get_data_file_path(data_sample)
@@ -13,6 +31,10 @@ def read_data_from_file(data_sample: CollectedDataType):
     return data_arr
 
 
+def get_other_data_path(file_name: str) -> str:
+    return prefix_path_with_root(get_data_file_path(CollectedDataType.Other) + file_name)
+
+
 def read_other_data_from_file(file_name: str):
     data_sample = CollectedDataType.Other
     local_path = get_data_file_path(data_sample)
@@ -63,3 +85,240 @@ def _deserialize_object(filename):
         obj = pickle.load(file)
     print(f"Object deserialized from '{filename}'")
     return obj
+
+
+def is_map_file(file_name: str) -> bool:
+    return file_name.endswith(MAP_FILE_EXTENSION)
+
+
+def _endpoints_pack(connections: List[dict], has_end: bool, endpoints_ids: Dict[str, int]) -> np.ndarray:
+    """
+    Endpoints as ids into the nodes names followed by the names of the endpoints which aren't nodes
+    """
+
+    def endpoint_id(name: str | None) -> int:
+        if name is None:
+            return _NO_ENDPOINT
+        if name not in endpoints_ids:
+            endpoints_ids[name] = len(endpoints_ids)
+        return endpoints_ids[name]
+
+    return np.array([(endpoint_id(connection["start"]), endpoint_id(connection["end"]) if has_end else _NO_ENDPOINT)
+                     for connection in connections], dtype=np.int32).reshape(-1, 2)
+
+
+def _optional_floats_pack(values: List[any]) -> np.ndarray:
+    """
+    Floats or float vectors, missing values being NaN rows. Vectors have to share their length
+    """
+    present = [value for value in values if value is not None]
+    width = () if len(present) == 0 or np.ndim(present[0]) == 0 else (len(present[0]),)
+    packed = np.full((len(values),) + width, np.nan, dtype=np.float64)
+    for row, value in enumerate(values):
+        if value is not None:
+            packed[row] = value
+    return packed
+
+
+def _optional_floats_unpack(packed: np.ndarray) -> List[any]:
+    missing = (np.isnan(packed) if packed.ndim == 1 else np.isnan(packed).all(axis=1)).tolist()
+    return [None if is_missing else value for value, is_missing in zip(packed.tolist(), missing)]
+
+
+def _datapoints_pack(nodes: List[dict]) -> np.ndarray:
+    """
+    Fills the array node by node, one conversion of all the nested lists holds the GIL for as long as it takes, which
+    stalls the other threads when the map is written in the background
+    """
+    if len(nodes) == 0:
+        return np.empty((0,), dtype=np.float32)
+    packed = np.empty((len(nodes),) + np.shape(nodes[0]["datapoints_array"]), dtype=np.float32)
+    for row, node in enumerate(nodes):
+        packed[row] = node["datapoints_array"]
+    return packed
+
+
+def write_map(file: str | BinaryIO, nodes: List[dict], connections_authentic: List[dict],
+              connections_synthetic: List[dict], connections_null: List[dict]) -> None:
+    """
+    Writes the nodes and connections in the binary map format, a npz container holding
+
+    - nodes_datapoints: the datapoints of all nodes as one float32 array, so all nodes must share their shape
+    - {kind}_endpoints, {kind}_distances, {kind}_directions: the connections of each kind packed as int32 endpoint
+      ids, float64 distances and directions, NaN standing for None
+    - header: a small JSON with the names, the params and the endpoints which aren't nodes
+    """
+    _map_write(file, _datapoints_pack(nodes), [node["name"] for node in nodes], [node["params"] for node in nodes],
+               connections_authentic, connections_synthetic, connections_null)
+
+
+def _map_write(file: str | BinaryIO, nodes_datapoints: np.ndarray, nodes_names: List[str], nodes_params: List[any],
+               connections_authentic: List[dict], connections_synthetic: List[dict],
+               connections_null: List[dict]) -> None:
+    endpoints_ids = {name: node_id for node_id, name in enumerate(nodes_names)}
+    arrays = {"nodes_datapoints": nodes_datapoints}
+    header = {
+        "version": MAP_FORMAT_VERSION,
+        "nodes": {"names": nodes_names, "params": nodes_params},
+        "connections": {},
+    }
+
+    kinds_connections = zip(_MAP_CONNECTIONS_KINDS.items(),
+                            [connections_authentic, connections_synthetic, connections_null])
+    for (kind, has_end), connections in kinds_connections:
+        arrays[f"{kind}_endpoints"] = _endpoints_pack(connections, has_end, endpoints_ids)
+        arrays[f"{kind}_distances"] = _optional_floats_pack([connection["distance"] for connection in connections])
+        arrays[f"{kind}_directions"] = _optional_floats_pack([connection["direction"] for connection in connections])
+        header["connections"][kind] = {"names": [connection["name"] for connection in connections]}
+
+    header["endpoints_extra"] = list(endpoints_ids.keys())[len(nodes_names):]
+    arrays["header"] = np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)
+    np.savez(file, **arrays)
+
+
+def _block_append(block: np.ndarray | None, count: int, datapoints: any) -> np.ndarray:
+    """
+    Puts the datapoints at row count of the block, doubling it when full, and returns the block
+    """
+    row = np.asarray(datapoints, dtype=np.float32)
+    if block is None:
+        block = np.empty((_CONVERSION_INITIAL_NODES,) + row.shape, dtype=np.float32)
+    elif row.shape != block.shape[1:]:
+        raise ValueError(f"Nodes datapoints of shape {row.shape} do not match the map shape {block.shape[1:]}")
+
+    if count == block.shape[0]:
+        grown_block = np.empty((2 * count,) + block.shape[1:], dtype=np.float32)
+        grown_block[:count] = block
+        block = grown_block
+    block[count] = row
+    return block
+
+
+def _json_connections_read(file_path: str | None) -> List[dict]:
+    if file_path is None:
+        return []
+    with open(file_path, "r") as file:
+        return list(json_array_iterate(file))
+
+
+def convert_json_to_map(nodes_file_path: str, map_file: str | BinaryIO,
+                        connections_authentic_file_path: str | None = None,
+                        connections_synthetic_file_path: str | None = None,
+                        connections_null_file_path: str | None = None) -> None:
+    """
+    Converts JSON nodes and connections files, legacy nodes included, into a binary map in one pass over each file
+
+    The nodes are streamed and their datapoints go straight into a float32 block, so the nodes file is never held as
+    Python lists of floats. Missing connections files stand for no connections
+    """
+    nodes_names = []
+    nodes_params = []
+    block = None
+    with open(nodes_file_path, "r") as file:
+        for element in json_array_iterate(file):
+            node = node_from_json(element)
+            block = _block_append(block, len(nodes_names), node["datapoints_array"])
+            nodes_names.append(node["name"])
+            nodes_params.append(node["params"])
+
+    nodes_datapoints = block[:len(nodes_names)] if block is not None else np.empty((0,), dtype=np.float32)
+    _map_write(map_file, nodes_datapoints, nodes_names, nodes_params,
+               _json_connections_read(connections_authentic_file_path),
+               _json_connections_read(connections_synthetic_file_path),
+               _json_connections_read(connections_null_file_path))
+
+
+def _map_datapoints_memmap(file_path: str) -> np.ndarray:
+    """
+    Maps the datapoints of a map file read only. np.savez stores the arrays uncompressed, so the datapoints are a plain
+    npy file inside the zip, and its data can be mapped right after the npy header
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        member = archive.getinfo(_MAP_DATAPOINTS_MEMBER)
+        if member.compress_type != zipfile.ZIP_STORED:
+            raise ValueError(f"Map file {file_path} has compressed datapoints, they can't be memory mapped")
+
+    with open(file_path, "rb") as file:
+        file.seek(member.header_offset)
+        local_header = file.read(_ZIP_LOCAL_HEADER_SIZE)
+        name_length, extra_length = _ZIP_LOCAL_HEADER_LENGTHS.unpack(local_header[-_ZIP_LOCAL_HEADER_LENGTHS.size:])
+        file.seek(member.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_length + extra_length)
+
+        version = np.lib.format.read_magic(file)
+        if version not in _NPY_HEADER_READERS:
+            raise ValueError(f"Npy format version {version} of the map datapoints is not supported")
+        shape, fortran_order, dtype = _NPY_HEADER_READERS[version](file)
+        offset = file.tell()
+
+    if np.prod(shape) == 0:
+        # empty files can't be mapped
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran_order else "C")
+
+
+def read_map(file: str | BinaryIO, mmap: bool = False) -> Tuple[List[dict], List[dict], List[dict], List[dict]]:
+    """
+    Reads a map written by write_map, returning the nodes and the authentic, synthetic and null connections
+
+    The datapoints of every node are a float32 row of the datapoints block, as the nodes of a storage hold them. With
+    mmap the block is the read only memory mapped file, so a row is only read from the disk once it is accessed. The
+    file must then be given by its path
+    """
+    if mmap and not isinstance(file, str):
+        raise ValueError("Only a map file given by its path can be memory mapped")
+
+    with np.load(file, allow_pickle=False) as arrays:
+        header = json.loads(arrays["header"].tobytes().decode("utf-8"))
+        if header["version"] != MAP_FORMAT_VERSION:
+            raise ValueError(f"Map format version {header['version']} is not supported")
+
+        nodes_names = header["nodes"]["names"]
+        nodes_datapoints = _map_datapoints_memmap(file) if mmap else arrays["nodes_datapoints"]
+        nodes = [{"name": name, "datapoints_array": datapoints, "params": params} for name, datapoints, params in
+                 zip(nodes_names, nodes_datapoints, header["nodes"]["params"])]
+        endpoints_names = nodes_names + header["endpoints_extra"]
+
+        def endpoint_name(endpoint_id: int) -> str | None:
+            return None if endpoint_id == _NO_ENDPOINT else endpoints_names[endpoint_id]
+
+        kinds_connections = []
+        for kind, has_end in _MAP_CONNECTIONS_KINDS.items():
+            endpoints = arrays[f"{kind}_endpoints"].tolist()
+            distances = _optional_floats_unpack(arrays[f"{kind}_distances"])
+            directions = _optional_floats_unpack(arrays[f"{kind}_directions"])
+            connections = []
+            for name, (start, end), distance, direction in zip(header["connections"][kind]["names"], endpoints,
+                                                               distances, directions):
+                connection = {"name": name, "start": endpoint_name(start)}
+                if has_end:
+                    connection["end"] = endpoint_name(end)
+                connection["distance"] = distance
+                connection["direction"] = direction
+                connections.append(connection)
+            kinds_connections.append(connections)
+
+    return nodes, kinds_connections[0], kinds_connections[1], kinds_connections[2]
+
+
+def write_map_to_file(file_name: str, nodes: List[dict], connections_authentic: List[dict],
+                      connections_synthetic: List[dict], connections_null: List[dict]) -> None:
+    local_path = get_data_file_path(CollectedDataType.Other)
+    file_path = prefix_path_with_root(local_path + file_name)
+    write_map(file_path, nodes, connections_authentic, connections_synthetic, connections_null)
+
+
+def read_map_from_file(file_name: str, mmap: bool = False) -> Tuple[List[dict], List[dict], List[dict], List[dict]]:
+    local_path = get_data_file_path(CollectedDataType.Other)
+    file_path = prefix_path_with_root(local_path + file_name)
+    return read_map(file_path, mmap=mmap)
+
+
+def convert_json_to_map_file(nodes_filename: str, map_filename: str, connections_authentic_filename: str | None = None,
+                             connections_synthetic_filename: str | None = None,
+                             connections_null_filename: str | None = None) -> None:
+    """
+    convert_json_to_map over files of the other data folder
+    """
+    connections_paths = [None if file_name is None else get_other_data_path(file_name) for file_name in
+                         [connections_authentic_filename, connections_synthetic_filename, connections_null_filename]]
+    convert_json_to_map(get_other_data_path(nodes_filename), get_other_data_path(map_filename), *connections_paths)
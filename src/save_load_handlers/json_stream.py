@@ -0,0 +1,125 @@
+"""
+Streaming reader of JSON files holding one top level array, such as the legacy datapoints and connections files
+
+Elements are decoded one at a time with the decoder of the json module, so the memory held is the chunk being read
+plus the element being decoded, instead of the whole file and all its elements at once
+"""
+import json
+import re
+from typing import Iterator, List, TextIO
+
+# characters read at once, an element longer than the chunk is read in growing chunks until it decodes
+JSON_STREAM_CHUNK_CHARS = 2 ** 20
+# elements given at once to the crud functions when loading a JSON file into a storage
+JSON_STREAM_BATCH_SIZE = 256
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# legacy nodes, from before NodeAuthenticData, hold their datapoints under data
+_LEGACY_DATAPOINTS_FIELD = "data"
+
+
+class _StreamBuffer:
+    """
+    Characters read but not consumed yet, from position on. The consumed prefix is only dropped when reading more, so
+    consuming small elements doesn't copy the rest of the chunk every time
+    """
+
+    def __init__(self, file: TextIO, chunk_chars: int):
+        self.file = file
+        self.chunk_chars = chunk_chars
+        self.text = ""
+        self.position = 0
+        # characters dropped before the text, to report errors at their offset in the file
+        self.offset = 0
+        self.exhausted = False
+
+    def read_more(self) -> bool:
+        """
+        Reads at least another chunk, as much as is buffered already, so decoding a long element stays linear
+        """
+        if self.exhausted:
+            return False
+        chunk = self.file.read(max(self.chunk_chars, len(self.text) - self.position))
+        self.offset += self.position
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        self.exhausted = len(chunk) == 0
+        return not self.exhausted
+
+    def skip_whitespace(self) -> str | None:
+        """
+        Moves past the whitespace, returning the next character or None at the end of the file
+        """
+        while True:
+            self.position = _WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.read_more():
+                return None
+
+    def expect(self, characters: str) -> str:
+        character = self.skip_whitespace()
+        if character is None or character not in characters:
+            found = "the end of the file" if character is None else repr(character)
+            raise ValueError(f"Expected one of {characters!r} at character {self.offset + self.position}, "
+                             f"found {found}")
+        self.position += 1
+        return character
+
+
+def json_array_iterate(file: TextIO, chunk_chars: int = JSON_STREAM_CHUNK_CHARS) -> Iterator[any]:
+    """
+    Yields the elements of the top level array of the file one at a time
+    """
+    decoder = json.JSONDecoder()
+    buffer = _StreamBuffer(file, chunk_chars)
+    buffer.expect("[")
+    if buffer.skip_whitespace() == "]":
+        buffer.position += 1
+        return
+
+    while True:
+        buffer.skip_whitespace()
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer.text, buffer.position)
+            except json.JSONDecodeError as error:
+                if buffer.read_more():
+                    continue
+                raise ValueError(f"Invalid JSON element at character {buffer.offset + error.pos}: {error.msg}")
+            # a number cut by the end of the chunk decodes as a shorter one, such as 12 out of 12.5 or 1 out of
+            # 1e-300, so an element is complete only once the separator following it is read
+            following = _WHITESPACE.match(buffer.text, end).end()
+            if (following == len(buffer.text) or buffer.text[following] not in ",]") and buffer.read_more():
+                continue
+            break
+
+        buffer.position = end
+        yield element
+        if buffer.expect(",]") == "]":
+            return
+
+
+def json_array_batches(file: TextIO, batch_size: int = JSON_STREAM_BATCH_SIZE,
+                       chunk_chars: int = JSON_STREAM_CHUNK_CHARS) -> Iterator[List[any]]:
+    """
+    The elements of the top level array of the file in lists of batch_size, the last one being shorter
+    """
+    batch = []
+    for element in json_array_iterate(file, chunk_chars):
+        batch.append(element)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+def node_from_json(element: dict) -> dict:
+    """
+    A node of a JSON file as a NodeAuthenticData, converting the legacy nodes which hold their datapoints under data
+    """
+    if _LEGACY_DATAPOINTS_FIELD in element and "datapoints_array" not in element:
+        return {"name": element["name"], "datapoints_array": element[_LEGACY_DATAPOINTS_FIELD],
+                "params": element.get("params")}
+    return element
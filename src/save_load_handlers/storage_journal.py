@@ -0,0 +1,445 @@
+"""
+Write-ahead journal of the crud operations of a storage, with compacted checkpoints
+
+A journal directory holds checkpoint_{n}.npz, the whole storage in the binary map format, and journal_{n}.log, the
+operations which happened after it. Recovering loads the latest checkpoint and replays its log, so resuming costs the
+size of the map once plus the operations since the checkpoint, instead of rewriting the whole map every step
+
+Records are encoded when the operations happen, but written by a background thread, so the exploration only waits on
+the disk when the bounded queue of records is full
+"""
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from queue import Queue
+from typing import BinaryIO, Dict, List, Tuple
+import numpy as np
+
+from src import runtime_storages as storage
+from src.runtime_storages.functions.subscriber_functions import subscribe_to_crud_operations
+from src.runtime_storages.storage_struct import StorageStruct
+from src.runtime_storages.types import DataAlias, OperationsAlias
+from .data_handle import write_map, read_map
+
+# the log is compacted into a new checkpoint once it outgrows the last checkpoint, so the total I/O stays linear
+JOURNAL_CHECKPOINT_MIN_BYTES = 16 * 2 ** 20
+# records and checkpoints waiting for the writer, past it the operations block until the writer catches up
+JOURNAL_QUEUE_SIZE = 256
+
+# header length, payload length, crc32 of both
+_FRAME_HEADER = struct.Struct("<III")
+_CHECKPOINT_PREFIX = "checkpoint_"
+_LOG_PREFIX = "journal_"
+
+_CRUD_CREATE = {
+    DataAlias.NODE_AUTHENTIC: storage.crud.create_nodes,
+    DataAlias.CONNECTIONS_AUTHENTIC: storage.crud.create_connections_authentic,
+    DataAlias.CONNECTIONS_SYNTHETIC: storage.crud.create_connections_synthetic,
+    DataAlias.CONNECTIONS_NULL: storage.crud.create_connections_null,
+}
+_CRUD_UPDATE = {
+    DataAlias.NODE_AUTHENTIC: storage.crud.update_nodes_by_name,
+    DataAlias.CONNECTIONS_AUTHENTIC: storage.crud.update_connections_authentic,
+    DataAlias.CONNECTIONS_SYNTHETIC: storage.crud.update_connections_synthetic,
+    DataAlias.CONNECTIONS_NULL: storage.crud.update_connections_null,
+}
+_CRUD_DELETE = {
+    DataAlias.NODE_AUTHENTIC: storage.crud.delete_nodes,
+    DataAlias.CONNECTIONS_AUTHENTIC: storage.crud.delete_connections_authentic,
+    DataAlias.CONNECTIONS_SYNTHETIC: storage.crud.delete_connections_synthetic,
+    DataAlias.CONNECTIONS_NULL: storage.crud.delete_connections_null,
+}
+_DATAPOINTS_FIELD = "datapoints_array"
+_NODE_FIELDS = ["name", "datapoints_array", "params"]
+_CONNECTION_FIELDS = ["name", "start", "end", "distance", "direction"]
+
+
+# the four data lists of the storage, copied for a checkpoint
+CheckpointData = Tuple[List[any], List[any], List[any], List[any]]
+
+
+@dataclass
+class StorageJournal:
+    """
+    The generation, the log and the counters of the writer are owned by the writer thread. The operations only count the
+    bytes they queued since the last checkpoint, in log_bytes
+    """
+    directory: str
+    generation: int
+    log: BinaryIO
+    log_bytes: int
+    checkpoint_bytes: int
+    durable: bool
+    queue: Queue
+    writer: threading.Thread | None = None
+    checkpoint_pending: bool = False
+    error: Exception | None = None
+    records_written: int = 0
+    checkpoints_written: int = 0
+    write_seconds: float = 0.0
+    write_seconds_max: float = 0.0
+    blocked_seconds: float = 0.0
+    closed: bool = False
+
+
+_journals_open: List[StorageJournal] = []
+
+
+def _checkpoint_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"{_CHECKPOINT_PREFIX}{generation}.npz")
+
+
+def _log_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"{_LOG_PREFIX}{generation}.log")
+
+
+def _datapoints_pack(datapoints: List[any]) -> Tuple[List[int], bytes]:
+    packed = np.asarray(datapoints, dtype=np.float32)
+    return list(packed.shape), packed.tobytes()
+
+
+def _datapoints_unpack(shape: List[int], payload: bytes) -> np.ndarray:
+    """
+    The datapoints of the record as one float32 block owning its memory, the nodes hold its rows
+    """
+    return np.frombuffer(payload, dtype=np.float32).reshape(shape).copy()
+
+
+def _frame_encode(header: Dict[str, any], payload: bytes = b"") -> bytes:
+    header_bytes = json.dumps(header).encode("utf-8")
+    checksum = zlib.crc32(payload, zlib.crc32(header_bytes))
+    return _FRAME_HEADER.pack(len(header_bytes), len(payload), checksum) + header_bytes + payload
+
+
+def _frames_decode(log: BinaryIO) -> Tuple[List[Tuple[Dict[str, any], bytes]], int]:
+    """
+    The complete frames of the log and the offset where they end, a torn or corrupted tail is left out
+    """
+    frames = []
+    offset = 0
+    while True:
+        frame_header = log.read(_FRAME_HEADER.size)
+        if len(frame_header) < _FRAME_HEADER.size:
+            break
+        header_length, payload_length, checksum = _FRAME_HEADER.unpack(frame_header)
+        header_bytes = log.read(header_length)
+        payload = log.read(payload_length)
+        if len(header_bytes) < header_length or len(payload) < payload_length or \
+                zlib.crc32(payload, zlib.crc32(header_bytes)) != checksum:
+            break
+        frames.append((json.loads(header_bytes.decode("utf-8")), payload))
+        offset += _FRAME_HEADER.size + header_length + payload_length
+
+    return frames, offset
+
+
+def _record_create(data_alias: DataAlias, elements: List[any]) -> bytes:
+    if data_alias != DataAlias.NODE_AUTHENTIC:
+        return _frame_encode({"data": data_alias.value, "operation": OperationsAlias.CREATE.value,
+                              "elements": [dict(element) for element in elements]})
+
+    shape, payload = _datapoints_pack([element[_DATAPOINTS_FIELD] for element in elements])
+    return _frame_encode({"data": data_alias.value, "operation": OperationsAlias.CREATE.value,
+                          "elements": [{"name": element["name"], "params": element["params"]} for element in elements],
+                          "shape": shape}, payload)
+
+
+def _record_update(data_alias: DataAlias, old_elements: List[any], new_elements: List[any]) -> bytes:
+    """
+    Only the changed fields are kept, grouped by the name the elements had, as the updates are replayed by name.
+    Connections sharing a name are updated together, so merging their changes gives back the update
+    """
+    updates: Dict[str, Dict[str, any]] = {}
+    for old_element, new_element in zip(old_elements, new_elements):
+        changes = updates.setdefault(old_element["name"], {})
+        changes.update({field: new_element[field] for field in old_element.changes})
+
+    datapoints_names = [name for name, changes in updates.items() if _DATAPOINTS_FIELD in changes]
+    datapoints = [updates[name].pop(_DATAPOINTS_FIELD) for name in datapoints_names]
+    header = {"data": data_alias.value, "operation": OperationsAlias.UPDATE.value, "updates": list(updates.items())}
+    if len(datapoints) == 0:
+        return _frame_encode(header)
+
+    header["shape"], payload = _datapoints_pack(datapoints)
+    header["datapoints_names"] = datapoints_names
+    return _frame_encode(header, payload)
+
+
+def _record_delete(data_alias: DataAlias, deleted_elements: List[any]) -> bytes:
+    names = list(dict.fromkeys(element["name"] for element in deleted_elements))
+    return _frame_encode({"data": data_alias.value, "operation": OperationsAlias.DELETE.value, "names": names})
+
+
+def _record_replay(storage_struct: StorageStruct, header: Dict[str, any], payload: bytes) -> None:
+    data_alias = DataAlias(header["data"])
+    operation = OperationsAlias(header["operation"])
+
+    if operation == OperationsAlias.CREATE:
+        elements = header["elements"]
+        if data_alias == DataAlias.NODE_AUTHENTIC:
+            for element, datapoints in zip(elements, _datapoints_unpack(header["shape"], payload)):
+                element[_DATAPOINTS_FIELD] = datapoints
+        _CRUD_CREATE[data_alias](storage_struct, elements)
+    elif operation == OperationsAlias.UPDATE:
+        updates = dict(header["updates"])
+        if "datapoints_names" in header:
+            for name, datapoints in zip(header["datapoints_names"], _datapoints_unpack(header["shape"], payload)):
+                updates[name][_DATAPOINTS_FIELD] = datapoints
+        fields = _NODE_FIELDS if data_alias == DataAlias.NODE_AUTHENTIC else _CONNECTION_FIELDS
+        updated_elements = [{field: changes.get(field) for field in fields} for changes in updates.values()]
+        _CRUD_UPDATE[data_alias](storage_struct, list(updates.keys()), updated_elements)
+    else:
+        _CRUD_DELETE[data_alias](storage_struct, header["names"])
+
+
+def _generation_latest(directory: str) -> int:
+    generations = [int(file_name[len(_CHECKPOINT_PREFIX):-len(".npz")]) for file_name in os.listdir(directory) if
+                   file_name.startswith(_CHECKPOINT_PREFIX) and file_name.endswith(".npz")]
+    return max(generations, default=0)
+
+
+def _files_remove_older(directory: str, generation: int) -> None:
+    for file_name in os.listdir(directory):
+        for prefix, extension in [(_CHECKPOINT_PREFIX, ".npz"), (_LOG_PREFIX, ".log")]:
+            if file_name.startswith(prefix) and file_name.endswith(extension) and \
+                    int(file_name[len(prefix):-len(extension)]) < generation:
+                os.remove(os.path.join(directory, file_name))
+
+
+def storage_journal_recover(storage_struct: StorageStruct, directory: str, mmap: bool = False,
+                            truncate: bool = False) -> int:
+    """
+    Loads the latest checkpoint of the journal into the empty storage and replays its log, returning the generation of
+    the checkpoint. Replaying stops at a torn record at the end of the log, from an interrupted write or one in progress
+
+    Reading doesn't change the directory, so it works while a writer has the journal open and on read only copies. Only
+    the writer resuming the journal truncates the torn record, so its records follow the last complete one
+
+    With mmap the datapoints of the checkpoint stay memory mapped, see read_map
+    """
+    generation = _generation_latest(directory)
+    checkpoint_path = _checkpoint_path(directory, generation)
+    log_path = _log_path(directory, generation)
+
+    with storage.storage_transaction(storage_struct):
+        if os.path.exists(checkpoint_path):
+            nodes, connections_authentic, connections_synthetic, connections_null = read_map(checkpoint_path, mmap=mmap)
+            storage.crud.create_nodes(storage_struct, nodes)
+            storage.crud.create_connections_authentic(storage_struct, connections_authentic)
+            storage.crud.create_connections_synthetic(storage_struct, connections_synthetic)
+            storage.crud.create_connections_null(storage_struct, connections_null)
+
+        if os.path.exists(log_path):
+            with open(log_path, "r+b" if truncate else "rb") as log:
+                frames, end = _frames_decode(log)
+                if truncate:
+                    log.truncate(end)
+            for header, payload in frames:
+                _record_replay(storage_struct, header, payload)
+
+    return generation
+
+
+def _journal_write(journal: StorageJournal, record: bytes) -> None:
+    journal.log.write(record)
+    journal.log.flush()
+    if journal.durable:
+        os.fsync(journal.log.fileno())
+
+
+def _checkpoint_write(journal: StorageJournal, data: CheckpointData) -> None:
+    """
+    Writes the data as the next checkpoint and starts its empty log, then removes the previous generation
+
+    The checkpoint is renamed into place once complete, so an interruption leaves either generation fully usable
+    """
+    generation = journal.generation + 1
+    checkpoint_path = _checkpoint_path(journal.directory, generation)
+    with open(checkpoint_path + ".tmp", "wb") as file:
+        write_map(file, *data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+    journal.log.close()
+    journal.log = open(_log_path(journal.directory, generation), "ab")
+    journal.generation = generation
+    journal.checkpoint_bytes = os.path.getsize(checkpoint_path)
+    _files_remove_older(journal.directory, generation)
+
+
+def _journal_writer(journal: StorageJournal) -> None:
+    """
+    Writes the queued records and checkpoints in order until the None closing the queue. After a failure the queue is
+    still drained, so the operations don't block on it, and the error is raised to them instead
+    """
+    while True:
+        item = journal.queue.get()
+        try:
+            if item is None:
+                return
+            if journal.error is not None:
+                continue
+
+            start_time = time.perf_counter()
+            if isinstance(item, bytes):
+                _journal_write(journal, item)
+                journal.records_written += 1
+            else:
+                _checkpoint_write(journal, item)
+                journal.checkpoints_written += 1
+                journal.checkpoint_pending = False
+            elapsed = time.perf_counter() - start_time
+            journal.write_seconds += elapsed
+            journal.write_seconds_max = max(journal.write_seconds_max, elapsed)
+        except Exception as error:
+            journal.error = error
+        finally:
+            journal.queue.task_done()
+
+
+def _journal_raise(journal: StorageJournal) -> None:
+    if journal.error is not None:
+        raise RuntimeError(f"The journal writer of {journal.directory} failed") from journal.error
+
+
+def _journal_enqueue(journal: StorageJournal, item: bytes | CheckpointData) -> None:
+    _journal_raise(journal)
+    start_time = time.perf_counter()
+    journal.queue.put(item)
+    journal.blocked_seconds += time.perf_counter() - start_time
+
+
+def _journal_subscribe(storage_struct: StorageStruct, journal: StorageJournal) -> None:
+    """
+    Records every operation as it happens, and checkpoints once the log outgrew the last checkpoint
+    """
+
+    def recorded(record_function):
+        def subscriber(storage_arg: StorageStruct, *payload) -> None:
+            if journal.closed:
+                return
+            record = record_function(*payload)
+            _journal_enqueue(journal, record)
+            journal.log_bytes += len(record)
+            if not journal.checkpoint_pending and \
+                    journal.log_bytes >= max(JOURNAL_CHECKPOINT_MIN_BYTES, journal.checkpoint_bytes):
+                storage_journal_checkpoint(storage_arg, journal)
+
+        return subscriber
+
+    for data_alias in DataAlias:
+        subscribe_to_crud_operations(
+            storage=storage_struct,
+            data_alias=data_alias,
+            create_subscriber=recorded(lambda elements, alias=data_alias: _record_create(alias, elements)),
+            update_subscriber=recorded(lambda old, new, alias=data_alias: _record_update(alias, old, new)),
+            delete_subscriber=recorded(lambda elements, alias=data_alias: _record_delete(alias, elements)),
+        )
+
+
+def storage_journal_open(storage_struct: StorageStruct, directory: str, durable: bool = False,
+                         queue_size: int = JOURNAL_QUEUE_SIZE) -> StorageJournal:
+    """
+    Recovers the storage from the journal in the directory, if there's one, then journals every crud operation on it
+
+    The storage has to be empty. Records are written in the background and flushed as they are, durable also syncs
+    them to the disk. Journals still open when the interpreter exits are closed, writing what they have queued
+    """
+    os.makedirs(directory, exist_ok=True)
+    generation = storage_journal_recover(storage_struct, directory, truncate=True)
+    _files_remove_older(directory, generation)
+
+    checkpoint_path = _checkpoint_path(directory, generation)
+    log_path = _log_path(directory, generation)
+    journal = StorageJournal(
+        directory=directory,
+        generation=generation,
+        log=open(log_path, "ab"),
+        log_bytes=os.path.getsize(log_path),
+        checkpoint_bytes=os.path.getsize(checkpoint_path) if os.path.exists(checkpoint_path) else 0,
+        durable=durable,
+        queue=Queue(maxsize=queue_size),
+    )
+    # a daemon thread, the interpreter joins the other threads before running the exit handlers closing the journals
+    journal.writer = threading.Thread(target=_journal_writer, args=(journal,), name="StorageJournalWriter",
+                                      daemon=True)
+    journal.writer.start()
+    _journals_open.append(journal)
+    _journal_subscribe(storage_struct, journal)
+    return journal
+
+
+def storage_journal_checkpoint(storage_struct: StorageStruct, journal: StorageJournal) -> None:
+    """
+    Queues the whole storage as the next checkpoint, the records queued after it go to the log of the new generation
+
+    Elements are shallow copies, their fields are replaced and never mutated, so the writer can read them without
+    holding the storage lock
+    """
+    with storage_struct.lock.read():
+        data = ([dict(node) for node in storage_struct.nodes_authentic],
+                [dict(connection) for connection in storage_struct.connections_authentic],
+                [dict(connection) for connection in storage_struct.connections_synthetic],
+                [dict(connection) for connection in storage_struct.connections_null])
+    journal.checkpoint_pending = True
+    journal.log_bytes = 0
+    _journal_enqueue(journal, data)
+
+
+def storage_journal_flush(journal: StorageJournal) -> None:
+    """
+    Waits until everything queued so far is written
+    """
+    journal.queue.join()
+    _journal_raise(journal)
+
+
+def storage_journal_stats(journal: StorageJournal) -> Dict[str, any]:
+    """
+    Queue depth and write latencies of the writer, and the time the operations spent blocked on a full queue
+    """
+    writes = journal.records_written + journal.checkpoints_written
+    return {
+        "queue_depth": journal.queue.qsize(),
+        "queue_size": journal.queue.maxsize,
+        "records_written": journal.records_written,
+        "checkpoints_written": journal.checkpoints_written,
+        "write_seconds_mean": journal.write_seconds / writes if writes > 0 else 0.0,
+        "write_seconds_max": journal.write_seconds_max,
+        "blocked_seconds": journal.blocked_seconds,
+    }
+
+
+def storage_journal_stats_format(stats: Dict[str, any]) -> str:
+    """
+    One line, for logging
+    """
+    return (f"journal: queue {stats['queue_depth']}/{stats['queue_size']}, {stats['records_written']} records, "
+            f"{stats['checkpoints_written']} checkpoints, write mean {stats['write_seconds_mean'] * 1000:.2f} ms, "
+            f"max {stats['write_seconds_max'] * 1000:.2f} ms, blocked {stats['blocked_seconds']:.2f} s")
+
+
+def storage_journal_close(journal: StorageJournal) -> None:
+    """
+    Writes what is still queued and closes the log, raising if the writer failed
+    """
+    if journal.closed:
+        return
+    journal.closed = True
+    journal.queue.put(None)
+    journal.writer.join()
+    journal.log.close()
+    _journals_open.remove(journal)
+    _journal_raise(journal)
+
+
+@atexit.register
+def _journals_close_at_exit() -> None:
+    for journal in list(_journals_open):
+        storage_journal_close(journal)
@@ -3,6 +3,7 @@ import torch
 import manim
 from src.navigation_core.networks.metric_generator.metric_network_abstract import MetricNetworkAbstract
 from src.runtime_storages.storage_struct import StorageStruct
+from src.runtime_storages.storage_snapshot import storage_snapshot
 from src.save_load_handlers.ai_models_handle import load_manually_saved_ai
 from src.visualizations.configs import manim_configs_png, manim_configs_opengl
 from src.visualizations.decorators import run_as_png, run_as_interactive_opengl
@@ -33,7 +34,7 @@ def visualization_topological_graph(storage_struct: StorageStruct) -> Scene:
     visualization_struct = visualization_storage.create_visualization_struct()
     build_nodes_topology(
         scene=scene,
-        storage_struct=storage_struct,
+        storage_struct=storage_snapshot(storage_struct),
         visualization_struct=visualization_struct,
     )
     return scene
@@ -1,10 +1,48 @@
+import math
+import random
 import unittest
+from unittest.mock import patch
+import numpy as np
+import torch
 from src import runtime_storages as storage
 from src.runtime_storages.general_cache.cache_nodes_indexes import validate_cache_nodes_indexes, \
     CacheNodesIndexes
-from src.runtime_storages.other.cache_functions import cache_general_get
+from src.runtime_storages.other.cache_functions import cache_general_get, cache_specialized_get
 from src.runtime_storages.general_cache.cache_nodes_map import validate_cache_nodes_map, CacheNodesMap
-from src.runtime_storages.types import CacheGeneralAlias, NodeAuthenticData
+from src.runtime_storages.general_cache.cache_nodes_tensor import validate_cache_nodes_tensor
+from src.runtime_storages.general_cache.cache_connections_edges import validate_cache_connections_edges
+from src.runtime_storages.functions import method_decorators
+from src.runtime_storages.functions.element_diffs import ElementDiff
+from src.runtime_storages.functions.method_decorators import memoize_read
+from src.runtime_storages.functions.subscriber_functions import subscribe_to_crud_operation
+from src.runtime_storages.cache_abstract import CacheAbstract
+from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+from src.runtime_storages.other import CacheDefinition, CacheSubscription, caches_register
+from src.runtime_storages.types import CacheGeneralAlias, NodeAuthenticData, ConnectionAuthenticData, \
+    ConnectionSyntheticData, ConnectionNullData, DataAlias, OperationsAlias, CacheActivation
+
+
+class _CacheCallsLog(CacheAbstract):
+    def __init__(self):
+        self.calls = []
+
+    def read(self):
+        return self.calls
+
+
+def _calls_log_definition(alias: str, log: list, depends_on: list, **kwargs) -> CacheDefinition:
+    def on_create(storage_struct, new_nodes):
+        log.append((alias, "create", len(new_nodes)))
+
+    def on_update(storage_struct, old_nodes, new_nodes):
+        log.append((alias, "update", len(new_nodes)))
+
+    def on_delete(storage_struct, deleted_nodes):
+        log.append((alias, "delete", len(deleted_nodes)))
+
+    return CacheDefinition(alias=alias, factory=_CacheCallsLog, depends_on=depends_on,
+                           subscriptions=[CacheSubscription(DataAlias.NODE_AUTHENTIC, on_create, on_update,
+                                                            on_delete)], **kwargs)
 
 
 class TestsCacheGeneral(unittest.TestCase):
@@ -37,7 +75,8 @@ class TestsCacheGeneral(unittest.TestCase):
         read_node = cache.read(node_name="node1")
         with self.assertRaises(KeyError):
             cache.read(node_name="node2")
-        self.assertEqual(read_node, node)
+        self.assertEqual(read_node["datapoints_array"].tolist(), node["datapoints_array"])
+        self.assertEqual(read_node["params"], node["params"])
 
         # update node
         new_params = {"param1": 2}
@@ -53,16 +92,16 @@ class TestsCacheGeneral(unittest.TestCase):
             cache.read(node_name="node2")
         storage.crud.create_nodes(storage_struct, [node2])
         read_node2 = cache.read(node_name="node2")
-        self.assertEqual(read_node2, node2)
+        self.assertEqual(read_node2["name"], "node2")
         read_node1 = cache.read(node_name="node1")
-        self.assertNotEqual(read_node1, node2)
+        self.assertEqual(read_node1["name"], "node1")
 
         # delete nodes
         storage.crud.delete_nodes(storage_struct, ["node1"])
         with self.assertRaises(KeyError):
             cache.read(node_name="node1")
         read_node2 = cache.read(node_name="node2")
-        self.assertEqual(read_node2, node2)
+        self.assertEqual(read_node2["datapoints_array"].tolist(), node2["datapoints_array"])
         storage.crud.delete_nodes(storage_struct, ["node2"])
         with self.assertRaises(KeyError):
             cache.read(node_name="node2")
@@ -101,3 +140,543 @@ class TestsCacheGeneral(unittest.TestCase):
             cache_indexes.read(node_name="node1")
         read_node2 = cache_indexes.read(node_name="node2")
         self.assertEqual(read_node2, 0)
+
+    def test_cache_nodes_tensor(self):
+        """Testing crud on data affecting the tensor store"""
+
+        storage_struct = self.storage_struct
+        cache_tensor = cache_general_get(storage_struct, CacheGeneralAlias.NODE_TENSOR_STORE)
+        cache_tensor = validate_cache_nodes_tensor(cache_tensor)
+
+        node1 = NodeAuthenticData(name="node1", datapoints_array=[[1, 2, 3], [4, 5, 6]], params={"param1": 1})
+        node2 = NodeAuthenticData(name="node2", datapoints_array=[[7, 8, 9], [10, 11, 12]], params={"param1": 1})
+        node3 = NodeAuthenticData(name="node3", datapoints_array=[[13, 14, 15], [16, 17, 18]], params={"param1": 1})
+        storage.crud.create_nodes(storage_struct, [node1, node2, node3])
+
+        self.assertEqual(tuple(cache_tensor.read_rows(["node1", "node2", "node3"]).shape), (3, 2, 3))
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node2").tolist(), node2["datapoints_array"])
+        self.assertEqual(storage.node_get_datapoint_tensor_at_index(storage_struct, "node3", 1).tolist(), [16, 17, 18])
+
+        gathered = storage.nodes_get_datapoint_tensors_at_indexes(storage_struct, ["node3", "node1"], [0, 1])
+        self.assertEqual(gathered.tolist(), [[13, 14, 15], [4, 5, 6]])
+
+        # the accessors return copies, the views share the datapoints the node holds
+        copied = storage.node_get_datapoints_tensor(storage_struct, "node1")
+        copied[0, 0] = -1
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node1").tolist(), [[1, 2, 3], [4, 5, 6]])
+        viewed = storage.node_get_datapoints_tensor_view(storage_struct, "node1")
+        self.assertTrue(np.shares_memory(viewed.numpy(), storage.node_get_datapoints_by_name(storage_struct, "node1")))
+
+        # update node
+        updated_node = NodeAuthenticData(name="node1", datapoints_array=[[0, 0, 0], [1, 1, 1]], params=None)
+        storage.crud.update_nodes_by_name(storage_struct, names=["node1"], updated_nodes=[updated_node])
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node1").tolist(), [[0, 0, 0], [1, 1, 1]])
+        self.assertEqual(viewed.tolist(), [[1, 2, 3], [4, 5, 6]])
+
+        # views read before a delete keep their datapoints, as the rows of the other nodes are not moved over them
+        viewed = storage.node_get_datapoint_tensor_view_at_index(storage_struct, "node1", 1)
+        storage.crud.delete_nodes(storage_struct, ["node1"])
+        self.assertEqual(viewed.tolist(), [1, 1, 1])
+        with self.assertRaises(KeyError):
+            cache_tensor.read(node_name="node1")
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node3").tolist(), node3["datapoints_array"])
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node2").tolist(), node2["datapoints_array"])
+
+        # mismatched shapes are rejected
+        node4 = NodeAuthenticData(name="node4", datapoints_array=[[1, 2], [3, 4]], params={"param1": 1})
+        with self.assertRaises(ValueError):
+            storage.crud.create_nodes(storage_struct, [node4])
+
+    def test_cache_connections_adjacency(self):
+        """Testing crud on connections affecting the adjacency cache"""
+
+        storage_struct = self.storage_struct
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[1, 2, 3]], params={"param1": 1}) for i in
+                 range(1, 4)]
+        storage.crud.create_nodes(storage_struct, nodes)
+
+        connection12 = ConnectionAuthenticData(name="connection12", start="node1", end="node2", distance=1.0,
+                                               direction=[1, 0])
+        connection31 = ConnectionSyntheticData(name="connection31", start="node3", end="node1", distance=2.0,
+                                               direction=[0, 1])
+        connection_null = ConnectionNullData(name="node1", start="node1", distance=0.5, direction=[-1, 0])
+        storage.crud.create_connections_authentic(storage_struct, [connection12])
+        storage.crud.create_connections_synthetic(storage_struct, [connection31])
+        storage.crud.create_connections_null(storage_struct, [connection_null])
+
+        adjacent = storage.node_get_connections_adjacent(storage_struct, "node1")
+        self.assertEqual(sorted([connection["end"] for connection in adjacent]), ["node2", "node3"])
+        reversed_connection = [connection for connection in adjacent if connection["end"] == "node3"][0]
+        self.assertEqual(reversed_connection["direction"], [0, -1])
+        # reversing must not touch the stored connection
+        self.assertEqual(connection31["direction"], [0, 1])
+
+        self.assertEqual(len(storage.node_get_connections_adjacent(storage_struct, "node2")), 1)
+        self.assertEqual(storage.node_get_connections_null(storage_struct, "node1"), [connection_null])
+        self.assertEqual(storage.node_get_connections_null(storage_struct, "node2"), [])
+
+        # update moves the connection between nodes
+        updated = ConnectionAuthenticData(name=None, start=None, end="node3", distance=None, direction=None)
+        storage.crud.update_connections_authentic(storage_struct, ["connection12"], [updated])
+        self.assertEqual(len(storage.node_get_connections_adjacent(storage_struct, "node2")), 0)
+        self.assertEqual(len(storage.node_get_connections_adjacent(storage_struct, "node3")), 2)
+
+        # deletions
+        storage.crud.delete_connections_synthetic(storage_struct, ["connection31"])
+        storage.crud.delete_connections_null(storage_struct, ["node1"])
+        self.assertEqual([connection["end"] for connection in
+                          storage.node_get_connections_adjacent(storage_struct, "node1")], ["node3"])
+        self.assertEqual(storage.node_get_connections_null(storage_struct, "node1"), [])
+
+    def test_cache_connections_pairs(self):
+        """Testing connection existence checks backed by the pairs index"""
+
+        storage_struct = self.storage_struct
+        connection12 = ConnectionAuthenticData(name="connection12", start="node1", end="node2", distance=1.0,
+                                               direction=[1, 0])
+        connection23 = ConnectionSyntheticData(name="connection23", start="node2", end="node3", distance=1.0,
+                                               direction=[1, 0])
+        storage.crud.create_connections_authentic(storage_struct, [connection12])
+        storage.crud.create_connections_synthetic(storage_struct, [connection23])
+
+        self.assertTrue(storage.connections_authentic_check_if_exists(storage_struct, "node1", "node2"))
+        self.assertFalse(storage.connections_authentic_check_if_exists(storage_struct, "node2", "node1"))
+        self.assertTrue(storage.connection_exists(storage_struct, "node2", "node1"))
+        self.assertTrue(storage.connection_exists(storage_struct, "node3", "node2"))
+        self.assertFalse(storage.connection_exists(storage_struct, "node3", "node2",
+                                                   data_aliases=[DataAlias.CONNECTIONS_AUTHENTIC]))
+        self.assertFalse(storage.connection_exists(storage_struct, "node1", "node3"))
+
+        authentic, synthetic = storage.connections_classify_into_authentic_synthetic(storage_struct,
+                                                                                     [connection23, connection12])
+        self.assertEqual(authentic, [connection12])
+        self.assertEqual(synthetic, [connection23])
+
+        storage.crud.delete_connections_authentic(storage_struct, ["connection12"])
+        self.assertFalse(storage.connection_exists(storage_struct, "node1", "node2"))
+
+    def test_bulk_delete_keeps_indexes_consistent(self):
+        """Testing swap-removal of many nodes and connections in a single call"""
+
+        storage_struct = self.storage_struct
+        cache_indexes = validate_cache_nodes_indexes(
+            cache_general_get(storage_struct, CacheGeneralAlias.NODE_INDEX_MAP))
+
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i]], params={"param1": 1}) for i in
+                 range(200)]
+        storage.crud.create_nodes(storage_struct, nodes)
+        connections = [ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}",
+                                               distance=1.0, direction=[1, 0]) for i in range(199)]
+        storage.crud.create_connections_authentic(storage_struct, connections)
+
+        deleted_names = [f"node{i}" for i in range(0, 200, 3)]
+        storage.crud.delete_nodes(storage_struct, deleted_names)
+        storage.crud.delete_connections_authentic(storage_struct, [f"connection{i}" for i in range(0, 199, 2)])
+
+        remaining_names = storage.nodes_get_all_names(storage_struct)
+        self.assertEqual(len(remaining_names), 200 - len(deleted_names))
+        self.assertEqual(set(remaining_names), {f"node{i}" for i in range(200)} - set(deleted_names))
+        for index, name in enumerate(remaining_names):
+            self.assertEqual(cache_indexes.read(node_name=name), index)
+            self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, name).tolist(),
+                             storage.node_get_datapoints_by_name(storage_struct, name).tolist())
+
+        remaining_connections = storage.connections_authentic_get(storage_struct)
+        self.assertEqual({connection["name"] for connection in remaining_connections},
+                         {f"connection{i}" for i in range(1, 199, 2)})
+
+        # the indexes are used to find the targets of later updates and deletions
+        updated = ConnectionAuthenticData(name=None, start=None, end=None, distance=5.0, direction=None)
+        storage.crud.update_connections_authentic(storage_struct, ["connection1"], [updated])
+        self.assertEqual([connection["distance"] for connection in remaining_connections if
+                          connection["name"] == "connection1"], [5.0])
+        with self.assertRaises(ValueError):
+            storage.crud.delete_nodes(storage_struct, ["node0"])
+
+    def test_cache_nodes_spatial(self):
+        """Testing radius and nearest queries against a linear scan, on the grid and on the KD-tree"""
+
+        storage_struct = self.storage_struct
+        rng = random.Random(3)
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[1]],
+                                   params={"x": rng.uniform(-10, 10), "y": rng.uniform(-10, 10)}) for i in range(300)]
+        nodes.append(NodeAuthenticData(name="node_no_coords", datapoints_array=[[1]], params={}))
+        storage.crud.create_nodes(storage_struct, nodes)
+
+        storage.crud.delete_nodes(storage_struct, [f"node{i}" for i in range(0, 300, 4)])
+        storage.crud.update_nodes_by_name(storage_struct, ["node1"], [
+            NodeAuthenticData(name="node1_moved", datapoints_array=None, params={"x": 30.0, "y": 30.0})])
+
+        def assert_matches_scan():
+            positions = {node["name"]: (node["params"]["x"], node["params"]["y"]) for node in
+                         storage.nodes_get_all(storage_struct) if "x" in node["params"]}
+            for target_x, target_y in [(rng.uniform(-12, 12), rng.uniform(-12, 12)) for _ in range(50)] + [
+                (29.0, 29.0), (100.0, -100.0)]:
+                distances = {name: math.dist(position, (target_x, target_y)) for name, position in positions.items()}
+                close = [name for name in storage.nodes_get_all_names(storage_struct) if
+                         name in distances and distances[name] < 1.5]
+                self.assertEqual(storage.nodes_get_close_to_xy(storage_struct, target_x, target_y, 1.5), close)
+
+                nearest = storage.node_get_closest_to_xy(storage_struct, target_x, target_y)
+                self.assertAlmostEqual(distances[nearest], min(distances.values()))
+
+        assert_matches_scan()
+        self.assertTrue(storage.check_node_is_known_from_metadata(storage_struct, [30.0, 30.1]))
+        self.assertFalse(storage.check_node_is_known_from_metadata(storage_struct, [50.0, 50.0]))
+
+        storage.nodes_spatial_build_tree(storage_struct)
+        assert_matches_scan()
+
+    def test_memoized_reads(self):
+        """Testing that read results are reused until the data they depend on changes"""
+
+        storage_struct = self.storage_struct
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i]], params={"param1": 1}) for i in
+                 range(3)]
+        storage.crud.create_nodes(storage_struct, nodes)
+
+        names = storage.nodes_get_all_names(storage_struct)
+        self.assertEqual(names, ("node0", "node1", "node2"))
+        self.assertIs(storage.nodes_get_all_names(storage_struct), names)
+        self.assertIs(storage.nodes_get_all_names(storage=storage_struct), names)
+
+        # other data doesn't invalidate the names
+        connection = ConnectionSyntheticData(name="connection0", start="node0", end="node1", distance=1.0,
+                                             direction=[1, 0])
+        connections = storage.connections_all_get(storage_struct)
+        self.assertEqual(connections, ())
+        storage.crud.create_connections_synthetic(storage_struct, [connection])
+        self.assertIs(storage.nodes_get_all_names(storage_struct), names)
+        self.assertEqual(storage.connections_all_get(storage_struct), (connection,))
+        # the results are shared, so the elements can't be changed through them
+        with self.assertRaises(TypeError):
+            storage.connections_all_get(storage_struct)[0]["distance"] = 2.0
+        with self.assertRaises(ValueError):
+            storage.nodes_get_datapoints_arrays(storage_struct)[0][0, 0] = 2.0
+        self.assertEqual(storage_struct.connections_synthetic[0]["distance"], 1.0)
+        self.assertEqual(storage_struct.data_versions[DataAlias.CONNECTIONS_SYNTHETIC], 1)
+
+        version = storage_struct.data_versions[DataAlias.NODE_AUTHENTIC]
+        storage.crud.delete_nodes(storage_struct, ["node1"])
+        self.assertGreater(storage_struct.data_versions[DataAlias.NODE_AUTHENTIC], version)
+        self.assertEqual(set(storage.nodes_get_all_names(storage_struct)), {"node0", "node2"})
+
+        storage.crud.update_nodes_by_name(storage_struct, ["node0"],
+                                          [NodeAuthenticData(name="node5", datapoints_array=None, params=None)])
+        self.assertEqual(set(storage.nodes_get_all_names(storage_struct)), {"node5", "node2"})
+
+        @memoize_read(DataAlias.NODE_AUTHENTIC)
+        def node_params_get(storage_struct_read, name: any) -> tuple:
+            name = name if isinstance(name, str) else name[0]
+            return tuple(storage.node_get_by_name(storage_struct_read, name)["params"])
+
+        # functions sharing a name in other modules keep their own results
+        def other_node_params_get(storage_struct_read, name: str) -> tuple:
+            return tuple(storage.node_get_by_name(storage_struct_read, name)["params"].values())
+
+        other_node_params_get.__name__ = node_params_get.__name__
+        other_node_params_get.__qualname__ = node_params_get.__qualname__
+        other_node_params_get.__module__ = "other_module"
+        other_node_params_get = memoize_read(DataAlias.NODE_AUTHENTIC)(other_node_params_get)
+        self.assertEqual((node_params_get(storage_struct, "node2"), other_node_params_get(storage_struct, "node2")),
+                         (("param1",), (1,)))
+        self.assertEqual((node_params_get(storage_struct, "node2"), other_node_params_get(storage_struct, "node2")),
+                         (("param1",), (1,)))
+        memoized_name = f"{__name__}.{node_params_get.__qualname__}"
+
+        # results of older versions are dropped once a newer one is stored
+        for name in ["node5", "node2"]:
+            node_params_get(storage_struct, name)
+        storage.crud.update_nodes_by_name(storage_struct, ["node2"],
+                                          [NodeAuthenticData(name=None, datapoints_array=None, params={"param2": 2})])
+        self.assertEqual(node_params_get(storage_struct, "node2"), ("param2",))
+        self.assertEqual(len(storage_struct.memoized_reads[memoized_name][1]), 1)
+
+        with patch.object(method_decorators, "MEMOIZED_READS_MAX_ENTRIES", 1):
+            node_params_get(storage_struct, "node5")
+            self.assertEqual(list(storage_struct.memoized_reads[memoized_name][1]), [(("node5",), ())])
+
+        # unhashable arguments are read without being memoized
+        misses = storage_struct.memoized_reads_misses
+        self.assertEqual(node_params_get(storage_struct, ["node2"]), ("param2",))
+        self.assertEqual(storage_struct.memoized_reads_misses, misses)
+
+    def test_transformation_data_apply(self):
+        """Testing that the transformation is applied to all nodes in batches, as one update"""
+
+        storage_struct = self.storage_struct
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i + 1, i + 2], [i, 0, -i]], params={"x": i})
+                 for i in range(5)]
+        storage.crud.create_nodes(storage_struct, nodes)
+        storage.crud.delete_nodes(storage_struct, ["node1"])
+        expected = {node["name"]: [[row[0] + row[1], row[2]] for row in node["datapoints_array"]] for node in nodes
+                    if node["name"] != "node1"}
+
+        calls = []
+        updates = []
+        subscribe_to_crud_operation(storage_struct, DataAlias.NODE_AUTHENTIC, OperationsAlias.UPDATE,
+                                    lambda _, old, new: updates.append(len(new)))
+
+        def transformation(data: torch.Tensor) -> torch.Tensor:
+            calls.append(tuple(data.shape))
+            return torch.stack([data[:, 0] + data[:, 1], data[:, 2]], dim=1)
+
+        with self.assertRaises(ValueError):
+            storage.transformation_data_apply(storage_struct)
+        storage.transformation_set(storage_struct, transformation)
+        # two nodes of 2x3 float32 per chunk
+        storage.transformation_data_apply(storage_struct, chunk_bytes=2 * 2 * 3 * 4)
+
+        self.assertEqual(calls, [(4, 3), (4, 3)])
+        self.assertEqual(updates, [4])
+        for name, datapoints in expected.items():
+            self.assertEqual(storage.node_get_by_name(storage_struct, name)["datapoints_array"].tolist(), datapoints)
+            self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, name).tolist(), datapoints)
+        self.assertEqual(storage.node_get_by_name(storage_struct, "node3")["params"], {"x": 3})
+
+    def test_update_events_diffs(self):
+        """Testing that update events carry field diffs, and snapshots for the subscribers asking for them"""
+
+        storage_struct = self.storage_struct
+        datapoints = [[1, 2], [3, 4]]
+        node = NodeAuthenticData(name="node0", datapoints_array=datapoints, params={"x": 0.0, "y": 0.0})
+        storage.crud.create_nodes(storage_struct, [node])
+
+        received_diffs = []
+        received_snapshots = []
+        subscribe_to_crud_operation(storage_struct, DataAlias.NODE_AUTHENTIC, OperationsAlias.UPDATE,
+                                    lambda _, old, new: received_diffs.append(old))
+        subscribe_to_crud_operation(storage_struct, DataAlias.NODE_AUTHENTIC, OperationsAlias.UPDATE,
+                                    lambda _, old, new: received_snapshots.extend(old), batched=True, snapshot=True)
+
+        new_params = {"x": 1.0, "y": 1.0}
+        storage.crud.update_nodes_by_name(storage_struct, ["node0"],
+                                          [NodeAuthenticData(name=None, datapoints_array=None, params=new_params)])
+        diff = received_diffs[0][0]
+        self.assertIsInstance(diff, ElementDiff)
+        self.assertEqual(diff.changes, {"params": ({"x": 0.0, "y": 0.0}, new_params)})
+        self.assertFalse(diff.changed("datapoints_array"))
+        self.assertIs(diff["datapoints_array"], storage.node_get_datapoints_by_name(storage_struct, "node0"))
+        self.assertEqual([(snapshot["name"], snapshot["datapoints_array"].tolist(), snapshot["params"]) for snapshot in
+                          received_snapshots], [("node0", datapoints, {"x": 0.0, "y": 0.0})])
+
+        # inside a transaction the old states stay exact even though they are read after every update
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[5, 6], [7, 8]], params=None) for i in [1, 3]])
+        received_snapshots.clear()
+        with storage.storage_transaction(storage_struct):
+            storage.crud.update_nodes_by_name(storage_struct, ["node0"], [
+                NodeAuthenticData(name=None, datapoints_array=[[0, 0], [0, 0]], params=None)])
+            # a batched event in between keeps the two updates apart
+            storage.crud.create_connections_authentic(storage_struct, [
+                ConnectionAuthenticData(name="connection13", start="node1", end="node3", distance=1.0,
+                                        direction=[1, 0])])
+            storage.crud.update_nodes_by_name(storage_struct, ["node0"], [
+                NodeAuthenticData(name="node2", datapoints_array=None, params=None)])
+
+        self.assertEqual([(snapshot["name"], snapshot["datapoints_array"].tolist()) for snapshot in received_snapshots],
+                         [("node0", datapoints), ("node0", [[0, 0], [0, 0]])])
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node2").tolist(), [[0, 0], [0, 0]])
+
+    def test_cache_connections_edges(self):
+        """Testing that the edges packed as node indexes follow the nodes and connections changes"""
+
+        storage_struct = self.storage_struct
+        cache_indexes = validate_cache_nodes_indexes(
+            cache_general_get(storage_struct, CacheGeneralAlias.NODE_INDEX_MAP))
+        cache_edges = validate_cache_connections_edges(
+            cache_general_get(storage_struct, CacheGeneralAlias.CONNECTIONS_EDGES))
+
+        def assert_edges_consistent():
+            names = storage.nodes_get_all_names(storage_struct)
+            self.assertEqual([cache_indexes.read(name) for name in names], list(range(len(names))))
+            expected = []
+            for connection in storage_struct.connections_authentic + storage_struct.connections_synthetic:
+                if connection["start"] in cache_indexes.cache_map and connection["end"] in cache_indexes.cache_map \
+                        and connection["distance"] is not None:
+                    expected.append((connection["start"], connection["end"], connection["distance"]))
+            starts, ends, distances = cache_edges.read()
+            self.assertEqual(sorted(zip([names[start] for start in starts.tolist()], [names[end] for end in ends.tolist()],
+                                        distances.tolist())), sorted(expected))
+
+        # connections may come before their nodes
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{(i + 1) % 100}",
+                                    distance=float(i), direction=[1, 0]) for i in range(100)])
+        storage.crud.create_connections_synthetic(storage_struct, [
+            ConnectionSyntheticData(name=f"synthetic{i}", start=f"node{i}", end=f"node{i + 50}",
+                                    distance=None if i % 5 == 0 else 0.5, direction=None) for i in range(50)])
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i]], params={}) for i in range(0, 100, 2)])
+        assert_edges_consistent()
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i]], params={}) for i in range(1, 100, 2)])
+        assert_edges_consistent()
+
+        storage.crud.delete_nodes(storage_struct, [f"node{i}" for i in range(0, 100, 7)])
+        assert_edges_consistent()
+        storage.crud.update_nodes_by_name(storage_struct, ["node1", "node2"], [
+            NodeAuthenticData(name="node2", datapoints_array=None, params=None),
+            NodeAuthenticData(name="renamed", datapoints_array=None, params=None)])
+        assert_edges_consistent()
+
+        updates = [ConnectionSyntheticData(name=None, start=None, end=None, distance=2.0, direction=None),
+                   ConnectionSyntheticData(name=None, start="node3", end="renamed", distance=None, direction=None)]
+        storage.crud.update_connections_synthetic(storage_struct, ["synthetic5", "synthetic6"], updates)
+        storage.crud.delete_connections_authentic(storage_struct, [f"connection{i}" for i in range(0, 100, 3)])
+        assert_edges_consistent()
+        self.assertEqual(cache_edges.count, len(storage_struct.connections_authentic) + 50)
+
+        # names loaded separately end up as a single interned string, the connections given are left as they are
+        name = "".join(["node", "3"])
+        self.assertIsNot(name, "node3")
+        connection = ConnectionNullData(name="null", start=name, distance=1.0, direction=[0, 1])
+        storage.crud.create_connections_null(storage_struct, [connection])
+        node3 = storage_struct.nodes_authentic[cache_indexes.read("node3")]
+        self.assertIs(storage_struct.connections_null[0]["start"], node3["name"])
+        self.assertIs(connection["start"], name)
+        self.assertIsNot(storage_struct.connections_null[0], connection)
+        self.assertIsNot(updates[1]["start"], node3["name"])
+
+    def test_cache_connections_components(self):
+        """Testing the connected components against a search of the graph, while it is built and split"""
+
+        storage_struct = self.storage_struct
+        rng = random.Random(7)
+
+        def assert_components_match():
+            names = list(storage.nodes_get_all_names(storage_struct))
+            neighbors = {name: set() for name in names}
+            for connection in storage_struct.connections_authentic + storage_struct.connections_synthetic:
+                if connection["distance"] is not None and connection["start"] in neighbors and \
+                        connection["end"] in neighbors:
+                    neighbors[connection["start"]].add(connection["end"])
+                    neighbors[connection["end"]].add(connection["start"])
+
+            for start in rng.sample(names, 5):
+                reached = {start}
+                stack = [start]
+                while stack:
+                    for neighbor in neighbors[stack.pop()] - reached:
+                        reached.add(neighbor)
+                        stack.append(neighbor)
+                for end in names:
+                    self.assertEqual(storage.nodes_are_connected(storage_struct, start, end), end in reached)
+
+        # connections before their nodes, and connections without distance don't connect
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                    direction=[1, 0]) for i in range(0, 40, 3)])
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i]], params={}) for i in range(40)])
+        storage.crud.create_connections_synthetic(storage_struct, [
+            ConnectionSyntheticData(name=f"synthetic{i}", start=f"node{i}", end=f"node{i + 2}",
+                                    distance=None if i % 4 == 0 else 0.5, direction=None) for i in range(0, 38, 2)])
+        assert_components_match()
+        cache = cache_general_get(storage_struct, CacheGeneralAlias.CONNECTIONS_COMPONENTS)
+        self.assertFalse(cache.dirty)
+
+        # merges are followed right away, splits rebuild on the next read
+        storage.crud.update_connections_synthetic(storage_struct, ["synthetic0"], [
+            ConnectionSyntheticData(name=None, start=None, end=None, distance=2.0, direction=None)])
+        self.assertFalse(cache.dirty)
+        assert_components_match()
+        storage.crud.delete_connections_synthetic(storage_struct, ["synthetic2", "synthetic10"])
+        self.assertTrue(cache.dirty)
+        assert_components_match()
+        storage.crud.delete_nodes(storage_struct, ["node4", "node19", "node30"])
+        assert_components_match()
+        storage.crud.update_nodes_by_name(storage_struct, ["node39"], [
+            NodeAuthenticData(name="node4", datapoints_array=None, params=None)])
+        assert_components_match()
+        storage.crud.update_connections_authentic(storage_struct, ["connection6"], [
+            ConnectionAuthenticData(name=None, start="node20", end=None, distance=None, direction=None)])
+        assert_components_match()
+
+        # unreachable pairs are answered without bringing the walk distances up to date
+        walk_cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node1"), 1.0)
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name="connection_new", start="node1", end="node0", distance=0.5,
+                                    direction=[1, 0])])
+        self.assertFalse(storage.nodes_are_connected(storage_struct, "node0", "node38"))
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node38"), float("inf"))
+        self.assertTrue(walk_cache.dirty)
+
+    def test_storage_report(self):
+        """Testing the cache counters and the memory breakdown of the storage"""
+
+        storage_struct = self.storage_struct
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i + j / 64 for j in range(64)]],
+                              params={"x": i, "y": 0}) for i in range(10)])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                    direction=[1, 0]) for i in range(9)])
+
+        cache_indexes = validate_cache_nodes_indexes(
+            cache_general_get(storage_struct, CacheGeneralAlias.NODE_INDEX_MAP))
+        hits = cache_indexes.hits
+        storage.node_get_index_by_name(storage_struct, "node3")
+        with self.assertRaises(KeyError):
+            storage.node_get_index_by_name(storage_struct, "missing")
+        self.assertEqual((cache_indexes.hits, cache_indexes.misses), (hits + 1, 1))
+
+        storage.nodes_get_all_names(storage_struct)
+        storage.nodes_get_all_names(storage_struct)
+        storage.node_get_datapoints_tensor(storage_struct, "node0")
+
+        report = storage.storage_report(storage_struct)
+        self.assertEqual(report["data"][DataAlias.NODE_AUTHENTIC.value]["count"], 10)
+        self.assertEqual((report["memoized_reads"]["hits"], report["memoized_reads"]["misses"]), (1, 1))
+        self.assertEqual(report["caches"][CacheGeneralAlias.NODE_INDEX_MAP.value]["misses"], 1)
+
+        # the datapoints are held once by the nodes, the tensor store and the node map only reference them
+        nodes_bytes = report["data"][DataAlias.NODE_AUTHENTIC.value]["bytes"]
+        self.assertGreater(nodes_bytes, 10 * 64 * 4)
+        self.assertLess(report["caches"][CacheGeneralAlias.NODE_TENSOR_STORE.value]["bytes"], 10 * 64 * 4)
+        self.assertLess(report["caches"][CacheGeneralAlias.NODE_CACHE_MAP.value]["bytes"], nodes_bytes / 10)
+        self.assertEqual(report["total_bytes"], nodes_bytes + sum(
+            stats["bytes"] for name, stats in report["data"].items() if name != DataAlias.NODE_AUTHENTIC.value) + sum(
+            stats["bytes"] for stats in report["caches"].values()) + sum(
+            stats["bytes"] for stats in report["caches_functionalities"].values()) + report["memoized_reads"]["bytes"])
+        self.assertIn(CacheGeneralAlias.NODE_TENSOR_STORE.value, storage.storage_report_format(report))
+
+    def test_cache_registry(self):
+        """Testing the dependency order of the caches and the caches built on their first read"""
+
+        storage_struct = self.storage_struct
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i]], params={"x": i, "y": 0}) for i in range(3)])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name="connection01", start="node0", end="node1", distance=1.0, direction=[1, 0])])
+
+        # derived caches are not paid for until read
+        self.assertNotIn(CacheGeneralAlias.CONNECTIONS_PAIRS, storage_struct.caches)
+        self.assertNotIn(CacheGeneralAlias.NODE_TENSOR_STORE, storage_struct.caches)
+        self.assertTrue(storage.connection_exists(storage_struct, "node1", "node0"))
+        self.assertIn(CacheGeneralAlias.CONNECTIONS_PAIRS, storage_struct.caches)
+        storage.crud.delete_connections_authentic(storage_struct, ["connection01"])
+        self.assertFalse(storage.connection_exists(storage_struct, "node1", "node0"))
+
+        # declared out of order, the dependency still gets the events first, and is built from the existing data
+        log = []
+        caches_register(storage_struct, [
+            _calls_log_definition("dependent", log, depends_on=["dependency"]),
+            _calls_log_definition("dependency", log, depends_on=[]),
+            _calls_log_definition("unread", log, depends_on=["dependency"], activation=CacheActivation.ON_FIRST_READ),
+        ])
+        self.assertEqual(log, [("dependency", "create", 3), ("dependent", "create", 3)])
+        log.clear()
+        storage.crud.delete_nodes(storage_struct, ["node2"])
+        self.assertEqual(log, [("dependency", "delete", 1), ("dependent", "delete", 1)])
+        self.assertNotIn("unread", storage_struct.caches)
+
+        with self.assertRaises(ValueError):
+            caches_register(storage_struct, [_calls_log_definition("cycle_a", log, depends_on=["cycle_b"]),
+                                             _calls_log_definition("cycle_b", log, depends_on=["cycle_a"])])
+        with self.assertRaises(ValueError):
+            definition = _calls_log_definition("batched", log, depends_on=[],
+                                               activation=CacheActivation.ON_FIRST_READ)
+            definition.subscriptions[0].batched = True
+            caches_register(storage_struct, [definition])
@@ -1,10 +1,14 @@
+import random
 import unittest
 from src import runtime_storages as storage
 from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
 from src.runtime_storages.functions.functionalities.get_walk_distance import \
-    validate_cache_get_walk_distance
+    validate_cache_get_walk_distance, validate_cache_get_walk_distance_on_demand, walk_distance_backend_get
+from src.runtime_storages.functions.functionalities.get_walk_distance.cache_get_walk_distance import \
+    invalidate_and_recalculate
+from src.runtime_storages.functions.subscriber_functions import subscribe_to_crud_operation
 from src.runtime_storages.other import cache_specialized_get
-from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData
+from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData, DataAlias, OperationsAlias
 
 
 class TestsCacheSpecialized(unittest.TestCase):
@@ -63,3 +67,244 @@ class TestsCacheSpecialized(unittest.TestCase):
         self.assertEqual(d15, 1.0)
         # uses node 4 to get to 5, 1->5->4
         self.assertEqual(d14, 2.0)
+
+    def _assert_walk_distances_match(self, storage_struct):
+        """Compares the cache against a Floyd-Warshall over the stored connections"""
+        cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+        cache = validate_cache_get_walk_distance(cache)
+
+        names = storage.nodes_get_all_names(storage_struct)
+        expected = {start: {end: 0 if start == end else float("inf") for end in names} for start in names}
+        for connection in storage.connections_all_get(storage_struct):
+            start, end = connection["start"], connection["end"]
+            if start in expected and end in expected:
+                distance = min(expected[start][end], connection["distance"])
+                expected[start][end] = expected[end][start] = distance
+        for k in names:
+            for i in names:
+                for j in names:
+                    expected[i][j] = min(expected[i][j], expected[i][k] + expected[k][j])
+
+        for start in names:
+            for end in names:
+                distance = storage.get_walk_distance(storage_struct, start, end)
+                self.assertAlmostEqual(expected[start][end], distance, places=4)
+        if storage_struct.walk_distance_backend != FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND:
+            self.assertEqual(set(names), set(cache.rows_names))
+
+    @staticmethod
+    def _create_random_graph(storage_struct, nodes_count: int, connections_count: int):
+        rng = random.Random(7)
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[1, 2, 3]], params={"param1": 1}) for i in
+                 range(nodes_count)]
+        storage.crud.create_nodes(storage_struct, nodes)
+
+        connections = []
+        for i in range(connections_count):
+            start, end = rng.sample(range(nodes_count), 2)
+            connections.append(ConnectionAuthenticData(name=f"connection{i}", start=f"node{start}", end=f"node{end}",
+                                                       distance=rng.uniform(0.5, 3.0), direction=[1, 1]))
+        authentic_count = connections_count * 2 // 3
+        storage.crud.create_connections_authentic(storage_struct, connections[:authentic_count])
+        storage.crud.create_connections_synthetic(storage_struct, connections[authentic_count:])
+
+    def test_get_walk_cache_incremental(self):
+        """Testing the incremental maintenance against a full recalculation, for each mode and backend"""
+
+        for backend, lazy in [(FunctionalityAlias.GET_WALK_DISTANCE, False), (FunctionalityAlias.GET_WALK_DISTANCE, True),
+                              (FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND, True)]:
+            with self.subTest(backend=backend, lazy=lazy):
+                storage_struct = storage.create_storage()
+                storage_struct.walk_distance_backend = backend
+                cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+                cache.lazy = lazy
+
+                self._create_random_graph(storage_struct, nodes_count=30, connections_count=60)
+                self._assert_walk_distances_match(storage_struct)
+
+                storage.crud.delete_connections_authentic(storage_struct,
+                                                          [f"connection{i}" for i in range(0, 40, 3)])
+                self._assert_walk_distances_match(storage_struct)
+
+                lengthened = ConnectionAuthenticData(name=None, start=None, end=None, distance=10.0, direction=None)
+                shortened = ConnectionAuthenticData(name=None, start=None, end=None, distance=0.1, direction=None)
+                storage.crud.update_connections_authentic(storage_struct, ["connection1", "connection2"],
+                                                          [lengthened, shortened])
+                self._assert_walk_distances_match(storage_struct)
+
+                storage.crud.delete_nodes(storage_struct, ["node3", "node11"])
+                self._assert_walk_distances_match(storage_struct)
+
+                unreachable = NodeAuthenticData(name="node_unreachable", datapoints_array=[[1, 2, 3]],
+                                                params={"param1": 1})
+                storage.crud.create_nodes(storage_struct, [unreachable])
+                self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node_unreachable"),
+                                 float("inf"))
+                self._assert_walk_distances_match(storage_struct)
+
+                invalidate_and_recalculate(storage_struct)
+                self._assert_walk_distances_match(storage_struct)
+
+    def test_get_walk_cache_lazy(self):
+        """Testing mutations only mark the lazy cache dirty, and the first read brings it up to date"""
+
+        storage_struct = self.storage_struct
+        cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+        cache = validate_cache_get_walk_distance(cache)
+        self.assertTrue(cache.lazy)
+
+        self._create_random_graph(storage_struct, nodes_count=30, connections_count=60)
+        self.assertEqual(cache.recomputations, 0)
+        self._assert_walk_distances_match(storage_struct)
+        self.assertEqual(cache.recomputations, 1)
+        self.assertEqual(cache.recomputations_avoided, 1)
+
+        storage.crud.delete_connections_authentic(storage_struct, ["connection5", "connection9"])
+        storage.crud.create_connections_synthetic(storage_struct, [
+            ConnectionAuthenticData(name="connection_new", start="node5", end="node6", distance=0.2,
+                                    direction=[1, 1])])
+        storage.crud.update_connections_synthetic(storage_struct, ["connection50"], [
+            ConnectionAuthenticData(name=None, start=None, end=None, distance=9.0, direction=None)])
+        storage.crud.delete_connections_synthetic(storage_struct, ["connection_new"])
+        # pending removals through a deleted node have to be applied before its row goes away
+        storage.crud.delete_nodes(storage_struct, ["node7"])
+        self.assertTrue(cache.dirty)
+
+        self._assert_walk_distances_match(storage_struct)
+        self.assertEqual(cache.recomputations, 2)
+        self.assertEqual(cache.recomputations_avoided, 4)
+
+        # the only path through the deleted node uses edges removed while the cache was dirty
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"path{i}", datapoints_array=[[1, 2, 3]], params={"param1": 1}) for i in range(3)])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name="path01", start="path0", end="path1", distance=1.0, direction=[1, 1]),
+            ConnectionAuthenticData(name="path12", start="path1", end="path2", distance=1.0, direction=[1, 1]),
+            ConnectionAuthenticData(name="path02", start="path0", end="path2", distance=5.0, direction=[1, 1])])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "path0", "path2"), 2.0)
+
+        storage.crud.delete_connections_authentic(storage_struct, ["path01", "path12"])
+        storage.crud.delete_nodes(storage_struct, ["path1"])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "path0", "path2"), 5.0)
+
+        # the rows recalculated for a removal already see the edges added after it on the same node
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=name, datapoints_array=[[1, 2, 3]], params={"param1": 1}) for name in
+            ["p", "q", "r", "s"]])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name="sq", start="s", end="q", distance=4.0, direction=[1, 1])])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "s", "q"), 4.0)
+        storage.crud.delete_connections_authentic(storage_struct, ["sq"])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name="pq", start="p", end="q", distance=8.0, direction=[1, 1])])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name="qr", start="q", end="r", distance=7.0, direction=[1, 1])])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "p", "r"), 15.0)
+        self.assertTrue(cache.closed)
+        self._assert_walk_distances_match(storage_struct)
+
+    def test_get_walk_cache_transaction(self):
+        """Testing batched subscribers receive the merged events once the transaction ends"""
+
+        storage_struct = self.storage_struct
+        deliveries = []
+        subscribe_to_crud_operation(storage_struct, DataAlias.CONNECTIONS_AUTHENTIC, OperationsAlias.CREATE,
+                                    lambda _, connections: deliveries.append([c["name"] for c in connections]),
+                                    batched=True)
+
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[1, 2, 3]], params={"param1": 1}) for i in
+                 range(4)]
+        connections = [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                    direction=[1, 1]) for i in range(3)]
+
+        with storage.storage_transaction(storage_struct):
+            storage.crud.create_nodes(storage_struct, nodes)
+            with storage.storage_transaction(storage_struct):
+                storage.crud.create_connections_authentic(storage_struct, connections[:2])
+            storage.crud.create_connections_authentic(storage_struct, connections[2:])
+            self.assertEqual(deliveries, [])
+            # plain subscribers are still notified right away
+            self.assertTrue(storage.connection_exists(storage_struct, "node0", "node1"))
+            # reading the walk distance delivers the events deferred so far
+            self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node3"), 3.0)
+            self.assertEqual(deliveries, [["connection0", "connection1", "connection2"]])
+            storage.crud.delete_connections_authentic(storage_struct, ["connection2"])
+            self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node3"), float("inf"))
+            storage.crud.create_connections_authentic(storage_struct, connections[2:])
+
+        self.assertEqual(deliveries, [["connection0", "connection1", "connection2"], ["connection2"]])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node3"), 3.0)
+
+        with storage.storage_transaction(storage_struct):
+            storage.crud.update_connections_authentic(storage_struct, ["connection1"], [
+                ConnectionAuthenticData(name=None, start=None, end=None, distance=5.0, direction=None)])
+            storage.crud.update_connections_authentic(storage_struct, ["connection1"], [
+                ConnectionAuthenticData(name=None, start=None, end=None, distance=2.0, direction=None)])
+            storage.crud.delete_connections_authentic(storage_struct, ["connection2"])
+
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node2"), 3.0)
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node3"), float("inf"))
+
+    def test_get_walk_cache_transaction_delete_then_add(self):
+        """Testing edges added after a removal within a transaction are relaxed through the recalculated rows"""
+
+        for lazy in [True, False]:
+            with self.subTest(lazy=lazy):
+                storage_struct = storage.create_storage()
+                cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+                validate_cache_get_walk_distance(cache).lazy = lazy
+                storage.crud.create_nodes(storage_struct, [
+                    NodeAuthenticData(name=name, datapoints_array=[[1, 2, 3]], params={"param1": 1}) for name in
+                    ["p", "q", "r", "s"]])
+                storage.crud.create_connections_authentic(storage_struct, [
+                    ConnectionAuthenticData(name="sq", start="s", end="q", distance=4.0, direction=[1, 1])])
+                self.assertEqual(storage.get_walk_distance(storage_struct, "s", "q"), 4.0)
+
+                with storage.storage_transaction(storage_struct):
+                    storage.crud.delete_connections_authentic(storage_struct, ["sq"])
+                    storage.crud.create_connections_authentic(storage_struct, [
+                        ConnectionAuthenticData(name="pq", start="p", end="q", distance=8.0, direction=[1, 1])])
+                    storage.crud.create_connections_authentic(storage_struct, [
+                        ConnectionAuthenticData(name="qr", start="q", end="r", distance=7.0, direction=[1, 1])])
+
+                self.assertEqual(storage.get_walk_distance(storage_struct, "p", "r"), 15.0)
+                self._assert_walk_distances_match(storage_struct)
+
+    def test_get_walk_cache_on_demand(self):
+        """Testing the rows LRU stays within its budget and only the rows affected by a change are evicted"""
+
+        storage_struct = self.storage_struct
+        storage_struct.walk_distance_backend = FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND
+        cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE_ON_DEMAND)
+        cache = validate_cache_get_walk_distance_on_demand(cache)
+
+        # two separate lines of 10 nodes
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[1, 2, 3]], params={"param1": 1}) for i in
+                 range(20)]
+        storage.crud.create_nodes(storage_struct, nodes)
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                    direction=[1, 1]) for i in range(19) if i != 9])
+
+        cache.memory_budget = 3 * 20 * 4
+        for i in range(10):
+            self.assertEqual(storage.get_walk_distance(storage_struct, f"node{i}", "node9"), 9 - i)
+        self.assertEqual(list(cache.rows.keys()), [7, 8, 9])
+
+        storage.get_walk_distance(storage_struct, "node15", "node19")
+        cached_sources = set(cache.rows.keys())
+        storage.crud.update_connections_authentic(storage_struct, ["connection0"], [
+            ConnectionAuthenticData(name=None, start=None, end=None, distance=5.0, direction=None)])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node2"), 6.0)
+        # the other line is not affected by the change
+        self.assertTrue(15 in cache.rows)
+        self.assertTrue(cached_sources - set(cache.rows.keys()))
+
+        # the dense matrix is released while unused, and rebuilt once it is picked again
+        dense_cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+        self.assertEqual(dense_cache.count, 0)
+        storage_struct.walk_distance_backend = None
+        self.assertEqual(walk_distance_backend_get(storage_struct), FunctionalityAlias.GET_WALK_DISTANCE)
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node9"), 13.0)
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node0", "node19"), float("inf"))
@@ -0,0 +1,76 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from src.save_load_handlers.json_stream import json_array_iterate, json_array_batches, node_from_json
+from src.save_load_handlers.data_handle import convert_json_to_map, read_map
+
+
+def _map_as_lists(loaded_map: tuple) -> tuple:
+    """
+    The map read with the datapoints of the nodes as lists, to compare it with the one written
+    """
+    nodes = [dict(node, datapoints_array=node["datapoints_array"].tolist()) for node in loaded_map[0]]
+    return (nodes,) + tuple(loaded_map[1:])
+
+
+class TestsJsonStream(unittest.TestCase):
+    """
+    Testing the streaming of JSON arrays and the conversion of JSON files into maps
+    """
+
+    def test_json_array_iterate(self):
+        """Testing that the elements come out as json.load gives them, whatever the chunks cut"""
+
+        elements = [{"name": "a", "datapoints_array": [[1.5, -2e-3], [123456, 7]], "params": {"x": 1}}, 12345,
+                    "a string, with ] and [ inside", [], {}, None, True, -0.125, [[[]]]]
+        text = json.dumps(elements, indent=4)
+        for chunk_chars in [1, 2, 7, 64, len(text)]:
+            with self.subTest(chunk_chars=chunk_chars):
+                self.assertEqual(list(json_array_iterate(io.StringIO(text), chunk_chars)), elements)
+
+        # numbers cut inside their fraction, exponent or after their sign
+        for cut_text, cut_elements in [("[12345.5, 2]", [12345.5, 2]), ("[1e-300, 2]", [1e-300, 2]),
+                                       ("[-12.75]", [-12.75])]:
+            for chunk_chars in range(1, len(cut_text) + 1):
+                with self.subTest(text=cut_text, chunk_chars=chunk_chars):
+                    self.assertEqual(list(json_array_iterate(io.StringIO(cut_text), chunk_chars)), cut_elements)
+
+        self.assertEqual(list(json_array_iterate(io.StringIO(" [ ] "))), [])
+        self.assertEqual([len(batch) for batch in json_array_batches(io.StringIO(text), 4)], [4, 4, 1])
+
+        for invalid_text in ["{}", "[1, 2", "[1 2]", "[1, }]", ""]:
+            with self.subTest(invalid_text=invalid_text):
+                with self.assertRaises(ValueError):
+                    list(json_array_iterate(io.StringIO(invalid_text), 2))
+
+    def test_convert_json_to_map(self):
+        """Testing that legacy and current JSON files convert into the same map they load as"""
+
+        legacy_nodes = [{"data": [[i, 0.5], [-i, 0.25]], "name": f"node{i}", "params": {"i": i, "x": i, "y": 0}} for i
+                        in range(100)]
+        authentic = [{"name": f"connection{i}", "start": f"node{i}", "end": f"node{i + 1}", "distance": 1.0,
+                      "direction": [1, 0]} for i in range(99)]
+        null = [{"name": "node3", "start": "node3", "distance": 1.0, "direction": [0, 1]}]
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {}
+            for name, data in [("nodes", legacy_nodes), ("authentic", authentic), ("null", null)]:
+                paths[name] = os.path.join(directory, f"{name}.json")
+                with open(paths[name], "w") as file:
+                    json.dump(data, file, indent=4)
+
+            map_file = io.BytesIO()
+            convert_json_to_map(paths["nodes"], map_file, connections_authentic_file_path=paths["authentic"],
+                                connections_null_file_path=paths["null"])
+            map_file.seek(0)
+            nodes = [node_from_json(node) for node in legacy_nodes]
+            self.assertEqual(_map_as_lists(read_map(map_file)), (nodes, authentic, [], null))
+
+            with open(paths["nodes"], "w") as file:
+                json.dump([], file)
+            map_file = io.BytesIO()
+            convert_json_to_map(paths["nodes"], map_file)
+            map_file.seek(0)
+            self.assertEqual(read_map(map_file), ([], [], [], []))
@@ -0,0 +1,150 @@
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from src import runtime_storages as storage
+from src.save_load_handlers.data_handle import write_map, read_map, is_map_file, MAP_FILE_EXTENSION
+from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData, ConnectionSyntheticData, \
+    ConnectionNullData
+
+
+def _map_as_lists(loaded_map: tuple) -> tuple:
+    """
+    The map read with the datapoints of the nodes as lists, to compare it with the one written
+    """
+    nodes = [dict(node, datapoints_array=node["datapoints_array"].tolist()) for node in loaded_map[0]]
+    return (nodes,) + tuple(loaded_map[1:])
+
+
+def _mapped_resident_bytes(file_path: str) -> int | None:
+    """
+    Bytes of the mappings of the file resident in the memory of the process, None where /proc/self/smaps is missing
+    """
+    try:
+        with open("/proc/self/smaps") as smaps:
+            lines = smaps.readlines()
+    except OSError:
+        return None
+
+    file_path = os.path.realpath(file_path)
+    resident = 0
+    mapped = False
+    for line in lines:
+        fields = line.split()
+        if "-" in fields[0] and not fields[0].endswith(":"):
+            mapped = len(fields) >= 6 and fields[5] == file_path
+        elif mapped and fields[0] == "Rss:":
+            resident += int(fields[1]) * 1024
+    return resident
+
+
+class TestsSaveLoadMap(unittest.TestCase):
+    """
+    Testing the binary map format
+    """
+
+    def test_map_round_trip(self):
+        """Testing that a written map reads back as the same nodes and connections"""
+
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, 0.5], [-i, 0.25]],
+                                   params={"x": i, "y": 0.1} if i != 2 else None) for i in range(4)]
+        authentic = [
+            ConnectionAuthenticData(name="connection01", start="node0", end="node1", distance=0.1, direction=[1, 0]),
+            # endpoints which aren't nodes are kept by name
+            ConnectionAuthenticData(name="connection0x", start="node0", end="elsewhere", distance=2.0,
+                                    direction=[0.3, 0.7])]
+        synthetic = [
+            ConnectionSyntheticData(name="synthetic12", start="node1", end="node2", distance=None, direction=None),
+            ConnectionSyntheticData(name="synthetic23", start="node2", end="node3", distance=1.5, direction=None)]
+        null = [ConnectionNullData(name="node3", start="node3", distance=1.0, direction=[0, 1]),
+                ConnectionNullData(name="node3", start="node3", distance=1.0, direction=[1, 0])]
+
+        file = io.BytesIO()
+        write_map(file, nodes, authentic, synthetic, null)
+        file.seek(0)
+        self.assertEqual(_map_as_lists(read_map(file)), (nodes, authentic, synthetic, null))
+
+        empty = io.BytesIO()
+        write_map(empty, [], [], [], [])
+        empty.seek(0)
+        self.assertEqual(read_map(empty), ([], [], [], []))
+
+        self.assertTrue(is_map_file(f"step1_walk{MAP_FILE_EXTENSION}"))
+        self.assertFalse(is_map_file("step1_datapoints_walk.json"))
+
+        # the loaded data goes straight into a storage
+        file.seek(0)
+        loaded_nodes, loaded_authentic, loaded_synthetic, loaded_null = read_map(file)
+        self.assertEqual(loaded_nodes[0]["datapoints_array"].dtype, np.float32)
+        storage_struct = storage.create_storage()
+        storage.crud.create_nodes(storage_struct, loaded_nodes)
+        storage.crud.create_connections_authentic(storage_struct, loaded_authentic)
+        storage.crud.create_connections_synthetic(storage_struct, loaded_synthetic)
+        storage.crud.create_connections_null(storage_struct, loaded_null)
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node3").tolist(), [[3, 0.5], [-3, 0.25]])
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node1", "node3"), float("inf"))
+        self.assertEqual(storage.get_walk_distance(storage_struct, "node2", "node3"), 1.5)
+
+    def test_map_memory_mapped(self):
+        """Testing that memory mapped datapoints behave as the loaded ones, both in a storage and written back"""
+
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, 0.5], [-i, 0.25]], params={"x": i, "y": 0})
+                 for i in range(4)]
+        authentic = [ConnectionAuthenticData(name="connection01", start="node0", end="node1", distance=0.1,
+                                             direction=[1, 0])]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"map{MAP_FILE_EXTENSION}")
+            write_map(path, nodes, authentic, [], [])
+            mapped_nodes, mapped_authentic, _, _ = read_map(path, mmap=True)
+            self.assertTrue(all(isinstance(node["datapoints_array"], np.memmap) for node in mapped_nodes))
+            self.assertEqual([node["datapoints_array"].tolist() for node in mapped_nodes],
+                             [node["datapoints_array"] for node in nodes])
+            self.assertEqual(mapped_authentic, authentic)
+
+            storage_struct = storage.create_storage()
+            storage.crud.create_nodes(storage_struct, mapped_nodes)
+            self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node2").tolist(),
+                             [[2, 0.5], [-2, 0.25]])
+            storage.crud.update_nodes_by_name(storage_struct, ["node1"], [
+                NodeAuthenticData(name=None, datapoints_array=[[9, 9], [9, 9]], params=None)])
+            self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node1").tolist(), [[9, 9], [9, 9]])
+
+            # mapped and loaded datapoints mix when the storage is saved again
+            resaved_path = os.path.join(directory, f"resaved{MAP_FILE_EXTENSION}")
+            write_map(resaved_path, storage_struct.nodes_authentic, [], [], [])
+            self.assertEqual(read_map(resaved_path)[0][1]["datapoints_array"].tolist(), [[9, 9], [9, 9]])
+            self.assertEqual(read_map(resaved_path)[0][3]["datapoints_array"].tolist(), [[3, 0.5], [-3, 0.25]])
+
+            empty_path = os.path.join(directory, f"empty{MAP_FILE_EXTENSION}")
+            write_map(empty_path, [], [], [], [])
+            self.assertEqual(read_map(empty_path, mmap=True), ([], [], [], []))
+
+        with self.assertRaises(ValueError):
+            read_map(io.BytesIO(), mmap=True)
+
+    def test_map_memory_mapped_residency(self):
+        """Testing that a storage over memory mapped datapoints only reads the rows it is asked for"""
+
+        nodes_count = 512
+        # 64 KiB of datapoints per node, 32 MiB in all, as pages can be mapped by the MiB
+        nodes = [NodeAuthenticData(name=f"node{i}", datapoints_array=np.full((64, 256), i, dtype=np.float32),
+                                   params={"x": i, "y": 0}) for i in range(nodes_count)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"map{MAP_FILE_EXTENSION}")
+            write_map(path, nodes, [], [], [])
+            mapped_nodes, _, _, _ = read_map(path, mmap=True)
+            if _mapped_resident_bytes(path) is None:
+                self.skipTest("/proc/self/smaps is not available")
+
+            storage_struct = storage.create_storage()
+            storage.crud.create_nodes(storage_struct, mapped_nodes)
+            self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node7")[0, 0].item(), 7)
+            self.assertEqual(storage.nodes_get_datapoints_tensors(storage_struct, ["node1", "node300"]).shape,
+                             (2, 64, 256))
+
+            datapoints_bytes = nodes_count * 64 * 256 * 4
+            self.assertLess(_mapped_resident_bytes(path), datapoints_bytes // 4)
+            del storage_struct, mapped_nodes
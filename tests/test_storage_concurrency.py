@@ -0,0 +1,231 @@
+import multiprocessing
+import threading
+import unittest
+import numpy as np
+from src import runtime_storages as storage
+from src.runtime_storages.functions.storage_lock import StorageLock
+from src.runtime_storages.general_cache.cache_nodes_tensor import validate_cache_nodes_tensor
+from src.runtime_storages.functions.functionalities.functionalities_types import FunctionalityAlias
+from src.runtime_storages.other.cache_functions import cache_general_get, cache_specialized_get
+from src.runtime_storages.types import CacheGeneralAlias, NodeAuthenticData, ConnectionAuthenticData, \
+    ConnectionSyntheticData, ConnectionNullData
+
+_READERS_COUNT = 4
+_READS_COUNT = 200
+_WRITE_ROUNDS = 50
+
+
+class TestsStorageConcurrency(unittest.TestCase):
+    """
+    Testing the locking and the snapshots of the storage, for consumers running alongside exploration
+    """
+
+    @classmethod
+    def setUp(cls):
+        cls.storage_struct = storage.create_storage()
+
+    @classmethod
+    def tearDown(cls):
+        cls.storage_struct = None
+
+    def test_lock_exclusion(self):
+        """Testing that writers wait for the readers, and that the lock is reentrant"""
+
+        lock = StorageLock()
+        written = threading.Event()
+
+        def write():
+            with lock.write():
+                written.set()
+
+        with lock.read():
+            with lock.read():
+                writer = threading.Thread(target=write)
+                writer.start()
+                self.assertFalse(written.wait(0.1))
+            with self.assertRaises(RuntimeError):
+                lock.acquire_write()
+        self.assertTrue(written.wait(1.0))
+        writer.join()
+
+        with lock.write():
+            with lock.write():
+                with lock.read():
+                    pass
+
+    def test_concurrent_readers_and_writers(self):
+        """Testing that readers never see a half applied write, alone and while a writer runs alongside them"""
+
+        storage_struct = self.storage_struct
+        stable_nodes = [NodeAuthenticData(name=f"stable{i}", datapoints_array=[[i, i]], params={"x": i, "y": 0}) for
+                        i in range(20)]
+        storage.crud.create_nodes(storage_struct, stable_nodes)
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"stable{i}", start=f"stable{i}", end=f"stable{i + 1}", distance=1.0,
+                                    direction=[1, 0]) for i in range(19)])
+        tensor_cache = validate_cache_nodes_tensor(
+            cache_general_get(storage_struct, CacheGeneralAlias.NODE_TENSOR_STORE))
+
+        errors = []
+        writes_done = threading.Event()
+
+        def read_loop(start: threading.Barrier, reads_counter: list):
+            try:
+                start.wait()
+                # readers keep going until the writer is done, so every write happens while they read
+                while reads_counter[0] < _READS_COUNT or not writes_done.is_set():
+                    with storage_struct.lock.read():
+                        names = storage.nodes_get_all_names(storage_struct)
+                        self.assertEqual(len(tensor_cache.rows_map), len(names))
+                        for index, name in enumerate(names):
+                            self.assertEqual(storage.node_get_index_by_name(storage_struct, name), index)
+                    self.assertAlmostEqual(storage.get_walk_distance(storage_struct, "stable0", "stable19"), 19.0,
+                                           places=4)
+                    reads_counter[0] += 1
+            except Exception as error:
+                errors.append(error)
+                writes_done.set()
+
+        def write_loop(start: threading.Barrier, writes_counter: list):
+            try:
+                start.wait()
+                while writes_counter[0] < _WRITE_ROUNDS and len(errors) == 0:
+                    round_id = writes_counter[0]
+                    names = [f"round{round_id}_{i}" for i in range(5)]
+                    with storage.storage_transaction(storage_struct):
+                        storage.crud.create_nodes(storage_struct, [
+                            NodeAuthenticData(name=name, datapoints_array=[[0, 0]], params=None) for name in names])
+                        storage.crud.create_connections_authentic(storage_struct, [
+                            ConnectionAuthenticData(name=f"{name}_connection", start="stable0", end=name,
+                                                    distance=2.0, direction=[0, 1]) for name in names])
+                    with storage.storage_transaction(storage_struct):
+                        storage.crud.delete_connections_authentic(storage_struct,
+                                                                  [f"{name}_connection" for name in names])
+                        storage.crud.delete_nodes(storage_struct, names)
+                    writes_counter[0] += 1
+            except Exception as error:
+                errors.append(error)
+            finally:
+                writes_done.set()
+
+        def run(with_writer: bool) -> None:
+            if with_writer:
+                writes_done.clear()
+            else:
+                writes_done.set()
+            reads_counters = [[0] for _ in range(_READERS_COUNT)]
+            writes_counter = [0]
+            start = threading.Barrier(_READERS_COUNT + with_writer)
+            threads = [threading.Thread(target=read_loop, args=(start, counter)) for counter in reads_counters]
+            if with_writer:
+                threads.append(threading.Thread(target=write_loop, args=(start, writes_counter)))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertTrue(all(counter[0] >= _READS_COUNT for counter in reads_counters))
+            if with_writer:
+                self.assertEqual(writes_counter[0], _WRITE_ROUNDS)
+
+        run(with_writer=False)
+        run(with_writer=True)
+        self.assertEqual(len(storage.nodes_get_all_names(storage_struct)), len(stable_nodes))
+
+    def test_snapshot_isolation(self):
+        """Testing that a snapshot keeps its view while the storage changes, sharing its data until the next write"""
+
+        storage_struct = self.storage_struct
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i]], params={"x": i, "y": 0}) for i in range(4)])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                    direction=[1, 0]) for i in range(3)])
+
+        storage_struct.walk_distance_backend = FunctionalityAlias.GET_WALK_DISTANCE
+        storage.get_walk_distance(storage_struct, "node0", "node3")
+        walk_cache = cache_specialized_get(storage_struct, FunctionalityAlias.GET_WALK_DISTANCE)
+        tensor_cache = validate_cache_nodes_tensor(
+            cache_general_get(storage_struct, CacheGeneralAlias.NODE_TENSOR_STORE))
+        snapshot = storage.storage_snapshot(storage_struct)
+        self.assertTrue(storage.storage_snapshot_is_current(snapshot, storage_struct))
+        self.assertEqual(snapshot.walk_distance_backend, FunctionalityAlias.GET_WALK_DISTANCE)
+        self.assertIs(snapshot.nodes_authentic, storage_struct.nodes_authentic)
+        self.assertIs(cache_general_get(snapshot, CacheGeneralAlias.NODE_TENSOR_STORE), tensor_cache)
+
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name="node9", datapoints_array=[[9, 9]], params={"x": 9, "y": 0})])
+        self.assertIsNot(snapshot.nodes_authentic, storage_struct.nodes_authentic)
+        self.assertIsNot(cache_specialized_get(snapshot, FunctionalityAlias.GET_WALK_DISTANCE), walk_cache)
+        snapshot_tensor_cache = validate_cache_nodes_tensor(
+            cache_general_get(snapshot, CacheGeneralAlias.NODE_TENSOR_STORE))
+        self.assertNotIn("node9", snapshot_tensor_cache.rows_map)
+
+        storage.crud.update_nodes_by_name(storage_struct, ["node0"], [
+            NodeAuthenticData(name="node5", datapoints_array=[[5, 5]], params=None)])
+        storage.crud.update_connections_authentic(storage_struct, ["connection1"], [
+            ConnectionAuthenticData(name=None, start=None, end=None, distance=10.0, direction=None)])
+        storage.crud.delete_nodes(storage_struct, ["node1"])
+        self.assertIs(snapshot_tensor_cache.rows_map["node2"], tensor_cache.rows_map["node2"])
+        self.assertFalse(storage.storage_snapshot_is_current(snapshot, storage_struct))
+
+        self.assertEqual(storage.nodes_get_all_names(snapshot), ("node0", "node1", "node2", "node3"))
+        self.assertEqual(storage.node_get_datapoints_tensor(snapshot, "node0").tolist(), [[0, 0]])
+        self.assertEqual(storage.node_get_by_name(snapshot, "node1")["params"], {"x": 1, "y": 0})
+        self.assertEqual(storage.node_get_closest_to_xy(snapshot, 0.1, 0), "node0")
+        self.assertAlmostEqual(storage.get_walk_distance(snapshot, "node0", "node3"), 3.0, places=4)
+        self.assertEqual(storage.node_get_datapoints_tensor(storage_struct, "node5").tolist(), [[5, 5]])
+
+        with self.assertRaises(RuntimeError):
+            storage.crud.delete_nodes(snapshot, ["node0"])
+
+    def test_shared_memory_export(self):
+        """Testing that a worker process reads the storage exported to shared memory, sharing only the datapoints"""
+
+        storage_struct = self.storage_struct
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i], [0, 1]], params={"x": i, "y": 0}) for i in
+            range(4)])
+        storage.crud.create_connections_authentic(storage_struct, [
+            ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.5,
+                                    direction=[0.1, 0.2]) for i in range(3)])
+        storage.crud.create_connections_synthetic(storage_struct, [
+            ConnectionSyntheticData(name="synthetic", start="node0", end="node3", distance=None, direction=None)])
+        storage.crud.create_connections_null(storage_struct, [
+            ConnectionNullData(name="null", start="node2", distance=1.0, direction=[0, 1])])
+
+        memory, export = storage.storage_shared_export(storage_struct)
+        try:
+            # zero-copy, the attached tensor store reads the shared block
+            attached = storage.storage_shared_attach(export)
+            self.assertEqual(storage.node_get_datapoints_tensor(attached, "node2").tolist(), [[2, 2], [0, 1]])
+            datapoints = attached.nodes_authentic[2]["datapoints_array"]
+            offset, dtype, shape = export.layout["datapoints"]
+            np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)[2, 0, 0] = 7
+            self.assertEqual(datapoints[0].tolist(), [7, 2])
+            self.assertEqual(datapoints.dtype, storage_struct.nodes_authentic[2]["datapoints_array"].dtype)
+            self.assertFalse(datapoints.flags.writeable)
+            # the connections are unpacked into the elements the storage holds, floats included
+            self.assertEqual(attached.connections_authentic, storage_struct.connections_authentic)
+            self.assertEqual(type(attached.connections_authentic[0]["direction"]), list)
+            self.assertEqual(storage.connections_synthetic_get(attached), storage.connections_synthetic_get(
+                storage_struct))
+            self.assertEqual(storage.node_get_connections_null(attached, "node2"),
+                             storage.node_get_connections_null(storage_struct, "node2"))
+
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(1) as pool:
+                result = pool.apply(_shared_worker_read, (export,))
+            self.assertEqual(result, (("node0", "node1", "node2", "node3"), 4.5, 10.0, "node1"))
+            del attached
+        finally:
+            memory.close()
+            memory.unlink()
+
+
+def _shared_worker_read(export: 'storage.SharedStorageExport') -> tuple:
+    attached = storage.storage_shared_attach(export)
+    return (storage.nodes_get_all_names(attached), storage.get_walk_distance(attached, "node0", "node3"),
+            float(storage.nodes_get_datapoints_tensors(attached, ["node1", "node3"]).sum()),
+            storage.node_get_closest_to_xy(attached, 1.1, 0))
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from src import runtime_storages as storage
+from src.save_load_handlers.storage_journal import storage_journal_open, storage_journal_close, \
+    storage_journal_checkpoint, storage_journal_recover, storage_journal_flush, storage_journal_stats
+from src.runtime_storages.types import NodeAuthenticData, ConnectionAuthenticData, ConnectionSyntheticData, \
+    ConnectionNullData
+
+
+def _storage_data(storage_struct) -> tuple:
+    nodes = [dict(node, datapoints_array=node["datapoints_array"].tolist()) for node in storage_struct.nodes_authentic]
+    return nodes, storage_struct.connections_authentic, storage_struct.connections_synthetic, \
+        storage_struct.connections_null
+
+
+class TestsStorageJournal(unittest.TestCase):
+    """
+    Testing the recovery of a storage from its journal
+    """
+
+    @classmethod
+    def setUp(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDown(cls):
+        cls.directory.cleanup()
+
+    def _recovered(self):
+        recovered = storage.create_storage()
+        storage_journal_recover(recovered, self.directory.name)
+        return recovered
+
+    def test_journal_recovery(self):
+        """Testing that the checkpoint and the log replay give back the storage, whatever happened to it"""
+
+        storage_struct = storage.create_storage()
+        journal = storage_journal_open(storage_struct, self.directory.name)
+
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, 0.5], [0, -i]], params={"x": i, "y": 0}) for i in
+            range(6)])
+        with storage.storage_transaction(storage_struct):
+            storage.crud.create_connections_authentic(storage_struct, [
+                ConnectionAuthenticData(name=f"connection{i}", start=f"node{i}", end=f"node{i + 1}", distance=1.0,
+                                        direction=[1, 0]) for i in range(5)])
+            storage.crud.create_connections_synthetic(storage_struct, [
+                ConnectionSyntheticData(name="synthetic03", start="node0", end="node3", distance=None,
+                                        direction=None)])
+            # null connections share the name of their node
+            storage.crud.create_connections_null(storage_struct, [
+                ConnectionNullData(name="node2", start="node2", distance=1.0, direction=direction) for direction in
+                [[0, 1], [1, 0]]])
+
+        storage.crud.update_nodes_by_name(storage_struct, ["node1", "node2"], [
+            NodeAuthenticData(name="node1_renamed", datapoints_array=None, params=None),
+            NodeAuthenticData(name=None, datapoints_array=[[2, 2], [2, 2]], params={"x": 20, "y": 0})])
+        storage.crud.update_connections_synthetic(storage_struct, ["synthetic03"], [
+            ConnectionSyntheticData(name=None, start=None, end=None, distance=2.5, direction=[0.5, 0.5])])
+        storage.crud.update_connections_null(storage_struct, ["node2"], [
+            ConnectionNullData(name=None, start=None, distance=3.0, direction=None)])
+        storage.crud.delete_nodes(storage_struct, ["node0", "node4"])
+        storage.crud.delete_connections_authentic(storage_struct, ["connection2"])
+        storage_journal_flush(journal)
+        self.assertEqual(_storage_data(self._recovered()), _storage_data(storage_struct))
+
+        # a checkpoint replaces the log, later operations go to the next one
+        storage_journal_checkpoint(storage_struct, journal)
+        storage_journal_flush(journal)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["checkpoint_1.npz", "journal_1.log"])
+        storage.crud.create_nodes(storage_struct, [
+            NodeAuthenticData(name="node_after", datapoints_array=[[7, 7], [7, 7]], params={"x": 7, "y": 7})])
+        storage.crud.delete_connections_null(storage_struct, ["node2"])
+        storage_journal_close(journal)
+        self.assertEqual(_storage_data(self._recovered()), _storage_data(storage_struct))
+
+        # a record torn by an interruption is dropped, readers leave it in place as the writer may be finishing it
+        log_path = os.path.join(self.directory.name, "journal_1.log")
+        log_size = os.path.getsize(log_path)
+        with open(log_path, "ab") as log:
+            log.write(b"\x10\x00\x00\x00\x00\x00")
+        os.chmod(log_path, 0o444)
+        os.chmod(self.directory.name, 0o555)
+        try:
+            self.assertEqual(_storage_data(self._recovered()), _storage_data(storage_struct))
+        finally:
+            os.chmod(self.directory.name, 0o755)
+            os.chmod(log_path, 0o644)
+        self.assertEqual(os.path.getsize(log_path), log_size + 6)
+
+        # the writer resuming the journal goes on after the last complete record
+        resumed = storage.create_storage()
+        journal = storage_journal_open(resumed, self.directory.name)
+        self.assertEqual(_storage_data(resumed), _storage_data(storage_struct))
+        self.assertEqual(os.path.getsize(log_path), log_size)
+        storage.crud.update_nodes_by_name(resumed, ["node_after"], [
+            NodeAuthenticData(name=None, datapoints_array=None, params={"x": 8, "y": 8})])
+        storage_journal_close(journal)
+        self.assertEqual(_storage_data(self._recovered()), _storage_data(resumed))
+
+    def test_journal_writer(self):
+        """Testing that the operations wait for a full queue, and that closing writes everything queued"""
+
+        storage_struct = storage.create_storage()
+        journal = storage_journal_open(storage_struct, self.directory.name, queue_size=1)
+        for i in range(20):
+            storage.crud.create_nodes(storage_struct, [
+                NodeAuthenticData(name=f"node{i}", datapoints_array=[[i, i]], params={"x": i, "y": 0})])
+        storage_journal_checkpoint(storage_struct, journal)
+        storage.crud.delete_nodes(storage_struct, ["node3"])
+        storage_journal_close(journal)
+
+        stats = storage_journal_stats(journal)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["queue_size"], 1)
+        self.assertEqual(stats["records_written"], 21)
+        self.assertEqual(stats["checkpoints_written"], 1)
+        self.assertGreater(stats["write_seconds_max"], 0)
+        self.assertEqual(_storage_data(self._recovered()), _storage_data(storage_struct))